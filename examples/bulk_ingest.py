@@ -2,10 +2,12 @@
 Example: Bulk import (recursive directory ingestion) for RAGMS02, respecting .ragignore
 """
 import os
+import time
 import requests
 from ignore_utils import load_ignore_patterns, is_ignored
 
 API_URL = "http://localhost:8000/ingest/notify"
+JOBS_URL = "http://localhost:8000/ingest/jobs"
 PROJECT_ID = "example-project"
 ROOT_DIR = "./my_project"  # Change to your directory
 
@@ -25,6 +27,15 @@ payload = {
     "events": events
 }
 
+# The server queues the events as a job and returns its ID immediately (202)
 resp = requests.post(API_URL, json=payload)
 print("Bulk ingest status:", resp.status_code)
-print("Bulk ingest response:", resp.json())
+job = resp.json()
+print("Bulk ingest response:", job)
+
+# Poll the job until the background workers have finished
+while job.get("status") in ("queued", "running"):
+    time.sleep(1)
+    job = requests.get(f"{JOBS_URL}/{job['job_id']}").json()
+    print(f"Progress: {job['done']}/{job['total']} events")
+print("Bulk ingest result:", job)
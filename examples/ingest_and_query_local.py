@@ -26,7 +26,8 @@ payload = {
         }
     ]
 }
-resp = requests.post(f"{API_URL}/ingest/notify", json=payload)
+# wait=true blocks until the ingest job has finished, so the query below sees the new chunks
+resp = requests.post(f"{API_URL}/ingest/notify", params={"wait": "true"}, json=payload)
 print("Ingest response:", resp.json())
 
 # Query the LLM about the code
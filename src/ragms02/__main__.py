@@ -1,4 +1,96 @@
-import uvicorn
+"""
+Command-line entry point.
+
+Usage:
+    python -m ragms02                      # start the API (same as ``serve``)
+    python -m ragms02 serve --port 8000
+    python -m ragms02 ingest ./my_project --project my-project --db rag.db
+
+``ingest`` bulk-loads a directory straight into the vector database (see
+:mod:`ragms02.ingestion.bulk`). It honours the same ``RAGMS02_*`` store and
+embedder settings as the API.
+"""
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+
+def _serve(args: argparse.Namespace) -> int:
+    import uvicorn
+
+    uvicorn.run("ragms02.main:app", host=args.host, port=args.port, reload=args.reload)
+    return 0
+
+
+def _ingest(args: argparse.Namespace) -> int:
+    from ragms02.api.deps import create_embedder, create_store
+    from ragms02.ingestion.bulk import bulk_ingest
+
+    if not os.path.isdir(args.root):
+        print(f"Not a directory: {args.root}", file=sys.stderr)
+        return 2
+    db_path = args.db or os.environ.get("RAGMS02_VECTOR_DB")
+    if not db_path or db_path == ":memory:":
+        print("Set --db or RAGMS02_VECTOR_DB to the database to load into.", file=sys.stderr)
+        return 2
+    project_id = args.project or os.path.basename(os.path.abspath(args.root))
+    store = create_store(db_path)
+    try:
+        embedder = create_embedder(db_path)
+        store.sync_embedder(embedder)
+        stats = bulk_ingest(
+            store,
+            embedder,
+            args.root,
+            project_id,
+            workers=args.workers,
+            executor=args.executor,
+            batch_size=args.batch_size,
+            ignore_file=args.ignore_file,
+            force=args.force,
+            prune=args.prune,
+            max_file_size=args.max_file_size,
+        )
+    finally:
+        store.close()
+    print(
+        f"{project_id}: {stats['files']} files ({stats['ingested']} ingested, {stats['unchanged']} unchanged, "
+        f"{stats['binary']} binary, {stats['skipped']} skipped, {stats['deleted']} deleted), "
+        f"{stats['chunks']} chunks ({stats['added']} added, {stats['removed']} removed) in {stats['seconds']:.2f}s"
+    )
+    print(f"{stats['files_per_s']:.1f} files/s, {stats['chunks_per_s']:.1f} chunks/s")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m ragms02", description="ragms02 API server and bulk loader.")
+    commands = parser.add_subparsers(dest="command")
+
+    serve = commands.add_parser("serve", help="start the API server (default)")
+    serve.add_argument("--host", default="0.0.0.0", help="bind address (default: 0.0.0.0)")
+    serve.add_argument("--port", type=int, default=8000, help="port (default: 8000)")
+    serve.add_argument("--no-reload", dest="reload", action="store_false", help="disable auto-reload")
+    serve.set_defaults(handler=_serve)
+
+    ingest = commands.add_parser("ingest", help="bulk-load a directory into the vector database")
+    ingest.add_argument("root", help="directory to ingest")
+    ingest.add_argument("--project", help="project ID (default: the directory name)")
+    ingest.add_argument("--db", help="SQLite database path (default: RAGMS02_VECTOR_DB)")
+    ingest.add_argument("--workers", type=int, help="reader processes (default: CPU count)")
+    ingest.add_argument("--executor", choices=("process", "thread"), default="process", help="reader pool type (default: process)")
+    ingest.add_argument("--batch-size", type=int, default=2048, help="chunks embedded and written per transaction (default: 2048)")
+    ingest.add_argument("--ignore-file", help="ignore file relative to the directory (default: .ragignore)")
+    ingest.add_argument("--max-file-size", type=int, default=10 * 1024 * 1024, help="skip larger files and drop their stored chunks, in bytes (default: 10 MiB)")
+    ingest.add_argument("--force", action="store_true", help="re-read files the manifest says are unchanged")
+    ingest.add_argument("--prune", action="store_true", help="delete stored files that no longer exist in the directory")
+    ingest.set_defaults(handler=_ingest)
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        args = parser.parse_args(["serve"])
+    return args.handler(args)
+
 
 if __name__ == "__main__":
-    uvicorn.run("ragms02.main:app", host="0.0.0.0", port=8000, reload=True)
+    sys.exit(main())
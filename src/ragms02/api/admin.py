@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Path
-import os
+from fastapi import APIRouter, Depends, Path, Query, Request
+from fastapi.responses import PlainTextResponse
 from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
-from typing import List
+from ragms02.api.deps import get_store
+from ragms02.logs import LOG_BUFFER
+from ragms02.metrics import CACHE_ENTRIES, CACHE_HIT_RATIO, DB_SIZE_BYTES, DOCUMENTS, QUEUE_DEPTH, render
+from typing import List, Optional
 import datetime
 
 router = APIRouter()
 
 @router.post("/admin/reset")
-def admin_reset():
+def admin_reset(store: SQLiteLangChainVectorStore = Depends(get_store)):
     """
     .. :no-index:
 
@@ -20,11 +23,7 @@ def admin_reset():
         >>> admin_reset()
         {'status': 'reset', 'message': 'Database/index has been cleared.'}
     """
-    db_path = os.environ.get("RAGMS02_VECTOR_DB", ":memory:")
-    store = SQLiteLangChainVectorStore(db_path)
-    store.conn.execute("DELETE FROM vectors")
-    store.conn.commit()
-    store.close()
+    store.reset()
     return {"status": "reset", "message": "Database/index has been cleared."}
 
 @router.post("/admin/reindex")
@@ -45,7 +44,7 @@ def admin_reindex():
     return {"status": "reindexing", "message": "Reindexing started for project."}
 
 @router.get("/status")
-def status():
+def status(store: SQLiteLangChainVectorStore = Depends(get_store)):
     """
     .. :no-index:
 
@@ -58,17 +57,14 @@ def status():
         >>> status()
         {'status': 'ok', 'projects': 1, 'documents_indexed': 10, 'last_ingest': '...'}
     """
-    db_path = os.environ.get("RAGMS02_VECTOR_DB", ":memory:")
-    store = SQLiteLangChainVectorStore(db_path)
-    cur = store.conn.execute("SELECT COUNT(DISTINCT project_id), COUNT(*) FROM vectors")
-    projects, documents_indexed = cur.fetchone()
-    cur = store.conn.execute("SELECT MAX(rowid) FROM vectors")
+    with store.reader() as conn:
+        cur = conn.execute("SELECT COUNT(DISTINCT project_id), COUNT(*) FROM vectors")
+        projects, documents_indexed = cur.fetchone()
     last_ingest = datetime.datetime.utcnow().isoformat() + "Z"
-    store.close()
     return {"status": "ok", "projects": projects, "documents_indexed": documents_indexed, "last_ingest": last_ingest}
 
 @router.get("/projects")
-def list_projects():
+def list_projects(store: SQLiteLangChainVectorStore = Depends(get_store)):
     """
     .. :no-index:
 
@@ -81,15 +77,13 @@ def list_projects():
         >>> list_projects()
         {'projects': [{'id': 'proj1', 'documents': 5}]}
     """
-    db_path = os.environ.get("RAGMS02_VECTOR_DB", ":memory:")
-    store = SQLiteLangChainVectorStore(db_path)
-    cur = store.conn.execute("SELECT project_id, COUNT(*) FROM vectors GROUP BY project_id")
-    projects = [{"id": row[0], "documents": row[1]} for row in cur]
-    store.close()
+    with store.reader() as conn:
+        cur = conn.execute("SELECT project_id, COUNT(*) FROM vectors GROUP BY project_id")
+        projects = [{"id": row[0], "documents": row[1]} for row in cur]
     return {"projects": projects}
 
 @router.get("/projects/{project_id}/sources")
-def list_project_sources(project_id: str = Path(...)):
+def list_project_sources(project_id: str = Path(...), store: SQLiteLangChainVectorStore = Depends(get_store)):
     """
     .. :no-index:
 
@@ -105,42 +99,74 @@ def list_project_sources(project_id: str = Path(...)):
         >>> list_project_sources("proj1")
         {'sources': [{'path': 'file1.txt', 'snippet': '...'}]}
     """
-    db_path = os.environ.get("RAGMS02_VECTOR_DB", ":memory:")
-    store = SQLiteLangChainVectorStore(db_path)
-    cur = store.conn.execute("SELECT id, content FROM vectors WHERE project_id=?", (project_id,))
-    sources = [{"path": row[0], "snippet": row[1][:100]} for row in cur]
-    store.close()
+    with store.reader() as conn:
+        cur = conn.execute("SELECT id, content FROM vectors WHERE project_id=? ORDER BY file_path, chunk_index", (project_id,))
+        sources = [{"path": row[0], "snippet": row[1][:100]} for row in cur]
     return {"sources": sources}
 
 @router.get("/logs")
-def get_logs():
+def get_logs(limit: int = Query(100, ge=1, le=10000), level: Optional[str] = None):
     """
     .. :no-index:
 
-    Returns recent logs (admin only). Placeholder implementation.
+    Returns recent log records (admin only) from the in-memory ring buffer.
+
+    Records are collected once logging is configured at startup (see
+    :func:`ragms02.logs.configure_logging`); sampled-out records are not kept.
+
+    Args:
+        limit (int): Maximum number of newest records to return.
+        level (Optional[str]): Only records at or above this level (e.g. ``WARNING``).
 
     Returns:
-        dict: List of log entries.
+        dict: List of log entries, oldest first.
 
     Example:
-        >>> get_logs()
-        {'logs': [{'timestamp': '...', 'level': 'INFO', 'message': 'Ingested file ...'}]}
+        >>> get_logs(limit=1)
+        {'logs': [{'timestamp': '...', 'level': 'INFO', 'logger': 'ragms02.api', 'message': 'POST /query 200 41.2ms', 'request_id': '...'}]}
     """
-    # In a real system, fetch from a log store or file
-    return {"logs": [{"timestamp": datetime.datetime.utcnow().isoformat() + "Z", "level": "INFO", "message": "Ingested file src/grammar.dsl"}]}
+    return {"logs": LOG_BUFFER.entries(limit=limit, level=level)}
 
-@router.get("/metrics")
-def get_metrics():
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics(request: Request, store: SQLiteLangChainVectorStore = Depends(get_store)):
     """
     .. :no-index:
 
-    Returns service metrics. Placeholder implementation.
+    Returns service metrics in the Prometheus text exposition format.
+
+    Exposes per-stage latency histograms (``ragms02_stage_seconds`` with
+    ``stage`` = chunk, embed, db_write, query_embed, vector_search, llm),
+    end-to-end request latency and counts per route, ingest event and chunk
+    counters, LLM errors, ingest queue depth, cache hit ratios and sizes,
+    the database size and the number of stored chunks. Gauges are sampled
+    when the endpoint is scraped; the chunk count is only recounted after a
+    write.
 
     Returns:
-        dict: Metrics summary.
+        PlainTextResponse: Metrics as ``text/plain; version=0.0.4``.
 
     Example:
-        >>> get_metrics()
-        {'metrics': {'queries': 100, 'ingest_events': 50, 'errors': 2}}
+        >>> curl localhost:8000/metrics
+        # TYPE ragms02_stage_seconds histogram
+        ragms02_stage_seconds_bucket{stage="embed",le="0.05"} 12
     """
-    return {"metrics": {"queries": 100, "ingest_events": 50, "errors": 2}}
+    state = request.app.state
+    jobs = getattr(state, "ingest_queue", None)
+    if jobs is not None:
+        QUEUE_DEPTH.set(jobs.pending, queue="ingest")
+    cache = getattr(getattr(state, "embedder", None), "cache", None)
+    if cache is not None:
+        stats = cache.stats()
+        CACHE_HIT_RATIO.set(stats["hit_rate"], cache="embedding")
+        CACHE_ENTRIES.set(stats["entries"], cache="embedding")
+    response_cache = getattr(state, "response_cache", None)
+    if response_cache is not None:
+        stats = response_cache.stats()
+        CACHE_HIT_RATIO.set(stats["hit_rate"], cache="response")
+        CACHE_ENTRIES.set(stats["entries"], cache="response")
+    with store.reader() as conn:
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    DB_SIZE_BYTES.set(page_count * page_size)
+    DOCUMENTS.set(store.chunk_count())
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
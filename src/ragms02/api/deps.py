@@ -0,0 +1,252 @@
+"""
+Shared FastAPI dependencies.
+
+The vector store, embedder, ingest job queue and response cache are created
+once per application (see ``lifespan`` in :mod:`ragms02.main`) and handed to route
+handlers via ``Depends(get_store)``, ``Depends(get_embedder)`` and
+``Depends(get_ingest_queue)``.
+"""
+import os
+import threading
+from typing import Optional
+from fastapi import FastAPI, Request
+from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
+from ragms02.vectorstore.embedding import Embedder, get_default_embedder
+from ragms02.vectorstore.embedding_cache import CachedEmbedder, EmbeddingCache
+from ragms02.ingestion.jobs import IngestJobQueue
+from ragms02.ingestion.pipeline import MAX_FILE_SIZE, STREAM_THRESHOLD
+from ragms02.llm.response_cache import ResponseCache
+
+_store_lock = threading.Lock()
+
+
+def create_store(db_path: Optional[str] = None) -> SQLiteLangChainVectorStore:
+    """
+    Build the application vector store from environment configuration.
+
+    Environment:
+        RAGMS02_VECTOR_DB: SQLite path (default ``:memory:``).
+        RAGMS02_MATRIX_INDEX: "1" to keep per-project in-memory indexes.
+        RAGMS02_INDEX_BACKEND: Index backend ("matrix", "ivf" or "quantized"); anything but "matrix" implies an index.
+        RAGMS02_IVF_NPROBE: Cells searched per query for the "ivf" backend.
+        RAGMS02_INDEX_CODEC: Codec of the "quantized" backend: "float16", "int8" (default) or "pq".
+        RAGMS02_PQ_M: PQ sub-quantizers; must divide the embedding dimension (default 16).
+        RAGMS02_RERANK: Index candidates re-scored exactly against the stored embeddings (default 0, off).
+        RAGMS02_HYBRID: "0" disables fusing BM25 (SQLite FTS5) and vector rankings in /query.
+        RAGMS02_FTS_PREFILTER: BM25 candidates scored by the vector stage in hybrid search (default 0, off).
+        RAGMS02_RRF_K: Reciprocal-rank-fusion constant (default 60).
+        RAGMS02_LEXICAL_WEIGHT: Weight of the BM25 ranking relative to the vector ranking (default 1.0).
+        RAGMS02_READ_POOL_SIZE: Number of pooled read connections (default 4).
+        RAGMS02_SEARCH_WORKERS: Threads used to search several projects in parallel (default 8).
+        RAGMS02_EMBEDDING_STORAGE: "blob" (default) or "mmap" to keep embeddings in a memory-mapped side file.
+        RAGMS02_EMBEDDING_DTYPE: Stored embedding dtype, "float32", "float16" or "int8" (BLOB storage only).
+            Unset keeps the database's current dtype; a different value converts the stored rows in place.
+
+    Args:
+        db_path (Optional[str]): Overrides ``RAGMS02_VECTOR_DB``.
+
+    Returns:
+        SQLiteLangChainVectorStore: A new store.
+    """
+    backend = os.environ.get("RAGMS02_INDEX_BACKEND", "matrix")
+    index_params = None
+    if backend == "ivf":
+        index_params = {"nprobe": int(os.environ.get("RAGMS02_IVF_NPROBE", "8"))}
+    elif backend == "quantized":
+        index_params = {"codec": os.environ.get("RAGMS02_INDEX_CODEC", "int8")}
+        if index_params["codec"] == "pq":
+            index_params["m"] = int(os.environ.get("RAGMS02_PQ_M", "16"))
+    return SQLiteLangChainVectorStore(
+        db_path or os.environ.get("RAGMS02_VECTOR_DB", ":memory:"),
+        use_index=os.environ.get("RAGMS02_MATRIX_INDEX", "0") == "1" or backend != "matrix",
+        index_backend=backend,
+        index_params=index_params,
+        read_pool_size=int(os.environ.get("RAGMS02_READ_POOL_SIZE", "4")),
+        search_workers=int(os.environ.get("RAGMS02_SEARCH_WORKERS", "8")),
+        embedding_storage=os.environ.get("RAGMS02_EMBEDDING_STORAGE", "blob"),
+        embedding_dtype=os.environ.get("RAGMS02_EMBEDDING_DTYPE") or None,
+        rerank=int(os.environ.get("RAGMS02_RERANK", "0")),
+        hybrid=os.environ.get("RAGMS02_HYBRID", "1") != "0",
+        prefilter=int(os.environ.get("RAGMS02_FTS_PREFILTER", "0")),
+        rrf_k=int(os.environ.get("RAGMS02_RRF_K", "60")),
+        lexical_weight=float(os.environ.get("RAGMS02_LEXICAL_WEIGHT", "1.0")),
+    )
+
+
+def create_embedder(db_path: Optional[str] = None) -> Embedder:
+    """
+    Build the application embedder, wrapped in a persistent content-addressed cache.
+
+    Environment:
+        RAGMS02_EMBED_CACHE: "0" disables the embedding cache.
+        RAGMS02_EMBED_CACHE_DB: Cache database path (default ``<RAGMS02_VECTOR_DB>.embcache``).
+        RAGMS02_EMBED_CACHE_SIZE: Maximum cached embeddings (default 200000).
+
+    Args:
+        db_path (Optional[str]): Vector database path the default cache path is derived from (overrides ``RAGMS02_VECTOR_DB``).
+
+    Returns:
+        Embedder: The default embedder, cached unless disabled.
+    """
+    embedder = get_default_embedder()
+    if os.environ.get("RAGMS02_EMBED_CACHE", "1") == "0":
+        return embedder
+    db_path = db_path or os.environ.get("RAGMS02_VECTOR_DB", ":memory:")
+    cache_path = os.environ.get("RAGMS02_EMBED_CACHE_DB") or (":memory:" if db_path == ":memory:" else f"{db_path}.embcache")
+    cache = EmbeddingCache(cache_path, max_entries=int(os.environ.get("RAGMS02_EMBED_CACHE_SIZE", "200000")))
+    return CachedEmbedder(embedder, cache)
+
+
+def create_ingest_queue(store: SQLiteLangChainVectorStore, embedder: Embedder) -> IngestJobQueue:
+    """
+    Build and start the ingest job queue.
+
+    Environment:
+        RAGMS02_INGEST_WORKERS: Parallel prepare workers (default 4).
+        RAGMS02_INGEST_EXECUTOR: "thread" or "process" (default "thread").
+        RAGMS02_INGEST_MAX_PENDING: Queued events before /ingest/notify returns 429 (default 10000).
+        RAGMS02_INGEST_BATCH_SIZE: Chunks per writer transaction, and per step of a streamed file (default 512).
+        RAGMS02_INGEST_MAX_FILE_SIZE: Largest file indexed, in bytes (default 1073741824).
+        RAGMS02_INGEST_STREAM_THRESHOLD: Files larger than this many bytes are streamed (default 8388608).
+
+    Returns:
+        IngestJobQueue: A started queue.
+    """
+    jobs = IngestJobQueue(
+        store,
+        embedder,
+        workers=int(os.environ.get("RAGMS02_INGEST_WORKERS", "4")),
+        executor=os.environ.get("RAGMS02_INGEST_EXECUTOR", "thread"),
+        max_pending=int(os.environ.get("RAGMS02_INGEST_MAX_PENDING", "10000")),
+        batch_size=int(os.environ.get("RAGMS02_INGEST_BATCH_SIZE", "512")),
+        max_file_size=int(os.environ.get("RAGMS02_INGEST_MAX_FILE_SIZE", str(MAX_FILE_SIZE))),
+        stream_threshold=int(os.environ.get("RAGMS02_INGEST_STREAM_THRESHOLD", str(STREAM_THRESHOLD))),
+    )
+    jobs.start()
+    return jobs
+
+
+def create_response_cache() -> Optional[ResponseCache]:
+    """
+    Build the ``/query`` response cache from environment configuration.
+
+    Environment:
+        RAGMS02_RESPONSE_CACHE: "0" disables the response cache.
+        RAGMS02_RESPONSE_CACHE_SIZE: Maximum cached responses (default 1024).
+        RAGMS02_RESPONSE_CACHE_TTL: Seconds a response stays valid (default 3600).
+        RAGMS02_RESPONSE_CACHE_THRESHOLD: Cosine similarity for near-duplicate hits (default 0.95).
+
+    Returns:
+        Optional[ResponseCache]: A new cache, or None if disabled.
+    """
+    if os.environ.get("RAGMS02_RESPONSE_CACHE", "1") == "0":
+        return None
+    return ResponseCache(
+        max_entries=int(os.environ.get("RAGMS02_RESPONSE_CACHE_SIZE", "1024")),
+        ttl=float(os.environ.get("RAGMS02_RESPONSE_CACHE_TTL", "3600")),
+        threshold=float(os.environ.get("RAGMS02_RESPONSE_CACHE_THRESHOLD", "0.95")),
+    )
+
+
+def init_app_state(app: FastAPI) -> SQLiteLangChainVectorStore:
+    """
+    Create the application-lifetime store, embedder and ingest queue on ``app.state`` if they do not exist yet.
+
+    Args:
+        app (FastAPI): The application.
+
+    Returns:
+        SQLiteLangChainVectorStore: The application store.
+    """
+    with _store_lock:
+        store = getattr(app.state, "store", None)
+        if store is None:
+            store = app.state.store = create_store()
+        if getattr(app.state, "embedder", None) is None:
+            app.state.embedder = create_embedder()
+            store.sync_embedder(app.state.embedder)
+        if getattr(app.state, "ingest_queue", None) is None:
+            app.state.ingest_queue = create_ingest_queue(store, app.state.embedder)
+        if not hasattr(app.state, "response_cache"):
+            app.state.response_cache = create_response_cache()
+    return store
+
+
+def close_app_state(app: FastAPI) -> None:
+    """
+    Stop the ingest queue, then close the application store (persisting any loaded indexes) and the embedding cache.
+
+    Args:
+        app (FastAPI): The application.
+    """
+    with _store_lock:
+        jobs = getattr(app.state, "ingest_queue", None)
+        if jobs is not None:
+            jobs.stop()
+            app.state.ingest_queue = None
+        store = getattr(app.state, "store", None)
+        if store is not None:
+            store.close()
+            app.state.store = None
+        embedder = getattr(app.state, "embedder", None)
+        if embedder is not None:
+            if hasattr(embedder, "close"):
+                embedder.close()
+            app.state.embedder = None
+        if hasattr(app.state, "response_cache"):
+            del app.state.response_cache
+
+
+def get_store(request: Request) -> SQLiteLangChainVectorStore:
+    """
+    FastAPI dependency returning the application store, created lazily if lifespan did not run.
+
+    Example:
+        >>> @router.get("/example")
+        ... def example(store: SQLiteLangChainVectorStore = Depends(get_store)): ...
+    """
+    store = getattr(request.app.state, "store", None)
+    return store if store is not None else init_app_state(request.app)
+
+
+def get_embedder(request: Request) -> Embedder:
+    """
+    FastAPI dependency returning the application embedder (see :func:`ragms02.vectorstore.embedding.get_embedder`).
+    """
+    embedder = getattr(request.app.state, "embedder", None)
+    if embedder is None:
+        init_app_state(request.app)
+        embedder = request.app.state.embedder
+    return embedder
+
+
+def get_query_embedder(request: Request) -> Embedder:
+    """
+    FastAPI dependency returning the application embedder without the chunk cache.
+
+    Query texts are rarely repeated, so embedding them through
+    :class:`CachedEmbedder` would only fill the ingest cache and add a write
+    to every query.
+    """
+    embedder = get_embedder(request)
+    return embedder.embedder if isinstance(embedder, CachedEmbedder) else embedder
+
+
+def get_ingest_queue(request: Request) -> IngestJobQueue:
+    """
+    FastAPI dependency returning the application ingest job queue.
+    """
+    jobs = getattr(request.app.state, "ingest_queue", None)
+    if jobs is None:
+        init_app_state(request.app)
+        jobs = request.app.state.ingest_queue
+    return jobs
+
+
+def get_response_cache(request: Request) -> Optional[ResponseCache]:
+    """
+    FastAPI dependency returning the application response cache (None when disabled).
+    """
+    if not hasattr(request.app.state, "response_cache"):
+        init_app_state(request.app)
+    return request.app.state.response_cache
@@ -1,14 +1,13 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, Depends, HTTPException, Path, Response
+from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
-from ragms02.vectorstore.sqlite import VectorStore
-from ragms02.vectorstore.embedding import embed_text
-from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.schema import Document
-import base64
-import os
+from ragms02.api.deps import get_ingest_queue
+from ragms02.ingestion.jobs import IngestJobQueue, QueueFullError
+# Chunking lived in this module before the ingestion package; re-exported for existing imports
+from ragms02.ingestion.pipeline import CHUNK_SIZE, CHUNK_OVERLAP, chunk_text
+
+__all__ = ["router", "FileEvent", "IngestNotifyRequest", "ingest_notify", "ingest_job_status", "CHUNK_SIZE", "CHUNK_OVERLAP", "chunk_text"]
 
 router = APIRouter()
 
@@ -23,7 +22,8 @@ class FileEvent(BaseModel):
         event_type (str): Type of change (created, modified, deleted, moved).
         timestamp (datetime): Event time (UTC).
         uuid (Optional[str]): Optional stable file UUID.
-        hash (Optional[str]): Optional content hash.
+        hash (Optional[str]): Optional SHA-256 hex digest of the file's bytes. Files whose hash matches
+            the file manifest are not re-chunked; the server computes it when it is omitted.
         content (Optional[str]): Optional file content (base64 or text).
         storage_url (Optional[str]): Optional reference to file in shared storage.
         old_path (Optional[str]): For moved/renamed events.
@@ -56,73 +56,73 @@ class IngestNotifyRequest(BaseModel):
     project_id: str
     events: List[FileEvent]
 
-CHUNK_SIZE = 300  # characters per chunk
-CHUNK_OVERLAP = 50
-
-def chunk_text(text: str, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP):
+@router.post("/ingest/notify")
+def ingest_notify(payload: IngestNotifyRequest, response: Response, wait: bool = False, jobs: IngestJobQueue = Depends(get_ingest_queue)):
     """
     .. :no-index:
 
-    Split text into LLM-optimized chunks using LangChain's text splitter.
+    Queue file change events for ingestion (chunk, embed, and update the vector store).
+
+    Events are persisted as a job and processed by the ingest worker pool.
+    The call returns immediately with a job ID unless ``wait`` is true. Poll
+    ``/ingest/jobs/{job_id}`` for progress. Returns 429 when the queue is full.
+    A ``moved`` event with ``old_path`` re-keys the stored chunks to ``path``
+    instead of re-reading and re-embedding the file.
 
     Args:
-        text (str): The input text to split.
-        size (int): Chunk size in characters.
-        overlap (int): Overlap between chunks.
+        payload (IngestNotifyRequest): Ingestion request payload (see :class:`IngestNotifyRequest`).
+        response (Response): Outgoing response (status code is set to 202 for queued jobs).
+        wait (bool): Block until the job has finished and return its final counts.
+        jobs (IngestJobQueue): Application ingest job queue (injected).
 
     Returns:
-        List[str]: List of text chunks.
+        dict: Job ID and status; with ``wait``, also the number of processed
+        chunks/events and how many chunks were added, removed, or left unchanged.
 
     Example:
-        >>> chunk_text("This is a long document...", size=100, overlap=10)
-        ['This is a long doc...', ...]
+        >>> req = IngestNotifyRequest(project_id="proj1", events=[FileEvent(...)])
+        >>> ingest_notify(req, Response(), wait=True)
+        {'status': 'success', 'job_id': '...', 'processed': 3, 'added': 1, 'removed': 1, 'unchanged': 2}
     """
-    splitter = RecursiveCharacterTextSplitter(chunk_size=size, chunk_overlap=overlap)
-    return splitter.split_text(text)
-
-@router.post("/ingest/notify")
-def ingest_notify(payload: IngestNotifyRequest):
+    events = [event.model_dump(mode="json") for event in payload.events]
+    try:
+        job_id = jobs.submit(payload.project_id, events)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    if not wait:
+        response.status_code = 202
+        return {"status": "queued", "job_id": job_id, "events": len(events)}
+    job = jobs.wait(job_id)
+    if job["status"] != "completed":
+        raise HTTPException(status_code=500, detail=job["error"] or f"Ingest job {job['status']}")
+    return {
+        "status": "success",
+        "job_id": job_id,
+        "processed": job["processed"],
+        "added": job["added"],
+        "removed": job["removed"],
+        "unchanged": job["unchanged"],
+    }
+
+@router.get("/ingest/jobs/{job_id}")
+def ingest_job_status(job_id: str = Path(...), jobs: IngestJobQueue = Depends(get_ingest_queue)):
     """
     .. :no-index:
 
-    Ingest file change events: chunk, embed, and update vector store using LangChain.
+    Return the status and progress of an ingest job.
 
     Args:
-        payload (IngestNotifyRequest): Ingestion request payload (see :class:`IngestNotifyRequest`).
+        job_id (str): Job ID returned by ``/ingest/notify``.
+        jobs (IngestJobQueue): Application ingest job queue (injected).
 
     Returns:
-        dict: Status and number of processed chunks/events.
+        dict: Job status, event progress (``done``/``total``) and chunk counts.
 
     Example:
-        >>> req = IngestNotifyRequest(project_id="proj1", events=[FileEvent(...)])
-        >>> ingest_notify(req)
-        {'status': 'success', 'processed': 3}
+        >>> ingest_job_status("3f2a...")
+        {'job_id': '3f2a...', 'status': 'running', 'total': 10, 'done': 4, ...}
     """
-    db_path = os.environ.get("RAGMS02_VECTOR_DB", ":memory:")
-    store = SQLiteLangChainVectorStore(db_path)
-    processed = 0
-    for event in payload.events:
-        if event.event_type in ("created", "modified"):
-            content = event.content
-            if content is None and os.path.exists(event.path):
-                with open(event.path, "r", encoding="utf-8", errors="ignore") as f:
-                    content = f.read()
-            if content is not None:
-                chunks = chunk_text(content)
-                documents = []
-                embeddings = []
-                for idx, chunk in enumerate(chunks):
-                    doc_id = f"{event.path}::chunk{idx}"
-                    print(f"[DEBUG] Storing doc_id: {doc_id}, project_id: {payload.project_id}, chunk: {repr(chunk)}")
-                    documents.append(Document(page_content=chunk, metadata={"id": doc_id, "file_path": event.path}))
-                    embeddings.append(embed_text(chunk))
-                # Pass project_id as a keyword argument
-                store.add_documents(documents, embeddings, project_id=payload.project_id)
-                processed += len(documents)
-        elif event.event_type == "deleted":
-            prefix = event.uuid or event.path
-            store.conn.execute("DELETE FROM vectors WHERE id LIKE ?", (f"{prefix}::chunk%",))
-            store.conn.commit()
-            processed += 1
-    store.close()
-    return {"status": "success", "processed": processed}
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
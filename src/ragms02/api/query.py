@@ -1,14 +1,22 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
-from ragms02.llm.dispatcher import dispatch_llm
+from typing import Iterator, List, Optional, Dict, Any
+from ragms02.llm.dispatcher import adispatch_llm, dispatch_llm
 from ragms02.vectorstore.sqlite import VectorStore
-from ragms02.vectorstore.embedding import embed_text
+from ragms02.vectorstore.embedding import Embedder
 from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
+from ragms02.api.deps import get_query_embedder, get_response_cache, get_store
+from ragms02.llm.response_cache import ResponseCache
+from ragms02.metrics import STAGE_SECONDS
 from langchain.schema import Document
+import json
+import logging
 import os
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 class QueryRequest(BaseModel):
     """
@@ -52,50 +60,133 @@ class QueryResponse(BaseModel):
     confidence: Optional[float] = None
     error: Optional[str] = None
 
+def _retrieve(payload: QueryRequest, store: SQLiteLangChainVectorStore, embedder: Embedder, query_emb=None):
+    """
+    Search every listed project and return ``(sources, context_chunks)``.
+    """
+    sources = []
+    context_chunks = []
+    if payload.projects:
+        if query_emb is None:
+            with STAGE_SECONDS.time(stage="query_embed"):
+                query_emb = embedder.embed(payload.query)
+        # All listed projects are searched in parallel and merged into one top-k
+        with STAGE_SECONDS.time(stage="vector_search"):
+            docs = store.search_projects(query_emb, payload.projects, k=5, query=payload.query)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Retrieved %d docs from %s: %s", len(docs), payload.projects, [(doc.metadata.get("id"), doc.metadata.get("score")) for doc in docs])
+        for doc in docs:
+            sources.append({"id": doc.metadata.get("id"), "project_id": doc.metadata.get("project_id"), "score": doc.metadata.get("score"), "snippet": doc.page_content})
+            context_chunks.append(doc.page_content)
+    return sources, context_chunks
+
+def _cache_lookup(payload: QueryRequest, store: SQLiteLangChainVectorStore, embedder: Embedder, cache: ResponseCache):
+    with STAGE_SECONDS.time(stage="query_embed"):
+        query_emb = embedder.embed(payload.query)
+    key = cache.key(payload.model, payload.projects, {p: store.version(p) for p in set(payload.projects)})
+    cached, similarity = cache.get(key, payload.query, query_emb)
+    return query_emb, key, cached, similarity
+
 @router.post("/query", response_model=QueryResponse)
-def query_llm(payload: QueryRequest):
+async def query_llm(payload: QueryRequest, response: Response, store: SQLiteLangChainVectorStore = Depends(get_store), embedder: Embedder = Depends(get_query_embedder), cache: Optional[ResponseCache] = Depends(get_response_cache)):
     """
     .. :no-index:
 
-    Retrieve similar docs using LangChain vector store and assemble context for LLM.
+    Retrieve similar docs from every listed project and assemble context for the LLM.
+
+    Projects are searched in parallel; per-project scores are normalised and
+    merged into a global top-k (see :meth:`SQLiteLangChainVectorStore.search_projects`).
+    Unless ``RAGMS02_HYBRID=0``, each project's BM25 and vector rankings are
+    fused first, so exact identifiers in the question are matched lexically.
+    Retrieval runs in the threadpool; the LLM call is awaited on the pooled
+    async provider clients, so waiting on the model does not hold a worker thread.
+
+    Successful answers are kept in the response cache. A repeated or
+    near-identical question against unchanged projects is answered from the
+    cache without retrieval or an LLM call. The ``X-Cache`` header is ``HIT``
+    or ``MISS``, and ``X-Cache-Similarity`` gives the match similarity.
 
     Args:
         payload (QueryRequest): Query request payload (see :class:`QueryRequest`).
+        response (Response): Outgoing response (cache headers are set on it).
+        store (SQLiteLangChainVectorStore): Application vector store (injected).
+        embedder (Embedder): Uncached application embedder (injected).
+        cache (Optional[ResponseCache]): Application response cache, None if disabled (injected).
 
     Returns:
         QueryResponse: LLM response and supporting sources (see :class:`QueryResponse`).
 
     Example:
         >>> req = QueryRequest(query="What is RAG?", projects=["proj1"])
-        >>> query_llm(req)
+        >>> await query_llm(req, Response())
         QueryResponse(response="RAG stands for...", sources=[...])
     """
-    db_path = os.environ.get("RAGMS02_VECTOR_DB", ":memory:")
-    store = SQLiteLangChainVectorStore(db_path)
-    project_id = payload.projects[0] if payload.projects else None
-    sources = []
-    context_chunks = []
-    if project_id:
-        query_emb = embed_text(payload.query)
-        docs = store.similarity_search(
-            query="",  # not used, expects embedding in filter
-            k=5,
-            filter={"embedding": query_emb, "project_id": project_id}
-        )
-        print("[DEBUG] Retrieved docs:")
-        for doc in docs:
-            print(f"[DEBUG] id: {doc.metadata.get('id')}, score: {doc.metadata.get('score')}, snippet: {doc.page_content}")
-        for doc in docs:
-            sources.append({"id": doc.metadata.get("id"), "score": doc.metadata.get("score"), "snippet": doc.page_content})
-            context_chunks.append(doc.page_content)
-    store.close()
+    query_emb = key = None
+    if cache is not None:
+        query_emb, key, cached, similarity = await run_in_threadpool(_cache_lookup, payload, store, embedder, cache)
+        if cached is not None:
+            response.headers["X-Cache"] = "HIT"
+            response.headers["X-Cache-Similarity"] = f"{similarity:.4f}"
+            return cached
+        response.headers["X-Cache"] = "MISS"
+    sources, context_chunks = await run_in_threadpool(_retrieve, payload, store, embedder, query_emb)
     context = "\n".join(context_chunks)
     try:
-        llm_response = dispatch_llm(
+        llm_response = await adispatch_llm(
             payload.query + "\nContext:\n" + context,
             context=context_chunks,
             model=payload.model
         )
-        return QueryResponse(response=llm_response, sources=sources)
     except Exception as e:
+        logger.warning("LLM call failed for model %s: %s", payload.model, e)
         return QueryResponse(response="", error=str(e))
+    result = QueryResponse(response=llm_response, sources=sources)
+    if cache is not None:
+        cache.put(key, payload.query, query_emb, result)
+    return result
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/query/stream")
+def query_llm_stream(payload: QueryRequest, store: SQLiteLangChainVectorStore = Depends(get_store), embedder: Embedder = Depends(get_query_embedder)):
+    """
+    .. :no-index:
+
+    Stream an LLM answer as Server-Sent Events.
+
+    The retrieved sources are sent first (``event: sources``), then each
+    response fragment as it is generated (``event: token`` with
+    ``{"text": ...}``), and finally ``event: done``. Provider failures are
+    reported as ``event: error`` with ``{"error": ...}``.
+
+    Args:
+        payload (QueryRequest): Query request payload (see :class:`QueryRequest`).
+        store (SQLiteLangChainVectorStore): Application vector store (injected).
+        embedder (Embedder): Uncached application embedder (injected).
+
+    Returns:
+        StreamingResponse: A ``text/event-stream`` response.
+
+    Example:
+        >>> curl -N -X POST localhost:8000/query/stream -d '{"query": "What is RAG?", "projects": ["proj1"]}'
+        event: sources
+        data: [{"id": "docs/rag.md::chunk0", ...}]
+        event: token
+        data: {"text": "RAG stands"}
+    """
+    sources, context_chunks = _retrieve(payload, store, embedder)
+    context = "\n".join(context_chunks)
+
+    def events() -> Iterator[str]:
+        yield _sse("sources", sources)
+        try:
+            for token in dispatch_llm(payload.query + "\nContext:\n" + context, context=context_chunks, model=payload.model, stream=True):
+                yield _sse("token", {"text": token})
+        except Exception as e:
+            logger.warning("LLM stream failed for model %s: %s", payload.model, e)
+            yield _sse("error", {"error": str(e)})
+            return
+        yield _sse("done", {})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,228 @@
+"""
+Parallel bulk loader for the initial ingestion of a directory tree.
+
+Used by ``python -m ragms02 ingest <dir>``. The tree is walked once with
+``.ragignore`` pruning (ignored directories are never descended into).
+Files whose size and mtime match the store's file manifest (see
+:meth:`SQLiteLangChainVectorStore.file_state`) are skipped without being
+opened. The rest are read, hashed and chunked in a process
+pool; binaries are detected there and skipped. The main process embeds the
+chunks of each batch of files in one call and writes the batch straight to
+the store in one transaction, together with the manifest rows.
+"""
+import os
+import stat
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+from ragms02.ingestion.pipeline import chunk_text, file_hash
+from ragms02.ingestion.streaming import BINARY_SNIFF_BYTES, detect_encoding
+from ragms02.metrics import STAGE_SECONDS
+from ragms02.vectorstore.embedding import Embedder
+from ragms02.vectorstore.embedding_cache import content_hash
+from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
+from ragms02.watcher.ignore_utils import IgnoreRules, iter_tree
+
+
+def walk_files(root: str, ignore_file: Optional[str] = None) -> Iterator[Tuple[str, str, os.stat_result]]:
+    """
+    Yield the files under ``root`` that ``.ragignore`` does not exclude.
+
+    Nested ``.ragignore`` files apply to their own subtree. Ignored directories
+    are pruned, so their contents are never listed.
+
+    Args:
+        root (str): Directory to walk.
+        ignore_file (Optional[str]): Ignore file, relative to ``root`` (default ``.ragignore``).
+
+    Yields:
+        Tuple[str, str, os.stat_result]: POSIX path relative to ``root``, absolute path and stat result.
+    """
+    for rel_path, entry, ignored in iter_tree(root, IgnoreRules(root, ignore_file)):
+        if ignored:
+            continue
+        try:
+            st = entry.stat(follow_symlinks=True)
+        except OSError:
+            continue
+        if stat.S_ISREG(st.st_mode):
+            yield rel_path, os.path.abspath(entry.path), st
+
+
+def read_file(rel_path: str, abs_path: str) -> dict:
+    """
+    Read, hash and chunk one file. Runs in a worker process.
+
+    Args:
+        rel_path (str): Project-relative path (stored as the chunks' file path).
+        abs_path (str): Path to read.
+
+    Returns:
+        dict: ``path``, ``hash`` and ``chunks`` (None for binary or unreadable files).
+    """
+    try:
+        with open(abs_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return {"path": rel_path, "hash": None, "chunks": None}
+    digest = file_hash(data)
+    # Sniffed like the API does, so both decode (and chunk) a file the same way
+    encoding = detect_encoding(data[:BINARY_SNIFF_BYTES])
+    if encoding is None:
+        return {"path": rel_path, "hash": digest, "chunks": None}
+    return {"path": rel_path, "hash": digest, "chunks": chunk_text(data.decode(encoding, errors="ignore"))}
+
+
+def bulk_ingest(
+    store: SQLiteLangChainVectorStore,
+    embedder: Embedder,
+    root: str,
+    project_id: str,
+    workers: Optional[int] = None,
+    executor: str = "process",
+    batch_size: int = 2048,
+    ignore_file: Optional[str] = None,
+    force: bool = False,
+    prune: bool = False,
+    max_file_size: int = 10 * 1024 * 1024,
+) -> Dict[str, float]:
+    """
+    Ingest every non-ignored text file under ``root`` into a project.
+
+    Args:
+        store (SQLiteLangChainVectorStore): Vector store.
+        embedder (Embedder): Embedder for new chunks.
+        root (str): Directory to ingest.
+        project_id (str): Project identifier.
+        workers (Optional[int]): Reader processes (default ``os.cpu_count()``).
+        executor (str): "process" (default) or "thread".
+        batch_size (int): Chunks embedded and written per transaction.
+        ignore_file (Optional[str]): Ignore file, relative to ``root`` (default ``.ragignore``).
+        force (bool): Re-read every file even if the manifest says it is unchanged.
+        prune (bool): Delete stored files that no longer exist under ``root``.
+        max_file_size (int): Files larger than this many bytes are skipped, and anything stored for them is deleted.
+
+    Returns:
+        Dict[str, float]: ``files`` (seen), ``read``, ``unchanged``, ``binary``, ``skipped`` (too large
+        or unreadable), ``ingested``, ``deleted``, ``chunks``, ``added``, ``removed``, ``seconds``,
+        ``files_per_s`` and ``chunks_per_s``.
+
+    Example:
+        >>> stats = bulk_ingest(store, embedder, "./my_project", "my-project")
+        >>> stats["files_per_s"]
+        412.7
+    """
+    if executor not in ("thread", "process"):
+        raise ValueError(f"Unknown executor: {executor}")
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    stats = dict.fromkeys(("files", "read", "unchanged", "binary", "skipped", "ingested", "deleted", "chunks", "added", "removed"), 0)
+    manifest = store.file_manifest(project_id)
+
+    seen = set()
+    dropped: List[str] = []
+    stat_by_path: Dict[str, os.stat_result] = {}
+    batch: List[dict] = []
+    batch_chunks = 0
+
+    def flush() -> None:
+        nonlocal batch, batch_chunks
+        if batch:
+            _write_batch(store, embedder, project_id, batch, stat_by_path, stats)
+            for loaded in batch:
+                stat_by_path.pop(loaded["path"], None)
+        batch, batch_chunks = [], 0
+
+    pool_cls = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    with pool_cls(max_workers=workers) as pool:
+        in_flight = set()
+
+        def collect(done) -> None:
+            nonlocal batch_chunks
+            for future in done:
+                loaded = future.result()
+                stats["read"] += 1
+                if loaded["hash"] is None:
+                    stats["skipped"] += 1
+                    stat_by_path.pop(loaded["path"], None)
+                    continue
+                previous = manifest.get(loaded["path"])
+                if loaded["chunks"] is None:
+                    # Binaries get a manifest row (so the next run skips them by mtime) and no chunks
+                    stats["binary"] += 1
+                    loaded["chunks"], loaded["binary"] = [], True
+                elif previous and previous[2] == loaded["hash"] and not force:
+                    # Touched but not changed: only the manifest's mtime needs updating
+                    stats["unchanged"] += 1
+                    loaded["unchanged"] = True
+                else:
+                    batch_chunks += len(loaded["chunks"])
+                batch.append(loaded)
+                if batch_chunks >= batch_size or len(batch) >= batch_size:
+                    flush()
+
+        for rel_path, abs_path, st in walk_files(root, ignore_file):
+            stats["files"] += 1
+            seen.add(rel_path)
+            if st.st_size > max_file_size:
+                stats["skipped"] += 1
+                if rel_path in manifest:
+                    # Grown past the limit: drop what was stored, as for a deleted file
+                    dropped.append(rel_path)
+                continue
+            previous = manifest.get(rel_path)
+            if not force and previous and previous[:2] == (st.st_size, st.st_mtime_ns):
+                stats["unchanged"] += 1
+                continue
+            stat_by_path[rel_path] = st
+            in_flight.add(pool.submit(read_file, rel_path, abs_path))
+            # Bound the read-ahead so chunked files never pile up faster than they are embedded
+            if len(in_flight) >= workers * 4:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+        collect(in_flight)
+    flush()
+
+    removed = dropped + (sorted(set(manifest) - seen) if prune else [])
+    if removed:
+        with store.writer():
+            for path in removed:
+                store.delete_file(project_id, path)
+        stats["deleted"] = len(removed)
+
+    seconds = time.perf_counter() - start
+    stats["seconds"] = seconds
+    stats["files_per_s"] = stats["files"] / seconds if seconds else 0.0
+    stats["chunks_per_s"] = stats["chunks"] / seconds if seconds else 0.0
+    return stats
+
+
+def _write_batch(store: SQLiteLangChainVectorStore, embedder: Embedder, project_id: str, batch: List[dict], stat_by_path: Dict[str, os.stat_result], stats: Dict[str, float]) -> None:
+    """
+    Embed the new chunks of a batch of files in one call and write them in one transaction.
+    """
+    texts: Dict[str, str] = {}
+    for loaded in batch:
+        if not loaded.get("unchanged"):
+            # Advisory check through a read connection; sync_file re-diffs under the writer lock
+            stored = store.stored_hashes(project_id, loaded["path"])
+            for chunk in loaded["chunks"]:
+                digest = content_hash(chunk)
+                if digest not in stored:
+                    texts.setdefault(digest, chunk)
+    embeddings = {}
+    if texts:
+        with STAGE_SECONDS.time(stage="embed"):
+            embeddings = dict(zip(texts, embedder.embed_batch(list(texts.values()))))
+    with STAGE_SECONDS.time(stage="db_write"), store.writer():
+        for loaded in batch:
+            st = stat_by_path[loaded["path"]]
+            chunks = None
+            if not loaded.get("unchanged"):
+                counts = store.sync_file(project_id, loaded["path"], loaded["chunks"], embedder, embeddings)
+                stats["ingested"] += not loaded.get("binary")
+                stats["chunks"] += counts["processed"]
+                stats["added"] += counts["added"]
+                stats["removed"] += counts["removed"]
+                chunks = counts["processed"]
+            store.record_file(project_id, loaded["path"], loaded["hash"], size=st.st_size, mtime_ns=st.st_mtime_ns, chunks=chunks)
@@ -0,0 +1,328 @@
+"""
+Persistent ingestion job queue.
+
+``/ingest/notify`` submits events as a job and returns immediately. A
+dispatcher thread fans each job's events out to a worker pool that reads,
+chunks and embeds them in parallel. A single writer thread then applies the
+prepared events in order, grouping them into batched transactions. Jobs are
+stored in the ``ingest_jobs`` table, so unfinished jobs resume after a
+restart.
+"""
+import json
+import logging
+import queue
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+from ragms02.ingestion.pipeline import MAX_FILE_SIZE, STREAM_THRESHOLD, apply_event, embed_new_chunks, load_event
+from ragms02.metrics import INGEST_CHUNKS, INGEST_EVENTS, STAGE_SECONDS
+from ragms02.vectorstore.embedding import Embedder
+from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class QueueFullError(Exception):
+    """
+    Raised when a job is submitted while the queue is at capacity.
+    """
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+class IngestJobQueue:
+    """
+    Bounded, persistent job queue with a parallel prepare stage and a single batched writer.
+
+    Example:
+        >>> jobs = IngestJobQueue(store, embedder, workers=4)
+        >>> jobs.start()
+        >>> job_id = jobs.submit("proj1", [{"path": "a.py", "event_type": "created", "content": "x = 1"}])
+        >>> jobs.wait(job_id)["status"]
+        'completed'
+    """
+
+    def __init__(self, store: SQLiteLangChainVectorStore, embedder: Embedder, workers: int = 4, executor: str = "thread", max_pending: int = 10000, batch_size: int = 512, max_file_size: int = MAX_FILE_SIZE, stream_threshold: int = STREAM_THRESHOLD):
+        """
+        Initialize the queue.
+
+        Args:
+            store (SQLiteLangChainVectorStore): Vector store (also holds the ``ingest_jobs`` table).
+            embedder (Embedder): Embedder used by the workers.
+            workers (int): Number of parallel prepare workers.
+            executor (str): "thread", or "process" to read and chunk files in a process pool.
+            max_pending (int): Maximum number of queued events before :class:`QueueFullError` is raised.
+            batch_size (int): Chunks per writer transaction, and per embed/write step of a streamed file.
+            max_file_size (int): Largest file indexed, in bytes; larger ones are skipped.
+            stream_threshold (int): Files larger than this many bytes are streamed by the writer in
+                ``batch_size`` steps instead of being chunked up front.
+        """
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown executor: {executor}")
+        self.store = store
+        self.embedder = embedder
+        self.workers = workers
+        self.executor = executor
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.max_file_size = max_file_size
+        self.stream_threshold = stream_threshold
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._writes: "queue.Queue" = queue.Queue(maxsize=workers * 4)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._done: Dict[str, threading.Event] = {}
+        self._threads: List[threading.Thread] = []
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        with store.writer() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ingest_jobs (
+                    id TEXT PRIMARY KEY,
+                    project_id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    events TEXT NOT NULL,
+                    total INTEGER NOT NULL,
+                    done INTEGER NOT NULL DEFAULT 0,
+                    processed INTEGER NOT NULL DEFAULT 0,
+                    added INTEGER NOT NULL DEFAULT 0,
+                    removed INTEGER NOT NULL DEFAULT 0,
+                    unchanged INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+
+    @property
+    def pending(self) -> int:
+        """int: Number of submitted events not yet written."""
+        return self._pending
+
+    def start(self) -> None:
+        """
+        Start the worker pool, dispatcher and writer threads, and resume unfinished jobs.
+        """
+        if self._threads:
+            return
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ragms02-ingest")
+        if self.executor == "process":
+            self._process_pool = ProcessPoolExecutor(max_workers=self.workers)
+        with self.store.reader() as conn:
+            rows = conn.execute("SELECT id, total FROM ingest_jobs WHERE status IN ('queued', 'running') ORDER BY created_at").fetchall()
+        for job_id, total in rows:
+            # Re-applying events is idempotent (chunks are diffed by content hash), so resumed jobs restart from scratch
+            self._done[job_id] = threading.Event()
+            self._pending += total
+            self._jobs.put(job_id)
+        self._threads = [
+            threading.Thread(target=self._dispatch_loop, name="ragms02-ingest-dispatch", daemon=True),
+            threading.Thread(target=self._write_loop, name="ragms02-ingest-writer", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: Optional[float] = 10.0) -> None:
+        """
+        Stop after the jobs already dispatched have been written. Queued jobs stay persisted.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait for each thread.
+        """
+        if not self._threads:
+            return
+        self._jobs.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, project_id: str, events: List[dict]) -> str:
+        """
+        Persist a job and queue it for processing.
+
+        Args:
+            project_id (str): Project identifier.
+            events (List[dict]): JSON-serialisable file events.
+
+        Returns:
+            str: The job ID.
+
+        Raises:
+            QueueFullError: If accepting the job would exceed ``max_pending`` events.
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            if self._pending and self._pending + len(events) > self.max_pending:
+                raise QueueFullError(f"Ingest queue is full ({self._pending} events pending).")
+            self._pending += len(events)
+            self._done[job_id] = threading.Event()
+        now = _now()
+        with self.store.writer() as conn:
+            conn.execute(
+                "INSERT INTO ingest_jobs (id, project_id, status, events, total, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, project_id, json.dumps(events), len(events), now, now),
+            )
+        self._jobs.put(job_id)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """
+        Return a job's status and progress.
+
+        Args:
+            job_id (str): Job ID.
+
+        Returns:
+            Optional[dict]: Job fields, or None if unknown.
+        """
+        with self.store.reader() as conn:
+            row = conn.execute(
+                "SELECT id, project_id, status, total, done, processed, added, removed, unchanged, error, created_at, updated_at FROM ingest_jobs WHERE id=?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("job_id", "project_id", "status", "total", "done", "processed", "added", "removed", "unchanged", "error", "created_at", "updated_at")
+        return dict(zip(keys, row))
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[dict]:
+        """
+        Block until a job finishes (or the timeout expires) and return its status.
+
+        Args:
+            job_id (str): Job ID.
+            timeout (Optional[float]): Seconds to wait.
+
+        Returns:
+            Optional[dict]: Job fields, or None if unknown.
+        """
+        done = self._done.get(job_id)
+        if done is not None:
+            done.wait(timeout)
+        return self.get(job_id)
+
+    def _prepare(self, project_id: str, event: dict) -> dict:
+        if event["event_type"] != "deleted":
+            # Lets load_event skip files whose manifest entry shows they have not changed
+            event = dict(event, stored=self.store.file_state(project_id, event["path"]))
+        # Timed here rather than in load_event so process-pool chunking is counted too
+        with STAGE_SECONDS.time(stage="chunk"):
+            if self._process_pool is not None:
+                loaded = self._process_pool.submit(load_event, event, self.max_file_size, self.stream_threshold).result()
+            else:
+                loaded = load_event(event, self.max_file_size, self.stream_threshold)
+        return embed_new_chunks(self.store, self.embedder, project_id, loaded)
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            job_id = self._jobs.get()
+            if job_id is _STOP:
+                self._writes.put(_STOP)
+                return
+            with self.store.reader() as conn:
+                project_id, events = conn.execute("SELECT project_id, events FROM ingest_jobs WHERE id=?", (job_id,)).fetchone()
+            events = json.loads(events)
+            with self.store.writer() as conn:
+                conn.execute(
+                    "UPDATE ingest_jobs SET status='running', done=0, processed=0, added=0, removed=0, unchanged=0, error=NULL, updated_at=? WHERE id=?",
+                    (_now(), job_id),
+                )
+            futures = [self._pool.submit(self._prepare, project_id, event) for event in events]
+            if not futures:
+                self._writes.put((job_id, project_id, None, True))
+            for i, future in enumerate(futures):
+                self._writes.put((job_id, project_id, future, i == len(futures) - 1))
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._writes.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            chunks = 0
+            # Group whatever is already prepared into one transaction
+            while chunks < self.batch_size:
+                try:
+                    nxt = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    self._writes.put(_STOP)
+                    break
+                batch.append(nxt)
+                future = nxt[2]
+                if future is not None and future.done() and not future.exception():
+                    chunks += len(future.result().get("chunks") or [])
+            self._apply_batch(batch)
+
+    def _apply_batch(self, batch: List[tuple]) -> None:
+        progress: Dict[str, Dict[str, int]] = {}
+        errors: Dict[str, str] = {}
+        finished = []
+        for job_id, _, _, last in batch:
+            progress.setdefault(job_id, {"done": 0, "processed": 0, "added": 0, "removed": 0, "unchanged": 0})
+            if last:
+                finished.append(job_id)
+        # Resolve every prepared event before taking the writer lock: workers may need a
+        # read connection, which is the writer connection for in-memory stores.
+        prepared = []
+        for job_id, project_id, future, _ in batch:
+            if future is None:
+                continue
+            try:
+                prepared.append((job_id, project_id, future.result(), None))
+            except Exception as e:
+                prepared.append((job_id, project_id, None, e))
+        try:
+            with STAGE_SECONDS.time(stage="db_write"), self.store.writer() as conn:
+                for job_id, project_id, loaded, error in prepared:
+                    stats = progress[job_id]
+                    try:
+                        if error is not None:
+                            raise error
+                        counts = apply_event(self.store, self.embedder, project_id, loaded, batch_size=self.batch_size, max_file_size=self.max_file_size)
+                    except Exception as e:
+                        logger.exception("Ingest job %s: event failed", job_id)
+                        errors.setdefault(job_id, str(e))
+                        counts = {}
+                    event_type = loaded["event_type"] if loaded else "unknown"
+                    INGEST_EVENTS.inc(event_type=event_type, outcome="ok" if counts else "error")
+                    stats["done"] += 1
+                    for key, value in counts.items():
+                        stats[key] += value
+                        if key != "processed" and value:
+                            INGEST_CHUNKS.inc(value, result=key)
+                now = _now()
+                for job_id, stats in progress.items():
+                    conn.execute(
+                        "UPDATE ingest_jobs SET done=done+?, processed=processed+?, added=added+?, removed=removed+?, unchanged=unchanged+?, "
+                        "error=COALESCE(error, ?), updated_at=? WHERE id=?",
+                        (stats["done"], stats["processed"], stats["added"], stats["removed"], stats["unchanged"], errors.get(job_id), now, job_id),
+                    )
+                for job_id in finished:
+                    conn.execute(
+                        "UPDATE ingest_jobs SET status=CASE WHEN error IS NULL THEN 'completed' ELSE 'failed' END, updated_at=? WHERE id=?",
+                        (now, job_id),
+                    )
+        except Exception as e:
+            logger.exception("Ingest writer transaction failed")
+            with self.store.writer() as conn:
+                for job_id in progress:
+                    conn.execute("UPDATE ingest_jobs SET status='failed', error=?, updated_at=? WHERE id=?", (str(e), _now(), job_id))
+            finished = list(progress)
+        finally:
+            with self._lock:
+                self._pending -= sum(1 for _, _, future, _ in batch if future is not None)
+            for job_id in finished:
+                done = self._done.pop(job_id, None)
+                if done is not None:
+                    done.set()
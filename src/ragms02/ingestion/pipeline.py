@@ -0,0 +1,361 @@
+"""
+Ingestion pipeline stages shared by the job queue and bulk loaders.
+
+Stages:
+    1. :func:`load_event` reads and chunks a file (safe to run in worker threads or processes).
+    2. :func:`embed_new_chunks` diffs the chunks against the store and embeds only new ones.
+    3. :func:`apply_event` re-diffs under the writer lock and applies the change.
+
+Files above a size threshold skip the first two stages: :func:`apply_event`
+streams them through :mod:`ragms02.ingestion.streaming` and :func:`iter_chunks`
+in bounded memory.
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from ragms02.metrics import STAGE_SECONDS
+from ragms02.ingestion.streaming import hash_file, iter_file_text, iter_lines, iter_text_pieces, sniff_file
+from ragms02.vectorstore.embedding import Embedder
+from ragms02.vectorstore.embedding_cache import content_hash
+from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
+import hashlib
+import os
+import re
+import zlib
+
+CHUNK_SIZE = 300  # characters per chunk
+CHUNK_OVERLAP = 50
+ANCHOR_MODULUS = 4  # on average one in four lines may end a chunk
+MAX_FILE_SIZE = 1024 * 1024 * 1024  # larger files are not indexed
+STREAM_THRESHOLD = 8 * 1024 * 1024  # larger files are chunked and written in batches by apply_event
+
+_LEADING_BLANK_LINES = re.compile(r"^(?:[ \t]*\r?\n)+")
+
+
+def _is_anchor(line: str) -> bool:
+    return zlib.crc32(line.strip().encode("utf-8")) % ANCHOR_MODULUS == 0
+
+
+def chunk_text(text: str, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """
+    Split text into LLM-optimized chunks with content-defined boundaries.
+
+    See :func:`iter_chunks` for the boundary rules.
+
+    Args:
+        text (str): The input text to split.
+        size (int): Chunk size in characters.
+        overlap (int): Overlap between chunks.
+
+    Returns:
+        List[str]: List of text chunks.
+
+    Example:
+        >>> chunk_text("This is a long document...", size=100, overlap=10)
+        ['This is a long doc...', ...]
+    """
+    return list(iter_chunks(text.splitlines(keepends=True), size, overlap))
+
+
+def iter_chunks(lines: Iterable[str], size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> Iterator[str]:
+    """
+    Lazily split a stream of lines into chunks with content-defined boundaries.
+
+    Lines are packed into chunks of at most ``size`` characters. Once a chunk
+    is at least half full it is also closed after any "anchor" line, chosen
+    by a hash of the line's content. Boundaries therefore depend only on
+    nearby lines, so an edit changes the chunks around it but not the rest
+    of the file, and unchanged chunks keep their content hash (see the
+    embedding cache). Each chunk starts with the trailing lines of the
+    previous one, up to ``overlap`` characters. Lines longer than ``size``
+    are split with LangChain's text splitter. Only the lines of the current
+    chunk are held in memory, so a file streamed through
+    :func:`ragms02.ingestion.streaming.iter_lines` is chunked in bounded memory,
+    with the same chunks as :func:`chunk_text` on the whole text.
+
+    Args:
+        lines (Iterable[str]): Lines with their line endings, in order.
+        size (int): Chunk size in characters.
+        overlap (int): Overlap between chunks.
+
+    Yields:
+        str: Chunks, in order.
+
+    Example:
+        >>> chunks = iter_chunks(iter_lines(iter_file_text("dump.sql", "utf-8")))
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size=size, chunk_overlap=overlap)
+    current: List[str] = []
+    length = 0
+
+    def flush() -> List[str]:
+        nonlocal current, length
+        piece = "".join(current)
+        chunks: List[str] = []
+        if len(piece) > size:
+            chunks = splitter.split_text(piece)
+        elif piece.strip():
+            # Keep leading indentation; only surrounding blank lines and trailing whitespace are dropped
+            chunks = [_LEADING_BLANK_LINES.sub("", piece).rstrip()]
+        # Carry trailing lines forward as overlap for the next chunk
+        carry: List[str] = []
+        carried = 0
+        for line in reversed(current):
+            if carried + len(line) > overlap:
+                break
+            carry.insert(0, line)
+            carried += len(line)
+        current, length = carry, carried
+        return chunks
+
+    fresh = 0
+    for line in lines:
+        if fresh and length + len(line) > size:
+            yield from flush()
+            fresh = 0
+        current.append(line)
+        length += len(line)
+        fresh += 1
+        if length >= size // 2 and _is_anchor(line):
+            yield from flush()
+            fresh = 0
+    if fresh:
+        yield from flush()
+
+
+def file_hash(data: bytes) -> str:
+    """
+    Return the content hash recorded in the file manifest: the SHA-256 hex digest of the file's bytes.
+
+    Args:
+        data (bytes): File content (text sent by a client is hashed as UTF-8).
+
+    Returns:
+        str: Hex digest.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def text_digest(text: str) -> Tuple[str, int]:
+    """
+    Return :func:`file_hash` of text encoded as UTF-8, and the encoded size, without encoding it all at once.
+
+    Args:
+        text (str): Text sent by a client.
+
+    Returns:
+        Tuple[str, int]: Hex digest and size in bytes.
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    for piece in iter_text_pieces(text):
+        data = piece.encode("utf-8")
+        hasher.update(data)
+        size += len(data)
+    return hasher.hexdigest(), size
+
+
+def load_event(event: dict, max_file_size: int = MAX_FILE_SIZE, stream_threshold: int = STREAM_THRESHOLD) -> dict:
+    """
+    Read and chunk the content for one file event.
+
+    This stage has no store access, so it can run in a process pool. The
+    caller may pass the file's manifest entry as ``stored`` (see
+    :meth:`SQLiteLangChainVectorStore.file_state`). A file whose size and
+    mtime, or whose hash (sent by the client, or computed here from the
+    content), match it is not chunked; it is marked ``unchanged`` instead.
+    A ``moved`` event with an ``old_path`` is not read: its stored chunks are
+    re-keyed instead. Only content sent with it (a move that also changed the
+    file) is chunked.
+
+    Files are sniffed before they are read: binaries and files larger than
+    ``max_file_size`` are marked ``skipped``. Content larger than
+    ``stream_threshold`` bytes is not chunked here but marked ``stream``;
+    :func:`apply_event` then reads, chunks, embeds and writes it in batches.
+
+    Args:
+        event (dict): File event fields (see :class:`ragms02.api.ingest.FileEvent`), plus the optional ``stored``.
+        max_file_size (int): Largest file indexed, in bytes.
+        stream_threshold (int): Size in bytes above which a file is streamed.
+
+    Returns:
+        dict: The event fields plus ``chunks`` (None when there is nothing to index), ``hash``,
+        ``size`` and ``mtime_ns`` when known, and the ``unchanged``, ``stream`` and ``skipped`` flags.
+
+    Example:
+        >>> loaded = load_event({"path": "docs/file.txt", "event_type": "created", "content": "hello"})
+        >>> loaded["chunks"]
+        ['hello']
+    """
+    loaded = dict(event, chunks=None, unchanged=False, stream=False, skipped=False)
+    stored = loaded.pop("stored", None)
+    content = event.get("content")
+    digest = event.get("hash")
+    path = event["path"]
+    if event["event_type"] == "moved" and event.get("old_path"):
+        if content is None:
+            loaded.pop("content", None)
+            return loaded
+    elif event["event_type"] not in ("created", "modified", "moved"):
+        loaded.pop("content", None)
+        return loaded
+    elif content is None and not (stored and digest == stored["hash"]) and os.path.exists(path):
+        st = os.stat(path)
+        loaded["size"], loaded["mtime_ns"] = st.st_size, st.st_mtime_ns
+        if stored and (stored["size"], stored["mtime_ns"]) == (st.st_size, st.st_mtime_ns):
+            digest = stored["hash"]
+        else:
+            encoding = sniff_file(path) if st.st_size <= max_file_size else None
+            if encoding is None:
+                # Binary or too large: apply_event drops whatever is stored for it
+                loaded["skipped"] = True
+                return loaded
+            if st.st_size > stream_threshold:
+                loaded["stream"] = True
+                # Hashing is a streamed read too; only worth it if there is a manifest entry to compare with
+                digest = hash_file(path) if stored else None
+            else:
+                with open(path, "rb") as f:
+                    data = f.read()
+                digest = file_hash(data)
+                content = data.decode(encoding, errors="ignore")
+    elif content is not None:
+        computed, loaded["size"] = text_digest(content)
+        digest = digest or computed
+        if loaded["size"] > max_file_size:
+            loaded["skipped"] = True
+            loaded.pop("content")
+            return loaded
+        loaded["stream"] = loaded["size"] > stream_threshold
+    loaded["hash"] = digest
+    if stored and digest is not None and digest == stored["hash"]:
+        # Unchanged since it was last ingested; apply_event re-checks under the writer lock
+        loaded["unchanged"] = True
+        return loaded
+    if loaded["stream"]:
+        return loaded
+    if content is not None:
+        loaded["chunks"] = chunk_text(content)
+    loaded.pop("content", None)
+    return loaded
+
+
+def embed_new_chunks(store: SQLiteLangChainVectorStore, embedder: Embedder, project_id: str, loaded: dict) -> dict:
+    """
+    Embed the chunks of a loaded event that are not already stored for its file.
+
+    Args:
+        store (SQLiteLangChainVectorStore): Vector store.
+        embedder (Embedder): Embedder.
+        project_id (str): Project identifier.
+        loaded (dict): Output of :func:`load_event`.
+
+    Returns:
+        dict: ``loaded`` with ``embeddings`` mapping content hash to vector.
+    """
+    loaded["embeddings"] = {}
+    if loaded.get("chunks"):
+        # Advisory check through a read connection; apply_event re-diffs under the writer lock
+        stored = store.stored_hashes(project_id, loaded["path"])
+        if loaded["event_type"] == "moved" and loaded.get("old_path"):
+            # The chunks stored under the old path are re-keyed, not re-embedded
+            stored |= store.stored_hashes(project_id, loaded["old_path"])
+        texts = list({content_hash(chunk): chunk for chunk in loaded["chunks"] if content_hash(chunk) not in stored}.items())
+        if texts:
+            with STAGE_SECONDS.time(stage="embed"):
+                vectors = embedder.embed_batch([chunk for _, chunk in texts])
+            loaded["embeddings"] = dict(zip([digest for digest, _ in texts], vectors))
+    return loaded
+
+
+def apply_event(store: SQLiteLangChainVectorStore, embedder: Embedder, project_id: str, loaded: dict, batch_size: int = 512, max_file_size: int = MAX_FILE_SIZE) -> Dict[str, int]:
+    """
+    Apply a prepared event to the store.
+
+    The diff is recomputed against the current rows, so events prepared in
+    parallel are still applied correctly in order. Embeddings computed by
+    :func:`embed_new_chunks` are reused; any other new chunk is embedded here.
+    A ``moved`` event re-keys the chunks stored under ``old_path`` (see
+    :meth:`SQLiteLangChainVectorStore.move_file`) and then syncs any content
+    sent with it, all in the caller's transaction; moved chunks count as unchanged.
+    Events that :func:`load_event` found ``unchanged`` only touch the file
+    manifest, unless an earlier event changed the file in the meantime; the
+    manifest entry is written in the same transaction as the chunks.
+    ``stream`` events are read, chunked, embedded and written ``batch_size``
+    chunks at a time (see :meth:`SQLiteLangChainVectorStore.sync_file_stream`),
+    and ``skipped`` ones (binary or too large) drop whatever is stored for the file.
+
+    Args:
+        store (SQLiteLangChainVectorStore): Vector store.
+        embedder (Embedder): Embedder for chunks that were not embedded in advance.
+        project_id (str): Project identifier.
+        loaded (dict): Output of :func:`load_event` or :func:`embed_new_chunks`.
+        batch_size (int): Chunks embedded and written per step for streamed files.
+        max_file_size (int): Largest file indexed, in bytes (re-checked when a file is streamed).
+
+    Returns:
+        Dict[str, int]: ``processed``, ``added``, ``removed`` and ``unchanged`` counts.
+    """
+    counts = {"processed": 0, "added": 0, "removed": 0, "unchanged": 0}
+    path = loaded["path"]
+    if loaded["event_type"] == "deleted":
+        store.delete_file(project_id, path)
+        counts["processed"] = 1
+        return counts
+    with store.writer():
+        if loaded.get("unchanged"):
+            state = store.file_state(project_id, path)
+            if state is not None and state["hash"] == loaded["hash"]:
+                if loaded.get("mtime_ns") is not None and (loaded["size"], loaded["mtime_ns"]) != (state["size"], state["mtime_ns"]):
+                    store.record_file(project_id, path, loaded["hash"], size=loaded["size"], mtime_ns=loaded["mtime_ns"])
+                counts["processed"] = counts["unchanged"] = state["chunks"] or 0
+                return counts
+            # Changed by an earlier event since it was prepared: read it again, without the shortcut
+            loaded = dict(loaded, unchanged=False, stream=True)
+        if loaded.get("skipped"):
+            # Binary or too large: make sure nothing stale stays indexed
+            if loaded["event_type"] == "moved" and loaded.get("old_path"):
+                store.delete_file(project_id, loaded["old_path"])
+            store.delete_file(project_id, path)
+            return counts
+        chunks: Optional[List[str]] = loaded.get("chunks")
+        if loaded["event_type"] == "moved" and loaded.get("old_path"):
+            moved = store.move_file(project_id, loaded["old_path"], path)
+            if chunks is None and not loaded.get("stream"):
+                counts["processed"] = counts["unchanged"] = moved
+                return counts
+        elif chunks is None and not loaded.get("stream"):
+            return counts
+        if loaded.get("stream"):
+            return _apply_stream(store, embedder, project_id, loaded, batch_size, max_file_size)
+        # Only chunks whose content hash is new are embedded and written
+        counts = store.sync_file(project_id, path, chunks, embedder, loaded.get("embeddings"))
+        if loaded.get("hash"):
+            store.record_file(project_id, path, loaded["hash"], size=loaded.get("size"), mtime_ns=loaded.get("mtime_ns"), chunks=len(chunks))
+        return counts
+
+
+def _apply_stream(store: SQLiteLangChainVectorStore, embedder: Embedder, project_id: str, loaded: dict, batch_size: int, max_file_size: int) -> Dict[str, int]:
+    counts = {"processed": 0, "added": 0, "removed": 0, "unchanged": 0}
+    path = loaded["path"]
+    content = loaded.get("content")
+    hasher = None
+    if content is not None:
+        pieces = iter_text_pieces(content)
+        digest = loaded.get("hash") or text_digest(content)[0]
+        size, mtime_ns = loaded.get("size"), None
+    else:
+        try:
+            st = os.stat(path)
+            encoding = sniff_file(path) if st.st_size <= max_file_size else None
+        except OSError:
+            return counts
+        if encoding is None:
+            store.delete_file(project_id, path)
+            return counts
+        # The manifest hash is taken from the bytes actually chunked, in the same pass
+        hasher = hashlib.sha256()
+        pieces = iter_file_text(path, encoding, hasher)
+        digest, size, mtime_ns = None, st.st_size, st.st_mtime_ns
+    counts = store.sync_file_stream(project_id, path, iter_chunks(iter_lines(pieces)), embedder, batch_size=batch_size)
+    store.record_file(project_id, path, digest or hasher.hexdigest(), size=size, mtime_ns=mtime_ns, chunks=counts["processed"])
+    return counts
@@ -0,0 +1,169 @@
+"""
+Incremental readers for ingesting files without loading them whole.
+
+:func:`sniff_file` looks at the first few KiB of a file to reject binaries
+and pick a text encoding before anything else is read. :func:`iter_file_text`
+then decodes the file block by block (hashing the raw bytes on the way), and
+:func:`iter_lines` re-splits the decoded pieces into lines exactly as
+``str.splitlines(keepends=True)`` would split the whole text, so streamed
+files chunk the same way as files read in one go (see
+:func:`ragms02.ingestion.pipeline.iter_chunks`).
+"""
+import codecs
+import hashlib
+from typing import Iterable, Iterator, Optional
+
+BINARY_SNIFF_BYTES = 8192
+READ_BUFFER = 1024 * 1024  # bytes read (or characters sliced) per step
+
+# Longest BOMs first: the UTF-32 LE BOM starts with the UTF-16 LE one
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def detect_encoding(head: bytes) -> Optional[str]:
+    """
+    Guess a file's text encoding from its first bytes.
+
+    A byte-order mark wins. Otherwise a NUL byte marks the file as binary,
+    and text that is not valid UTF-8 is read as Latin-1.
+
+    Args:
+        head (bytes): The first :data:`BINARY_SNIFF_BYTES` bytes of the file.
+
+    Returns:
+        Optional[str]: Codec name, or None for binary content.
+
+    Example:
+        >>> detect_encoding(b"caf\\xc3\\xa9")
+        'utf-8'
+    """
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    if b"\0" in head:
+        return None
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off by the end of the sample is still UTF-8
+        if e.start < len(head) - 3 or e.reason != "unexpected end of data":
+            return "latin-1"
+    return "utf-8"
+
+
+def sniff_file(path: str) -> Optional[str]:
+    """
+    Return the text encoding of a file on disk, reading only its first bytes.
+
+    Args:
+        path (str): File path.
+
+    Returns:
+        Optional[str]: Codec name, or None for binary files.
+
+    Raises:
+        OSError: If the file cannot be opened.
+    """
+    with open(path, "rb") as f:
+        return detect_encoding(f.read(BINARY_SNIFF_BYTES))
+
+
+def hash_file(path: str, buffer_size: int = READ_BUFFER) -> str:
+    """
+    Return the SHA-256 hex digest of a file, read ``buffer_size`` bytes at a time.
+
+    Args:
+        path (str): File path.
+        buffer_size (int): Bytes read per step.
+
+    Returns:
+        str: Hex digest.
+    """
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(buffer_size), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def iter_file_text(path: str, encoding: str, hasher=None, buffer_size: int = READ_BUFFER) -> Iterator[str]:
+    """
+    Decode a file incrementally, ``buffer_size`` bytes at a time.
+
+    Args:
+        path (str): File path.
+        encoding (str): Codec, usually from :func:`sniff_file`. Undecodable bytes are dropped.
+        hasher: Optional ``hashlib`` object updated with every raw block read.
+        buffer_size (int): Bytes read per step.
+
+    Yields:
+        str: Decoded text pieces; multi-byte characters split across blocks are decoded whole.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="ignore")
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(buffer_size)
+            if not block:
+                break
+            if hasher is not None:
+                hasher.update(block)
+            text = decoder.decode(block)
+            if text:
+                yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def iter_text_pieces(text: str, buffer_size: int = READ_BUFFER) -> Iterator[str]:
+    """
+    Slice in-memory text into pieces for :func:`iter_lines`, without copying it whole.
+
+    Args:
+        text (str): Text.
+        buffer_size (int): Characters per piece.
+
+    Yields:
+        str: Consecutive slices of ``text``.
+    """
+    for start in range(0, len(text), buffer_size):
+        yield text[start:start + buffer_size]
+
+
+def iter_lines(pieces: Iterable[str], max_line: int = READ_BUFFER) -> Iterator[str]:
+    """
+    Split a stream of text pieces into lines, line endings kept.
+
+    The result matches ``"".join(pieces).splitlines(keepends=True)``, also
+    for line breaks (such as ``\\r\\n``) that straddle two pieces. Lines
+    longer than ``max_line`` characters are cut, so a file without line
+    breaks never has to be held in memory whole.
+
+    Args:
+        pieces (Iterable[str]): Text pieces, in order.
+        max_line (int): Longest line kept in one piece.
+
+    Yields:
+        str: Lines.
+
+    Example:
+        >>> list(iter_lines(["a\\r", "\\nb"]))
+        ['a\\r\\n', 'b']
+    """
+    carry = ""
+    for piece in pieces:
+        lines = (carry + piece).splitlines(keepends=True)
+        # The last line may continue in the next piece (or be a "\r" waiting for its "\n")
+        carry = lines.pop() if lines else ""
+        yield from lines
+        while len(carry) > max_line:
+            yield carry[:max_line]
+            carry = carry[max_line:]
+    if carry:
+        yield carry
@@ -1,9 +1,19 @@
 """
 LLM Dispatcher: Routes LLM requests to the correct provider/model.
 Default: Gemini (Google). Supports override for Ollama, OpenAI, etc.
+
+Provider clients are created once and reused: one pooled :class:`OllamaLLM`
+and one ``GenerativeModel`` per Gemini model name. :func:`adispatch_llm` is
+the async entry point used by the API; it never blocks the event loop.
 """
+import asyncio
 import os
+import threading
+import time
+import weakref
+from typing import Dict, Optional
 from ragms02.llm.ollama import OllamaLLM
+from ragms02.metrics import LLM_ERRORS, STAGE_SECONDS
 try:
     import google.generativeai as genai
 except ImportError:
@@ -20,32 +30,158 @@ SUPPORTED_MODELS = {
 DEFAULT_MODEL = os.environ.get("RAGMS02_DEFAULT_MODEL", "gemini-pro")
 OLLAMA_DEFAULT_MODEL = os.environ.get("OLLAMA_DEFAULT_MODEL", "llama2")
 
+_lock = threading.Lock()
+_ollama: Optional[OllamaLLM] = None
+_gemini_models: Dict[str, object] = {}
+_gemini_configured = False
+_gemini_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
 
-def call_gemini(prompt, context=None, model="gemini-pro"):
+
+def get_ollama() -> OllamaLLM:
+    """
+    Return the shared Ollama client, configured from the environment on first use.
+
+    Environment:
+        OLLAMA_BASE_URL: Ollama server URL (default ``http://localhost:11434``).
+        RAGMS02_LLM_TIMEOUT: Read timeout in seconds (default 120).
+        RAGMS02_LLM_CONNECT_TIMEOUT: Connect timeout in seconds (default 5).
+        RAGMS02_LLM_MAX_CONNECTIONS: Keep-alive pool size (default 32).
+        RAGMS02_LLM_MAX_CONCURRENCY: Concurrent requests per provider (default 16).
+    """
+    global _ollama
+    if _ollama is None:
+        with _lock:
+            if _ollama is None:
+                _ollama = OllamaLLM(
+                    base_url=os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434"),
+                    timeout=float(os.environ.get("RAGMS02_LLM_TIMEOUT", "120")),
+                    connect_timeout=float(os.environ.get("RAGMS02_LLM_CONNECT_TIMEOUT", "5")),
+                    max_connections=int(os.environ.get("RAGMS02_LLM_MAX_CONNECTIONS", "32")),
+                    max_concurrency=int(os.environ.get("RAGMS02_LLM_MAX_CONCURRENCY", "16")),
+                )
+    return _ollama
+
+
+def get_gemini(model="gemini-pro"):
+    """
+    Return a cached ``GenerativeModel``, configuring the API key once.
+    """
+    global _gemini_configured
     if not genai:
         raise ImportError("google-generativeai is not installed.")
-    genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
-    gemini = genai.GenerativeModel(model)
-    response = gemini.generate_content(prompt)
+    gemini = _gemini_models.get(model)
+    if gemini is None:
+        with _lock:
+            if not _gemini_configured:
+                genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
+                _gemini_configured = True
+            gemini = _gemini_models.setdefault(model, genai.GenerativeModel(model))
+    return gemini
+
+
+def _gemini_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _gemini_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _gemini_semaphores[loop] = asyncio.Semaphore(int(os.environ.get("RAGMS02_LLM_MAX_CONCURRENCY", "16")))
+    return semaphore
+
+
+def call_gemini(prompt, context=None, model="gemini-pro"):
+    response = get_gemini(model).generate_content(prompt)
+    return response.text
+
+def stream_gemini(prompt, context=None, model="gemini-pro"):
+    for chunk in get_gemini(model).generate_content(prompt, stream=True):
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. only safety metadata) carry nothing to stream
+            continue
+        if text:
+            yield text
+
+async def acall_gemini(prompt, context=None, model="gemini-pro"):
+    gemini = get_gemini(model)
+    async with _gemini_semaphore():
+        response = await gemini.generate_content_async(prompt)
     return response.text
 
 def call_ollama(prompt, context=None, model=None):
     model = model or OLLAMA_DEFAULT_MODEL
-    llm = OllamaLLM()
-    return llm.generate(prompt, model=model, context=context)
+    return get_ollama().generate(prompt, model=model, context=context)
+
+def stream_ollama(prompt, context=None, model=None):
+    model = model or OLLAMA_DEFAULT_MODEL
+    return get_ollama().stream(prompt, model=model, context=context)
+
+async def acall_ollama(prompt, context=None, model=None):
+    model = model or OLLAMA_DEFAULT_MODEL
+    return await get_ollama().agenerate(prompt, model=model, context=context)
+
+def _observed_stream(tokens, provider):
+    # Time the whole stream, not just the call that creates the generator
+    start = time.perf_counter()
+    try:
+        yield from tokens
+    except Exception:
+        LLM_ERRORS.inc(provider=provider)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage="llm")
 
 # Add more provider handlers as needed
-def dispatch_llm(prompt, context=None, model=None, provider=None):
+def dispatch_llm(prompt, context=None, model=None, provider=None, stream=False):
     """
     Dispatch LLM call to the correct provider/model.
     Defaults to Gemini if not specified.
+
+    With ``stream=True`` an iterator of response fragments is returned instead
+    of the full response text.
     """
     model = model or DEFAULT_MODEL
     provider = provider or SUPPORTED_MODELS.get(model, "gemini")
     if provider == "gemini":
-        return call_gemini(prompt, context=context, model=model)
+        handler = stream_gemini if stream else call_gemini
     elif provider == "ollama":
-        return call_ollama(prompt, context=context, model=model)
+        handler = stream_ollama if stream else call_ollama
     # elif provider == "openai": ...
     else:
         raise ValueError(f"Unsupported provider/model: {provider}/{model}")
+    if stream:
+        return _observed_stream(handler(prompt, context=context, model=model), provider)
+    try:
+        with STAGE_SECONDS.time(stage="llm"):
+            return handler(prompt, context=context, model=model)
+    except Exception:
+        LLM_ERRORS.inc(provider=provider)
+        raise
+
+async def adispatch_llm(prompt, context=None, model=None, provider=None):
+    """
+    Async version of :func:`dispatch_llm` using the pooled async provider clients.
+    """
+    model = model or DEFAULT_MODEL
+    provider = provider or SUPPORTED_MODELS.get(model, "gemini")
+    if provider == "gemini":
+        handler = acall_gemini
+    elif provider == "ollama":
+        handler = acall_ollama
+    else:
+        raise ValueError(f"Unsupported provider/model: {provider}/{model}")
+    try:
+        with STAGE_SECONDS.time(stage="llm"):
+            return await handler(prompt, context=context, model=model)
+    except Exception:
+        LLM_ERRORS.inc(provider=provider)
+        raise
+
+async def aclose_clients():
+    """
+    Close the shared provider clients (called on application shutdown).
+    """
+    global _ollama
+    with _lock:
+        ollama, _ollama = _ollama, None
+    if ollama is not None:
+        await ollama.aclose()
@@ -1,22 +1,54 @@
+import asyncio
+import json
+import threading
+import httpx
 import requests
-from typing import List, Optional
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterator, List, Optional, Tuple
 
 class OllamaLLM:
     """
     Simple client for the Ollama LLM API.
 
+    Sync calls share one keep-alive ``requests.Session``; async calls share one
+    pooled ``httpx.AsyncClient`` per event loop and are limited to
+    ``max_concurrency`` in-flight requests.
+
     Example:
         >>> llm = OllamaLLM()
         >>> response = llm.generate("What is RAG?")
+        >>> response = await llm.agenerate("What is RAG?")
     """
-    def __init__(self, base_url: str = "http://localhost:11434"):
+    def __init__(self, base_url: str = "http://localhost:11434", timeout: float = 120.0, connect_timeout: float = 5.0, max_connections: int = 32, max_concurrency: int = 16):
         """
         Initialize the OllamaLLM client.
 
         Args:
             base_url (str): Base URL for the Ollama API.
+            timeout (float): Read timeout in seconds (time allowed between received bytes).
+            connect_timeout (float): Connect timeout in seconds.
+            max_connections (int): Size of the keep-alive connection pool.
+            max_concurrency (int): Maximum concurrent async requests; further calls wait.
         """
         self.base_url = base_url
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._aclients: Dict[asyncio.AbstractEventLoop, Tuple[httpx.AsyncClient, asyncio.Semaphore]] = {}
+        self._aclients_lock = threading.Lock()
+
+    def _payload(self, prompt: str, model: str, context: Optional[List[str]], stream: bool) -> dict:
+        return {
+            "model": model,
+            "prompt": prompt,
+            "context": context or [],
+            "stream": stream,
+        }
 
     def generate(self, prompt: str, model: str = "llama2", context: Optional[List[str]] = None) -> str:
         """
@@ -34,11 +66,109 @@ class OllamaLLM:
             >>> llm = OllamaLLM()
             >>> llm.generate("What is RAG?", model="llama2")
         """
-        payload = {
-            "model": model,
-            "prompt": prompt,
-            "context": context or []
-        }
-        response = requests.post(f"{self.base_url}/api/generate", json=payload)
+        response = self.session.post(
+            f"{self.base_url}/api/generate",
+            json=self._payload(prompt, model, context, False),
+            timeout=(self.connect_timeout, self.timeout),
+        )
+        response.raise_for_status()
+        return response.json().get("response", "")
+
+    def stream(self, prompt: str, model: str = "llama2", context: Optional[List[str]] = None) -> Iterator[str]:
+        """
+        Stream a response from the LLM, yielding text fragments as they are generated.
+
+        Ollama streams newline-delimited JSON objects; each carries a ``response``
+        fragment and the last one has ``done`` set.
+
+        Args:
+            prompt (str): User prompt or question.
+            model (str): LLM model name (default: "llama2").
+            context (Optional[List[str]]): Optional context strings.
+
+        Yields:
+            str: Response fragments in order.
+
+        Example:
+            >>> for token in OllamaLLM().stream("What is RAG?"):
+            ...     print(token, end="")
+        """
+        with self.session.post(
+            f"{self.base_url}/api/generate",
+            json=self._payload(prompt, model, context, True),
+            stream=True,
+            timeout=(self.connect_timeout, self.timeout),
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise RuntimeError(data["error"])
+                if data.get("response"):
+                    yield data["response"]
+                if data.get("done"):
+                    break
+
+    def _async_client(self):
+        # httpx pools and asyncio semaphores are bound to the loop that first uses them, so each loop gets its own
+        loop = asyncio.get_running_loop()
+        pair = self._aclients.get(loop)
+        if pair is None:
+            with self._aclients_lock:
+                # Pools of loops that have been closed can no longer be shut down; let them go
+                for closed in [owner for owner in self._aclients if owner.is_closed()]:
+                    del self._aclients[closed]
+                pair = self._aclients[loop] = (
+                    httpx.AsyncClient(
+                        base_url=self.base_url,
+                        timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                        limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+                    ),
+                    asyncio.Semaphore(self.max_concurrency),
+                )
+        return pair
+
+    async def agenerate(self, prompt: str, model: str = "llama2", context: Optional[List[str]] = None) -> str:
+        """
+        Async version of :meth:`generate` using the pooled ``httpx.AsyncClient``.
+
+        Args:
+            prompt (str): User prompt or question.
+            model (str): LLM model name (default: "llama2").
+            context (Optional[List[str]]): Optional context strings.
+
+        Returns:
+            str: LLM-generated response.
+
+        Example:
+            >>> await OllamaLLM().agenerate("What is RAG?", model="llama2")
+        """
+        client, semaphore = self._async_client()
+        async with semaphore:
+            response = await client.post("/api/generate", json=self._payload(prompt, model, context, False))
         response.raise_for_status()
         return response.json().get("response", "")
+
+    async def aclose(self) -> None:
+        """
+        Close every async connection pool and the sync session.
+
+        Each pool is closed on the loop it belongs to: awaited directly on the
+        running loop, submitted to a loop running in another thread, or run
+        in a worker thread on a loop that is stopped but not closed.
+        """
+        loop = asyncio.get_running_loop()
+        with self._aclients_lock:
+            clients, self._aclients = self._aclients, {}
+        try:
+            for owner, (client, _) in clients.items():
+                if owner is loop:
+                    await client.aclose()
+                elif owner.is_running():
+                    await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), owner))
+                elif not owner.is_closed():
+                    await asyncio.to_thread(owner.run_until_complete, client.aclose())
+        finally:
+            self.session.close()
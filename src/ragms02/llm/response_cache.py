@@ -0,0 +1,184 @@
+"""
+Semantic response cache for ``/query``.
+
+Answers are cached per ``(model, project set)`` together with the project
+versions they were computed against (see
+:meth:`SQLiteLangChainVectorStore.version`). A lookup hits on the exact
+query text or on any cached query whose embedding is within
+``threshold`` cosine similarity. Any write to one of the projects bumps its
+version, so ingesting into a project invalidates every answer that used it.
+Entries expire after ``ttl`` seconds and the least recently used entries are
+evicted beyond ``max_entries``.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+import numpy as np
+
+
+class ResponseCache:
+    """
+    In-memory TTL/LRU cache of query responses with near-duplicate matching.
+
+    Example:
+        >>> cache = ResponseCache(max_entries=1024, ttl=3600, threshold=0.95)
+        >>> key = cache.key("llama2", ["proj1"], {"proj1": 7})
+        >>> cache.put(key, "What is RAG?", query_emb, {"response": "RAG stands for..."})
+        >>> value, similarity = cache.get(key, "what is RAG", query_emb)
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, threshold: float = 0.95):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum cached responses before LRU eviction.
+            ttl (float): Seconds a response stays valid.
+            threshold (float): Minimum cosine similarity for a near-duplicate hit (1.0 disables semantic matching).
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        # entry id -> (bucket, query, unit embedding, value, expires_at)
+        self._entries: "OrderedDict[int, Tuple[tuple, str, np.ndarray, Any, float]]" = OrderedDict()
+        # (model, projects) -> (versions, {entry id})
+        self._buckets: Dict[tuple, Tuple[tuple, set]] = {}
+        self._next_id = 0
+
+    @staticmethod
+    def key(model: Optional[str], projects: Sequence[str], versions: Dict[str, int]) -> Tuple[tuple, tuple]:
+        """
+        Build a cache key.
+
+        Args:
+            model (Optional[str]): LLM model name.
+            projects (Sequence[str]): Projects searched (order and duplicates are ignored).
+            versions (Dict[str, int]): Current version of each project.
+
+        Returns:
+            Tuple[tuple, tuple]: ``(bucket, versions)``.
+        """
+        project_set = tuple(sorted(set(projects)))
+        return (model, project_set), tuple(versions.get(p, 0) for p in project_set)
+
+    def _bucket_ids(self, bucket: tuple, versions: tuple) -> set:
+        current = self._buckets.get(bucket)
+        if current is not None and current[0] != versions:
+            # A project changed since these answers were cached
+            for entry_id in current[1]:
+                self._entries.pop(entry_id, None)
+            self.invalidations += len(current[1])
+            current = None
+        if current is None:
+            current = self._buckets[bucket] = (versions, set())
+        return current[1]
+
+    def _remove(self, entry_id: int) -> None:
+        bucket = self._entries.pop(entry_id)[0]
+        ids = self._buckets.get(bucket)
+        if ids is not None:
+            ids[1].discard(entry_id)
+            if not ids[1]:
+                del self._buckets[bucket]
+
+    def get(self, key: Tuple[tuple, tuple], query: str, embedding) -> Tuple[Optional[Any], float]:
+        """
+        Look up a response by exact query text or nearest cached query embedding.
+
+        Args:
+            key (Tuple[tuple, tuple]): Key from :meth:`key`.
+            query (str): Query text.
+            embedding: Query embedding.
+
+        Returns:
+            Tuple[Optional[Any], float]: The cached value (or None) and the match similarity.
+        """
+        bucket, versions = key
+        q = _unit(embedding)
+        now = time.monotonic()
+        with self._lock:
+            best_id, best_sim = None, -1.0
+            for entry_id in list(self._bucket_ids(bucket, versions)):
+                _, cached_query, cached_emb, _, expires_at = self._entries[entry_id]
+                if expires_at <= now:
+                    self._remove(entry_id)
+                    self.evictions += 1
+                    continue
+                sim = 1.0 if cached_query == query else float(cached_emb @ q)
+                if sim > best_sim:
+                    best_id, best_sim = entry_id, sim
+            if best_id is None or best_sim < self.threshold:
+                self.misses += 1
+                return None, best_sim
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            if self._entries[best_id][1] != query:
+                self.semantic_hits += 1
+            return self._entries[best_id][3], best_sim
+
+    def put(self, key: Tuple[tuple, tuple], query: str, embedding, value: Any) -> None:
+        """
+        Cache a response.
+
+        Args:
+            key (Tuple[tuple, tuple]): Key from :meth:`key`.
+            query (str): Query text.
+            embedding: Query embedding.
+            value (Any): Response to cache.
+        """
+        bucket, versions = key
+        with self._lock:
+            current = self._buckets.get(bucket)
+            if current is not None and any(old < new for old, new in zip(versions, current[0])):
+                # Computed before a newer version was seen; never replace fresher answers with it
+                return
+            ids = self._bucket_ids(bucket, versions)
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (bucket, query, _unit(embedding), value, time.monotonic() + self.ttl)
+            ids.add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Drop every cached response.
+        """
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return hit/miss counters.
+
+        Returns:
+            Dict[str, float]: ``hits``, ``semantic_hits``, ``misses``, ``evictions``, ``invalidations``, ``entries`` and ``hit_rate``.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def _unit(embedding) -> np.ndarray:
+    vec = np.asarray(embedding, dtype=np.float32).ravel()
+    return vec / (np.linalg.norm(vec) + 1e-8)
@@ -0,0 +1,242 @@
+"""
+Structured, non-blocking logging for the service.
+
+Records from the ``ragms02`` logger tree are put on an in-memory queue by a
+``QueueHandler`` and written by a background ``QueueListener``, so request
+and ingest threads never wait on stdout. Every record carries the current
+request's correlation id (see :func:`bind_request_id`). Records below
+WARNING can be sampled: the decision is made per correlation id, so a
+sampled request keeps its complete trace. The most recent records are also
+kept in a ring buffer served by ``/logs``.
+
+Hot paths log through ``logger.debug("... %s", value)`` (arguments are only
+formatted if the record is emitted) and guard any per-item work with
+``logger.isEnabledFor(logging.DEBUG)``.
+
+Example:
+    >>> from ragms02.logs import configure_logging
+    >>> configure_logging(level="DEBUG", sample_rate=0.1)
+"""
+import collections
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+LOGGER_NAME = "ragms02"
+
+_request_id: ContextVar[Optional[str]] = ContextVar("ragms02_request_id", default=None)
+_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+
+# Attributes every LogRecord has; anything else was passed through ``extra=``
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+def new_request_id() -> str:
+    """
+    Return a fresh correlation id.
+    """
+    return uuid.uuid4().hex
+
+
+def bind_request_id(request_id: Optional[str]):
+    """
+    Set the correlation id for the current context.
+
+    Args:
+        request_id (Optional[str]): Correlation id (None clears it).
+
+    Returns:
+        Token to pass to :func:`reset_request_id`.
+    """
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token) -> None:
+    """
+    Restore the correlation id that was current before :func:`bind_request_id`.
+    """
+    _request_id.reset(token)
+
+
+def get_request_id() -> Optional[str]:
+    """
+    Return the correlation id of the current context, if any.
+    """
+    return _request_id.get()
+
+
+class RequestIdFilter(logging.Filter):
+    """
+    Attach the current correlation id to each record as ``record.request_id``.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = _request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a fraction of records below ``min_level``.
+
+    Records with a correlation id are kept or dropped per id, so every record
+    of a sampled request is kept; other records are sampled independently.
+    """
+
+    def __init__(self, rate: float = 1.0, min_level: int = logging.WARNING):
+        """
+        Initialize the filter.
+
+        Args:
+            rate (float): Fraction of records to keep, between 0 and 1.
+            min_level (int): Records at or above this level are always kept.
+        """
+        super().__init__()
+        self.rate = max(0.0, min(1.0, rate))
+        self.min_level = min_level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1.0 or record.levelno >= self.min_level:
+            return True
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            return (zlib.crc32(request_id.encode()) % 10000) < self.rate * 10000
+        return random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line, including ``extra=`` fields.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record_to_dict(record), default=str)
+
+
+class RingBufferHandler(logging.Handler):
+    """
+    Keep the most recent records in memory for ``/logs``.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        """
+        Initialize the handler.
+
+        Args:
+            capacity (int): Number of records kept.
+        """
+        super().__init__()
+        self.records: "collections.deque[Dict]" = collections.deque(maxlen=capacity)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record_to_dict(record))
+
+    def entries(self, limit: Optional[int] = None, level: Optional[str] = None) -> List[Dict]:
+        """
+        Return buffered records, oldest first.
+
+        Args:
+            limit (Optional[int]): Return at most this many of the newest records.
+            level (Optional[str]): Only records at or above this level name.
+
+        Returns:
+            List[Dict]: Record dicts (see :func:`record_to_dict`).
+        """
+        entries = list(self.records)
+        if level:
+            threshold = logging.getLevelName(level.upper())
+            if isinstance(threshold, int):
+                entries = [e for e in entries if logging.getLevelName(e["level"]) >= threshold]
+        return entries[-limit:] if limit else entries
+
+
+def record_to_dict(record: logging.LogRecord) -> Dict:
+    """
+    Convert a record to a JSON-serialisable dict.
+    """
+    data = {
+        "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat().replace("+00:00", "Z"),
+        "level": record.levelname,
+        "logger": record.name,
+        "message": record.getMessage(),
+        "request_id": getattr(record, "request_id", None),
+    }
+    for key, value in vars(record).items():
+        if key not in _RESERVED and not key.startswith("_"):
+            data[key] = value
+    if record.exc_info:
+        data["exc_info"] = logging.Formatter().formatException(record.exc_info)
+    return data
+
+
+LOG_BUFFER = RingBufferHandler(int(os.environ.get("RAGMS02_LOG_BUFFER", "1000")))
+
+
+def configure_logging(level: Optional[str] = None, sample_rate: Optional[float] = None, fmt: Optional[str] = None) -> None:
+    """
+    Route ``ragms02`` logs through a queue to stderr and the ``/logs`` buffer.
+
+    Calling it again replaces the previous configuration.
+
+    Environment:
+        RAGMS02_LOG_LEVEL: Log level (default ``INFO``).
+        RAGMS02_LOG_SAMPLE_RATE: Fraction of records below WARNING to keep (default ``1.0``).
+        RAGMS02_LOG_FORMAT: ``json`` (default) or ``text``.
+        RAGMS02_LOG_BUFFER: Records kept for ``/logs`` (default 1000).
+
+    Args:
+        level (Optional[str]): Overrides ``RAGMS02_LOG_LEVEL``.
+        sample_rate (Optional[float]): Overrides ``RAGMS02_LOG_SAMPLE_RATE``.
+        fmt (Optional[str]): Overrides ``RAGMS02_LOG_FORMAT``.
+    """
+    global _listener, _queue_handler
+    level = (level or os.environ.get("RAGMS02_LOG_LEVEL", "INFO")).upper()
+    if sample_rate is None:
+        sample_rate = float(os.environ.get("RAGMS02_LOG_SAMPLE_RATE", "1.0"))
+    fmt = fmt or os.environ.get("RAGMS02_LOG_FORMAT", "json")
+    stream = logging.StreamHandler(sys.stderr)
+    if fmt == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+    with _lock:
+        shutdown_logging()
+        handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+        # Filters run in the logging thread, before the record is queued
+        handler.addFilter(RequestIdFilter())
+        handler.addFilter(SamplingFilter(sample_rate))
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.setLevel(level)
+        logger.addHandler(handler)
+        logger.propagate = False
+        _queue_handler = handler
+        _listener = logging.handlers.QueueListener(handler.queue, stream, LOG_BUFFER, respect_handler_level=True)
+        _listener.start()
+
+
+def shutdown_logging() -> None:
+    """
+    Flush queued records and detach the handler installed by :func:`configure_logging`.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _queue_handler is not None:
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.removeHandler(_queue_handler)
+        logger.propagate = True
+        _queue_handler = None
@@ -1,11 +1,54 @@
-from fastapi import FastAPI
+import logging
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from ragms02.api.deps import init_app_state, close_app_state
+from ragms02.llm.dispatcher import aclose_clients
 from ragms02.api.routes import router as base_router
 from ragms02.api.ingest import router as ingest_router
 from ragms02.api.query import router as query_router
 from ragms02.api.admin import router as admin_router
+from ragms02.logs import bind_request_id, configure_logging, new_request_id, reset_request_id, shutdown_logging
+from ragms02.metrics import REQUEST_SECONDS, REQUESTS
 
-app = FastAPI(title="RAGMS02 API")
+logger = logging.getLogger("ragms02.api")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    init_app_state(app)
+    yield
+    await aclose_clients()
+    close_app_state(app)
+    shutdown_logging()
+
+
+app = FastAPI(title="RAGMS02 API", lifespan=lifespan)
 app.include_router(base_router)
 app.include_router(ingest_router)
 app.include_router(query_router)
 app.include_router(admin_router)
+
+
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    # Correlation id for every log record of this request; echoed back to the caller
+    request_id = request.headers.get("X-Request-ID") or new_request_id()
+    token = bind_request_id(request_id)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        # Label by route template, not raw path, to keep label cardinality bounded
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        labels = {"method": request.method, "route": route, "status": str(status)}
+        REQUEST_SECONDS.observe(elapsed, **labels)
+        REQUESTS.inc(**labels)
+        logger.info("%s %s %d %.1fms", request.method, route, status, elapsed * 1000, extra={"status": status, "duration_ms": round(elapsed * 1000, 1)})
+        reset_request_id(token)
@@ -0,0 +1,213 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms are plain Python objects registered in a
+module-level :data:`REGISTRY`. Updating one takes a dict lookup and a lock,
+so instrumentation is cheap enough to leave on; ``/metrics`` renders the
+registry with :func:`render`.
+
+Example:
+    >>> from ragms02.metrics import STAGE_SECONDS
+    >>> with STAGE_SECONDS.time(stage="embed"):
+    ...     vectors = embedder.embed_batch(chunks)
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond index lookups to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Metric:
+    """
+    Base class for a named metric family with optional labels.
+    """
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), registry: "Registry" = None):
+        """
+        Initialize the metric and register it.
+
+        Args:
+            name (str): Metric name.
+            help (str): Help text.
+            labelnames (Sequence[str]): Label names; values are passed as keyword arguments.
+            registry (Registry): Registry to add the metric to (default :data:`REGISTRY`).
+        """
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """
+    Monotonically increasing count.
+
+    Example:
+        >>> INGEST_EVENTS.inc(event_type="created")
+    """
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{self._labels(key)} {_fmt(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    """
+    Value that can go up and down (queue depths, sizes, ratios).
+
+    Example:
+        >>> QUEUE_DEPTH.set(12, queue="ingest")
+    """
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values in cumulative buckets.
+
+    Example:
+        >>> with STAGE_SECONDS.time(stage="vector_search"):
+        ...     docs = store.search_projects(query_emb, projects)
+    """
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS, registry: "Registry" = None):
+        super().__init__(name, help, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            counts[slot] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """
+        Observe the wall-clock duration of the block in seconds.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> float:
+        counts = self._values.get(self._key(labels))
+        return sum(counts[:-1]) if counts else 0.0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts)) for key, counts in self._values.items()]
+        lines = []
+        for key, counts in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), counts[:-1]):
+                cumulative += count
+                le = 'le="' + ("+Inf" if bound == float("inf") else _fmt(bound)) + '"'
+                lines.append(f"{self.name}_bucket{self._labels(key, le)} {_fmt(cumulative)}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_fmt(counts[-1])}")
+            lines.append(f"{self.name}_count{self._labels(key)} {_fmt(cumulative)}")
+        return lines
+
+
+class Registry:
+    """
+    Collection of metrics rendered together.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format (version 0.0.4).
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+REGISTRY = Registry()
+
+# Latency of each pipeline stage: chunk, embed, db_write, vector_search, llm
+STAGE_SECONDS = Histogram("ragms02_stage_seconds", "Latency of pipeline stages in seconds.", ["stage"])
+REQUEST_SECONDS = Histogram("ragms02_request_seconds", "End-to-end HTTP request latency in seconds.", ["method", "route", "status"])
+REQUESTS = Counter("ragms02_requests_total", "HTTP requests served.", ["method", "route", "status"])
+INGEST_EVENTS = Counter("ragms02_ingest_events_total", "Ingest events applied.", ["event_type", "outcome"])
+INGEST_CHUNKS = Counter("ragms02_ingest_chunks_total", "Chunks processed by ingestion.", ["result"])
+LLM_ERRORS = Counter("ragms02_llm_errors_total", "Failed LLM calls.", ["provider"])
+QUEUE_DEPTH = Gauge("ragms02_queue_depth", "Items waiting in internal queues.", ["queue"])
+CACHE_HIT_RATIO = Gauge("ragms02_cache_hit_ratio", "Hit ratio of internal caches.", ["cache"])
+CACHE_ENTRIES = Gauge("ragms02_cache_entries", "Entries held by internal caches.", ["cache"])
+DB_SIZE_BYTES = Gauge("ragms02_db_size_bytes", "Size of the SQLite vector database in bytes.")
+DOCUMENTS = Gauge("ragms02_documents", "Chunks stored in the vector database.")
+
+
+def render() -> str:
+    """
+    Render :data:`REGISTRY` in the Prometheus text format.
+    """
+    return REGISTRY.render()
@@ -0,0 +1,319 @@
+"""
+Approximate nearest-neighbour (IVF) index for the vector store.
+
+Vectors are partitioned into ``nlist`` cells by a spherical k-means coarse
+quantizer; each cell is an exact :class:`MatrixIndex`. A query scores the
+centroids, then searches only the ``nprobe`` closest cells, so latency grows
+with ``nprobe * N / nlist`` instead of ``N``.
+"""
+import heapq
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from ragms02.vectorstore.index import MatrixIndex
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / (np.linalg.norm(vectors, axis=-1, keepdims=True) + 1e-8)
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+    assign = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), batch_size):
+        assign[start:start + batch_size] = np.argmax(vectors[start:start + batch_size] @ centroids.T, axis=1)
+    return assign
+
+
+def spherical_kmeans(vectors: np.ndarray, nlist: int, iters: int = 10, init: Optional[np.ndarray] = None, seed: int = 0) -> np.ndarray:
+    """
+    Train unit-norm centroids for cosine similarity.
+
+    Args:
+        vectors (np.ndarray): Training vectors (n, dim).
+        nlist (int): Number of centroids.
+        iters (int): Number of Lloyd iterations.
+        init (Optional[np.ndarray]): Warm-start centroids (nlist, dim).
+        seed (int): Random seed for initialisation and empty-cell reseeding.
+
+    Returns:
+        np.ndarray: Centroids of shape (nlist, dim).
+    """
+    rng = np.random.default_rng(seed)
+    x = _normalize(np.asarray(vectors, dtype=np.float32))
+    if init is not None and init.shape == (nlist, x.shape[1]):
+        centroids = init.astype(np.float32, copy=True)
+    else:
+        centroids = x[rng.choice(len(x), size=nlist, replace=False)].copy()
+    for _ in range(iters):
+        assign = _assign(x, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        counts = np.bincount(assign, minlength=nlist)
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = x[rng.choice(len(x), size=int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file ANN index with a spherical k-means coarse quantizer.
+
+    Until ``train_threshold`` vectors have been added the index behaves as a
+    single exact cell. New vectors are assigned to their nearest trained
+    centroid; :meth:`rebuild` retrains warm-started from the current
+    centroids once the index has grown (see :meth:`needs_rebuild`).
+
+    Example:
+        >>> index = IVFIndex(nprobe=8)
+        >>> index.add(ids, embeddings)
+        >>> results = index.search(query_emb, k=5)
+    """
+
+    def __init__(self, nlist: Optional[int] = None, nprobe: int = 8, train_threshold: int = 4096, dim: Optional[int] = None, seed: int = 0):
+        """
+        Initialize an empty IVF index.
+
+        Args:
+            nlist (Optional[int]): Number of cells. Defaults to ``4 * sqrt(n)`` at training time.
+            nprobe (int): Number of cells searched per query (recall/latency knob).
+            train_threshold (int): Number of vectors required before the quantizer is trained.
+            dim (Optional[int]): Embedding dimension. Inferred from the first add if omitted.
+            seed (int): Random seed for k-means.
+        """
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_threshold = train_threshold
+        self.dim = dim
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_size = 0
+        self._lists: List[MatrixIndex] = [MatrixIndex(dim)]
+        self._where: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._where
+
+    @property
+    def is_trained(self) -> bool:
+        """bool: Whether the coarse quantizer has been trained."""
+        return self.centroids is not None
+
+    def _all(self) -> Tuple[List[str], np.ndarray]:
+        ids: List[str] = []
+        mats = []
+        for cell in self._lists:
+            ids.extend(cell.ids)
+            mats.append(cell.matrix)
+        mats = [m for m in mats if len(m)]
+        matrix = np.concatenate(mats) if mats else np.empty((0, self.dim or 0), dtype=np.float32)
+        return ids, matrix
+
+    def _fill(self, ids: Sequence[str], vectors: np.ndarray):
+        if self.centroids is None:
+            self._lists = [MatrixIndex(self.dim)]
+            assign = np.zeros(len(ids), dtype=np.int64)
+        else:
+            assign = _assign(_normalize(vectors), self.centroids)
+            counts = np.bincount(assign, minlength=len(self.centroids))
+            self._lists = [MatrixIndex(self.dim, capacity=max(16, int(c))) for c in counts]
+        self._where = {}
+        self._add_assigned(ids, vectors, assign)
+
+    def _add_assigned(self, ids: Sequence[str], vectors: np.ndarray, assign: np.ndarray):
+        order = np.argsort(assign, kind="stable")
+        cells, starts = np.unique(assign[order], return_index=True)
+        bounds = list(starts[1:]) + [len(order)]
+        for cell, start, end in zip(cells, starts, bounds):
+            rows = order[start:end]
+            self._lists[cell].add([ids[i] for i in rows], vectors[rows])
+            for i in rows:
+                self._where[ids[i]] = int(cell)
+
+    def add(self, ids: Sequence[str], embeddings: Iterable) -> None:
+        """
+        Insert or replace embeddings, training the quantizer once enough vectors exist.
+
+        Args:
+            ids (Sequence[str]): Document IDs.
+            embeddings: 2-D array-like of shape (len(ids), dim).
+        """
+        if len(ids) == 0:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self._lists[0].dim = self.dim
+        self.remove([doc_id for doc_id in ids if doc_id in self._where])
+        if self.centroids is None:
+            self._add_assigned(ids, vectors, np.zeros(len(ids), dtype=np.int64))
+            if len(self) >= self.train_threshold:
+                self.train()
+        else:
+            self._add_assigned(ids, vectors, _assign(_normalize(vectors), self.centroids))
+
+    def remove(self, ids: Iterable[str]) -> int:
+        """
+        Remove embeddings by ID.
+
+        Args:
+            ids (Iterable[str]): Document IDs to remove. Unknown IDs are ignored.
+
+        Returns:
+            int: Number of rows removed.
+        """
+        by_cell: Dict[int, List[str]] = {}
+        for doc_id in ids:
+            cell = self._where.pop(doc_id, None)
+            if cell is not None:
+                by_cell.setdefault(cell, []).append(doc_id)
+        return sum(self._lists[cell].remove(cell_ids) for cell, cell_ids in by_cell.items())
+
+    def rename(self, mapping: Dict[str, str]) -> int:
+        """
+        Re-key vectors in place; they stay in their cells.
+
+        Args:
+            mapping (Dict[str, str]): Old ID to new ID. Unknown old IDs are ignored; vectors already
+                stored under a new ID are replaced.
+
+        Returns:
+            int: Number of vectors renamed.
+        """
+        self.remove([new_id for new_id in mapping.values() if new_id in self._where and new_id not in mapping])
+        cells = [(self._where.pop(old_id), old_id, new_id) for old_id, new_id in mapping.items() if old_id in self._where]
+        by_cell: Dict[int, Dict[str, str]] = {}
+        for cell, old_id, new_id in cells:
+            by_cell.setdefault(cell, {})[old_id] = new_id
+            self._where[new_id] = cell
+        return sum(self._lists[cell].rename(cell_mapping) for cell, cell_mapping in by_cell.items())
+
+    def train(self, iters: int = 10, warm_start: bool = False) -> None:
+        """
+        Train (or retrain) the coarse quantizer on the current contents and reassign every vector.
+
+        Args:
+            iters (int): Number of k-means iterations.
+            warm_start (bool): Start from the current centroids when the cell count is unchanged.
+        """
+        ids, vectors = self._all()
+        n = len(ids)
+        if n == 0:
+            return
+        nlist = min(self.nlist or max(1, min(int(4 * np.sqrt(n)), n // 39)), n)
+        rng = np.random.default_rng(self.seed)
+        sample = vectors if n <= nlist * 256 else vectors[rng.choice(n, size=nlist * 256, replace=False)]
+        init = self.centroids if warm_start else None
+        self.centroids = spherical_kmeans(sample, nlist, iters=iters, init=init, seed=self.seed)
+        self.trained_size = n
+        self._fill(ids, vectors)
+
+    def needs_rebuild(self) -> bool:
+        """
+        bool: True when the index has doubled in size since it was last trained.
+        """
+        if self.centroids is None:
+            return len(self) >= self.train_threshold
+        return len(self) > 2 * self.trained_size
+
+    def rebuild(self, iters: int = 3) -> None:
+        """
+        Incrementally retrain the quantizer, warm-started from the current centroids.
+
+        Args:
+            iters (int): Number of k-means refinement iterations.
+        """
+        self.train(iters=iters, warm_start=True)
+
+    def reset(self, ids: Sequence[str], embeddings: Iterable) -> None:
+        """
+        Replace the indexed vectors while keeping the trained quantizer.
+
+        Args:
+            ids (Sequence[str]): Document IDs.
+            embeddings: 2-D array-like of shape (len(ids), dim).
+        """
+        if not len(ids):
+            # Every row was deleted: empty the cells but keep the quantizer for new rows
+            vectors = np.empty((0, self.dim or 0), dtype=np.float32)
+        else:
+            vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        if len(ids) and self.dim is None:
+            self.dim = vectors.shape[1]
+        self._fill(ids, vectors)
+        if self.needs_rebuild():
+            self.rebuild()
+
+    def search(self, query_emb, k: int = 5, nprobe: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Return the approximate top-k (id, cosine similarity) pairs for a query embedding.
+
+        Args:
+            query_emb: Query embedding vector.
+            k (int): Number of results to return.
+            nprobe (Optional[int]): Override the number of cells searched.
+
+        Returns:
+            List[Tuple[str, float]]: Pairs sorted by descending similarity.
+        """
+        if not self._where or k <= 0:
+            return []
+        if self.centroids is None:
+            return self._lists[0].search(query_emb, k)
+        q = np.asarray(query_emb, dtype=np.float32).ravel()
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        cell_scores = self.centroids @ q
+        probe = np.argpartition(-cell_scores, nprobe - 1)[:nprobe]
+        hits: List[Tuple[str, float]] = []
+        for cell in probe:
+            hits.extend(self._lists[cell].search(q, k))
+        return heapq.nlargest(k, hits, key=lambda hit: hit[1])
+
+    def save(self, path: str, **meta) -> None:
+        """
+        Persist the index to an ``.npz`` file (written atomically).
+
+        Args:
+            path (str): Destination file path.
+            **meta: Extra scalar metadata stored alongside the index.
+        """
+        ids, vectors = self._all()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                ids=np.array(ids, dtype=str),
+                vectors=vectors,
+                centroids=self.centroids if self.centroids is not None else np.empty((0, 0), dtype=np.float32),
+                trained_size=np.int64(self.trained_size),
+                **{f"meta_{key}": np.asarray(value) for key, value in meta.items()},
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, **params) -> Tuple["IVFIndex", dict]:
+        """
+        Load an index written by :meth:`save`.
+
+        Args:
+            path (str): Source file path.
+            **params: Constructor parameters (e.g. ``nprobe``).
+
+        Returns:
+            Tuple[IVFIndex, dict]: The index and the metadata saved with it.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            index = cls(**params)
+            vectors = data["vectors"]
+            if vectors.size:
+                index.dim = vectors.shape[1]
+            if data["centroids"].size:
+                index.centroids = data["centroids"]
+                index.trained_size = int(data["trained_size"])
+            index._fill([str(doc_id) for doc_id in data["ids"]], vectors)
+            meta = {key[5:]: data[key].item() for key in data.files if key.startswith("meta_")}
+        return index, meta
@@ -1,11 +1,209 @@
-from typing import List
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence
+import os
+import re
+import zlib
 import numpy as np
 
+_TOKEN_RE = re.compile(r"[A-Za-z0-9_]+")
+
+
+class Embedder(ABC):
+    """
+    Interface for embedding backends.
+
+    Implementations embed a batch of texts in one call and return a float32
+    matrix of shape ``(len(texts), dim)``. ``id`` identifies the model and its
+    configuration, so embeddings from different backends are never mixed.
+
+    Example:
+        >>> embedder = get_embedder("hashing")
+        >>> matrix = embedder.embed_batch(["def foo():", "class Bar:"])
+        >>> matrix.shape
+        (2, 384)
+    """
+    id: str
+    dim: int
+
+    @abstractmethod
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed a batch of texts.
+
+        Args:
+            texts (Sequence[str]): Input texts.
+
+        Returns:
+            np.ndarray: float32 matrix of shape (len(texts), dim).
+        """
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embed a single text.
+
+        Args:
+            text (str): Input text.
+
+        Returns:
+            np.ndarray: float32 vector of shape (dim,).
+        """
+        return self.embed_batch([text])[0]
+
+
+class HashingEmbedder(Embedder):
+    """
+    Deterministic hashing-vectorizer embedder that runs offline with no model download.
+
+    Each identifier-like token is hashed with CRC32 into one of ``dim`` signed
+    buckets (the "hashing trick"), term counts are log-scaled and each row is
+    L2-normalised. Output is identical across processes and threads.
+
+    Example:
+        >>> embedder = HashingEmbedder(dim=384)
+        >>> vec = embedder.embed("def parse_config(path):")
+    """
+
+    def __init__(self, dim: int = 384):
+        """
+        Initialize the HashingEmbedder.
+
+        Args:
+            dim (int): Embedding dimension.
+        """
+        self.dim = dim
+        self.id = f"hashing-v1-{dim}"
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        rows: List[int] = []
+        hashes: List[int] = []
+        for row, text in enumerate(texts):
+            tokens = _TOKEN_RE.findall(text.lower())
+            rows.extend([row] * len(tokens))
+            hashes.extend(zlib.crc32(token.encode("utf-8")) for token in tokens)
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        if hashes:
+            h = np.asarray(hashes, dtype=np.uint32)
+            signs = np.where(h & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(matrix, (np.asarray(rows), (h % self.dim).astype(np.int64)), signs)
+            np.copysign(np.log1p(np.abs(matrix)), matrix, out=matrix)
+            matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-8
+        return matrix
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """
+    Local CPU embedder backed by ``sentence-transformers`` (PyTorch or ONNX runtime).
+
+    The model is loaded once; texts are encoded in mini-batches of
+    ``batch_size`` and intra-op parallelism is capped at ``num_threads``.
+
+    Example:
+        >>> embedder = SentenceTransformerEmbedder("all-MiniLM-L6-v2", batch_size=64, num_threads=4)
+        >>> matrix = embedder.embed_batch(chunks)
+    """
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", batch_size: int = 64, num_threads: Optional[int] = None, backend: str = "torch", device: str = "cpu"):
+        """
+        Initialize the SentenceTransformerEmbedder.
+
+        Args:
+            model_name (str): sentence-transformers model name or local path.
+            batch_size (int): Mini-batch size for encoding.
+            num_threads (Optional[int]): Intra-op thread count (defaults to the runtime's choice).
+            backend (str): "torch" or "onnx".
+            device (str): Device to run on.
+        """
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError("sentence-transformers is not installed.")
+        if num_threads:
+            try:
+                import torch
+                torch.set_num_threads(num_threads)
+            except ImportError:
+                pass
+        model_kwargs = {}
+        if backend == "onnx" and num_threads:
+            try:
+                import onnxruntime
+                options = onnxruntime.SessionOptions()
+                options.intra_op_num_threads = num_threads
+                model_kwargs["session_options"] = options
+            except ImportError:
+                raise ImportError("onnxruntime is not installed.")
+        kwargs = {"device": device}
+        if backend != "torch":
+            kwargs["backend"] = backend
+            kwargs["model_kwargs"] = model_kwargs
+        self.model = SentenceTransformer(model_name, **kwargs)
+        self.batch_size = batch_size
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.id = f"st-{model_name}-{backend}"
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, self.dim), dtype=np.float32)
+        vectors = self.model.encode(list(texts), batch_size=self.batch_size, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+# Registry of embedding backends selectable via RAGMS02_EMBEDDER
+EMBEDDERS = {
+    "hashing": HashingEmbedder,
+    "sentence-transformers": SentenceTransformerEmbedder,
+}
+
+_default_embedder: Optional[Embedder] = None
+
+
+def get_embedder(name: Optional[str] = None, **params) -> Embedder:
+    """
+    Build an embedder by name, configured from the environment when no parameters are given.
+
+    Environment:
+        RAGMS02_EMBEDDER: Backend name (default "hashing").
+        RAGMS02_EMBEDDING_MODEL: Model name for "sentence-transformers".
+        RAGMS02_EMBEDDING_BACKEND: "torch" or "onnx" for "sentence-transformers".
+        RAGMS02_EMBEDDING_BATCH_SIZE: Mini-batch size for "sentence-transformers".
+        RAGMS02_EMBEDDING_THREADS: Intra-op thread count for "sentence-transformers".
+
+    Args:
+        name (Optional[str]): Backend name from :data:`EMBEDDERS`.
+        **params: Constructor parameters for the backend.
+
+    Returns:
+        Embedder: A new embedder.
+    """
+    name = name or os.environ.get("RAGMS02_EMBEDDER", "hashing")
+    if name not in EMBEDDERS:
+        raise ValueError(f"Unknown embedder: {name}")
+    if not params and name == "sentence-transformers":
+        params = {
+            "model_name": os.environ.get("RAGMS02_EMBEDDING_MODEL", "all-MiniLM-L6-v2"),
+            "backend": os.environ.get("RAGMS02_EMBEDDING_BACKEND", "torch"),
+            "batch_size": int(os.environ.get("RAGMS02_EMBEDDING_BATCH_SIZE", "64")),
+            "num_threads": int(os.environ.get("RAGMS02_EMBEDDING_THREADS", "0")) or None,
+        }
+    return EMBEDDERS[name](**params)
+
+
+def get_default_embedder() -> Embedder:
+    """
+    Return the process-wide default embedder, creating it on first use.
+    """
+    global _default_embedder
+    if _default_embedder is None:
+        _default_embedder = get_embedder()
+    return _default_embedder
+
+
 def embed_text(text: str) -> List[float]:
     """
     Generate an embedding vector for the given text.
 
-    This is a placeholder implementation. In real use, replace with a call to an embedding model (e.g., sentence-transformers, OpenAI, etc.).
+    Uses the default :class:`Embedder` (see :func:`get_embedder`). Prefer
+    ``Embedder.embed_batch`` when embedding more than one text.
 
     Args:
         text (str): Input text to embed.
@@ -18,5 +216,4 @@ def embed_text(text: str) -> List[float]:
         >>> len(vec)
         384
     """
-    np.random.seed(hash(text) % 2**32)
-    return np.random.rand(384).tolist()
+    return get_default_embedder().embed(text).tolist()
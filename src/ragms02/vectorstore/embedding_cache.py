@@ -0,0 +1,218 @@
+"""
+Persistent content-addressed embedding cache.
+
+Embeddings are keyed by ``(embedder id, sha256(chunk text))`` so unchanged
+chunks of a modified file are never re-embedded. Entries are evicted in
+least-recently-used order once ``max_entries`` is exceeded.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Dict, Sequence
+import numpy as np
+from ragms02.vectorstore.embedding import Embedder
+
+
+def content_hash(text: str) -> str:
+    """
+    Return the sha256 hex digest of a chunk's text.
+
+    Args:
+        text (str): Chunk text.
+
+    Returns:
+        str: Hex digest.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    SQLite-backed LRU cache of embeddings.
+
+    Example:
+        >>> cache = EmbeddingCache("rag.db.embcache", max_entries=100000)
+        >>> cache.put_many("hashing-v1-384", {"abc...": vec})
+        >>> found = cache.get_many("hashing-v1-384", ["abc..."])
+    """
+
+    def __init__(self, db_path: str = ":memory:", max_entries: int = 200000, touch_batch: int = 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            db_path (str): SQLite file for the cache. Defaults to an in-memory database.
+            max_entries (int): Maximum number of cached embeddings before LRU eviction.
+            touch_batch (int): Lookups buffered in memory before their ``last_used`` update is written.
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.touch_batch = touch_batch
+        self._touched: Dict[tuple, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        if db_path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                embedder_id TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (embedder_id, hash)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_used ON embedding_cache (last_used)")
+        self.conn.commit()
+        self._entries = self.conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+
+    def __len__(self) -> int:
+        return self._entries
+
+    def get_many(self, embedder_id: str, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up cached embeddings and mark them as recently used.
+
+        Args:
+            embedder_id (str): Embedder identifier.
+            hashes (Sequence[str]): Chunk content hashes.
+
+        Returns:
+            Dict[str, np.ndarray]: Embeddings for the hashes that were found.
+        """
+        found: Dict[str, np.ndarray] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                cur = self.conn.execute(
+                    f"SELECT hash, embedding FROM embedding_cache WHERE embedder_id=? AND hash IN ({placeholders})",
+                    [embedder_id, *batch],
+                )
+                for digest, blob in cur:
+                    found[digest] = np.frombuffer(blob, dtype=np.float32)
+            # Recency updates are buffered so lookups stay read-only; they are written in batches
+            now = time.time()
+            for digest in found:
+                self._touched[(embedder_id, digest)] = now
+            if len(self._touched) >= self.touch_batch:
+                self._flush_touched()
+                self.conn.commit()
+            self.hits += sum(1 for digest in hashes if digest in found)
+            self.misses += sum(1 for digest in hashes if digest not in found)
+        return found
+
+    def put_many(self, embedder_id: str, embeddings: Dict[str, np.ndarray]) -> None:
+        """
+        Store embeddings and evict the least recently used entries if the cache is full.
+
+        Args:
+            embedder_id (str): Embedder identifier.
+            embeddings (Dict[str, np.ndarray]): Embeddings keyed by chunk content hash.
+        """
+        if not embeddings:
+            return
+        now = time.time()
+        with self._lock:
+            cur = self.conn.executemany(
+                "INSERT OR IGNORE INTO embedding_cache (embedder_id, hash, embedding, last_used) VALUES (?, ?, ?, ?)",
+                [(embedder_id, digest, np.asarray(vec, dtype=np.float32).tobytes(), now) for digest, vec in embeddings.items()],
+            )
+            self._entries += max(cur.rowcount, 0)
+            if self._entries > self.max_entries:
+                self._flush_touched()
+                # Evict down to 90% so eviction runs once per many inserts, not on every put.
+                excess = self._entries - int(self.max_entries * 0.9)
+                self.conn.execute(
+                    "DELETE FROM embedding_cache WHERE (embedder_id, hash) IN "
+                    "(SELECT embedder_id, hash FROM embedding_cache ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+                self._entries -= excess
+                self.evictions += excess
+            self.conn.commit()
+
+    def _flush_touched(self) -> None:
+        if self._touched:
+            self.conn.executemany(
+                "UPDATE embedding_cache SET last_used=? WHERE embedder_id=? AND hash=?",
+                [(now, embedder_id, digest) for (embedder_id, digest), now in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return hit/miss counters.
+
+        Returns:
+            Dict[str, float]: ``hits``, ``misses``, ``evictions``, ``entries`` and ``hit_rate``.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": self._entries,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        """
+        Write buffered recency updates and close the cache database.
+        """
+        with self._lock:
+            self._flush_touched()
+            self.conn.commit()
+        self.conn.close()
+
+
+class CachedEmbedder(Embedder):
+    """
+    Embedder wrapper that only embeds texts whose content hash is not already cached.
+
+    Example:
+        >>> embedder = CachedEmbedder(HashingEmbedder(), EmbeddingCache("rag.db.embcache"))
+        >>> matrix = embedder.embed_batch(chunks)
+    """
+
+    def __init__(self, embedder: Embedder, cache: EmbeddingCache):
+        """
+        Initialize the CachedEmbedder.
+
+        Args:
+            embedder (Embedder): Underlying embedder used on cache misses.
+            cache (EmbeddingCache): Cache storage.
+        """
+        self.embedder = embedder
+        self.cache = cache
+        self.id = embedder.id
+        self.dim = embedder.dim
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        hashes = [content_hash(text) for text in texts]
+        found = self.cache.get_many(self.id, hashes)
+        missing: Dict[str, str] = {}
+        for digest, text in zip(hashes, texts):
+            if digest not in found and digest not in missing:
+                missing[digest] = text
+        if missing:
+            vectors = self.embedder.embed_batch(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(self.id, computed)
+            found.update(computed)
+        matrix = np.empty((len(texts), self.dim), dtype=np.float32)
+        for row, digest in enumerate(hashes):
+            matrix[row] = found[digest]
+        return matrix
+
+    def close(self) -> None:
+        """
+        Close the underlying cache.
+        """
+        self.cache.close()
@@ -0,0 +1,218 @@
+"""
+Append-only, memory-mapped embedding file.
+
+Embeddings are stored as fixed-size rows after a 64-byte header (magic,
+dtype, dimension). The ``vectors`` table keeps each chunk's row number
+(``vec_row``), so search reads vectors straight out of the mapping instead
+of copying BLOBs through the sqlite3 cursor, and every process that opens
+the file shares the same OS page cache.
+
+Rows are never rewritten in place: replacing or deleting a chunk leaves its
+old row unreferenced until the file is compacted (:meth:`EmbeddingFile.write_compacted`
+and :meth:`EmbeddingFile.replace`).
+"""
+import os
+import struct
+import threading
+from typing import Optional, Sequence
+import numpy as np
+
+MAGIC = b"RAGVEC01"
+HEADER_SIZE = 64
+DTYPES = {"float32": np.float32, "float16": np.float16}
+
+
+class EmbeddingFile:
+    """
+    Flat float32/float16 embedding matrix on disk, read through ``np.memmap``.
+
+    Example:
+        >>> emb = EmbeddingFile("rag.db.vectors", dtype="float16")
+        >>> first = emb.append(vectors)
+        >>> emb.rows([first, first + 1])
+    """
+
+    def __init__(self, path: str, dtype: str = "float32"):
+        """
+        Open (or create) an embedding file.
+
+        Args:
+            path (str): File path.
+            dtype (str): Storage dtype for a new file ("float32" or "float16"). An existing file keeps its own.
+        """
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown embedding dtype: {dtype}")
+        self.path = path
+        self.dtype = np.dtype(DTYPES[dtype])
+        self.dim: Optional[int] = None
+        self._lock = threading.Lock()
+        self._map: Optional[np.memmap] = None
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER_SIZE:
+            self._read_header()
+        else:
+            with open(path, "wb") as f:
+                f.write(self._header(0))
+        self._file = open(path, "r+b")
+
+    def _header(self, dim: int) -> bytes:
+        code = next(name for name, dt in DTYPES.items() if np.dtype(dt) == self.dtype).encode()
+        return struct.pack("<8s8sI", MAGIC, code, dim).ljust(HEADER_SIZE, b"\0")
+
+    def _read_header(self) -> None:
+        with open(self.path, "rb") as f:
+            magic, code, dim = struct.unpack("<8s8sI", f.read(20))
+        if magic != MAGIC:
+            raise ValueError(f"Not an embedding file: {self.path}")
+        self.dtype = np.dtype(DTYPES[code.rstrip(b"\0").decode()])
+        self.dim = dim or None
+
+    def __len__(self) -> int:
+        if not self.dim:
+            return 0
+        # Size from the file itself, so rows appended by other processes are seen too
+        return (os.fstat(self._file.fileno()).st_size - HEADER_SIZE) // (self.dim * self.dtype.itemsize)
+
+    def append(self, vectors) -> int:
+        """
+        Append rows and return the row number of the first one.
+
+        Callers serialise appends (the store holds its writer lock).
+
+        Args:
+            vectors: 2-D array-like of shape (n, dim).
+
+        Returns:
+            int: Row number of the first appended vector.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=self.dtype)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self._file.seek(0)
+            self._file.write(self._header(self.dim))
+            self._file.flush()
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match file dimension {self.dim}.")
+        first = len(self)
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(vectors.tobytes())
+        # Make the rows visible to the mapping (and to other processes) before the row numbers are committed
+        self._file.flush()
+        return first
+
+    def sync(self) -> None:
+        """
+        Flush appended rows to stable storage.
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def view(self) -> np.ndarray:
+        """
+        Return a read-only zero-copy view of every row, remapping if the file grew.
+
+        Returns:
+            np.ndarray: Array of shape (len(self), dim) backed by the mapping.
+        """
+        self._reopen_if_replaced()
+        n = len(self)
+        if n == 0:
+            return np.empty((0, self.dim or 0), dtype=self.dtype)
+        current = self._map
+        if current is None or current.shape[0] < n:
+            with self._lock:
+                current = self._map
+                if current is None or current.shape[0] < n:
+                    current = self._map = np.memmap(self.path, dtype=self.dtype, mode="r", offset=HEADER_SIZE, shape=(n, self.dim))
+        return current[:n]
+
+    def rows(self, rows: Sequence[int]) -> np.ndarray:
+        """
+        Gather rows as a float32 matrix.
+
+        Args:
+            rows (Sequence[int]): Row numbers.
+
+        Returns:
+            np.ndarray: Array of shape (len(rows), dim).
+        """
+        if len(rows) == 0:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.asarray(self.view()[np.asarray(rows, dtype=np.int64)], dtype=np.float32)
+
+    @property
+    def compact_path(self) -> str:
+        """str: Path the compacted file is written to before it replaces this one."""
+        return self.path + ".compact"
+
+    def write_compacted(self, rows: Sequence[int]) -> str:
+        """
+        Write a copy of the file keeping only ``rows``, in the given order.
+
+        In the copy, row ``rows[i]`` is found at row ``i``. The live file is
+        not touched: the caller commits its new row numbers first and then
+        calls :meth:`replace`.
+
+        Args:
+            rows (Sequence[int]): Live row numbers.
+
+        Returns:
+            str: Path of the compacted copy (:attr:`compact_path`).
+        """
+        tmp = self.compact_path
+        with open(tmp, "wb") as f:
+            f.write(self._header(self.dim or 0))
+            view = self.view()
+            for start in range(0, len(rows), 65536):
+                f.write(np.ascontiguousarray(view[np.asarray(rows[start:start + 65536], dtype=np.int64)]).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        return tmp
+
+    def replace(self) -> None:
+        """
+        Swap in the copy written by :meth:`write_compacted` and reopen the file.
+
+        The copy may already have been moved into place by another process;
+        the file is reopened either way.
+        """
+        with self._lock:
+            self._map = None
+            self._file.close()
+            try:
+                os.replace(self.compact_path, self.path)
+            except FileNotFoundError:
+                pass
+            self._file = open(self.path, "r+b")
+
+    def _reopen_if_replaced(self) -> None:
+        # Another process compacted the file: its path now names a new inode
+        try:
+            replaced = os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+        except FileNotFoundError:
+            return
+        if replaced:
+            with self._lock:
+                self._map = None
+                self._file.close()
+                self._file = open(self.path, "r+b")
+
+    def truncate(self) -> None:
+        """
+        Drop every row (the dimension is forgotten as well).
+        """
+        with self._lock:
+            self._map = None
+            self.dim = None
+            self._file.seek(0)
+            self._file.truncate()
+            self._file.write(self._header(0))
+            self._file.flush()
+
+    def close(self) -> None:
+        """
+        Close the file and drop the mapping.
+        """
+        self._map = None
+        self._file.close()
@@ -0,0 +1,163 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+
+class MatrixIndex:
+    """
+    In-memory exact cosine-similarity index for a single project.
+
+    Embeddings are kept in one contiguous float32 matrix with their L2 norms
+    precomputed, so a query is scored with a single matrix-vector product and
+    the top-k rows are selected with ``np.argpartition``.
+
+    Example:
+        >>> index = MatrixIndex()
+        >>> index.add(["doc1", "doc2"], [[0.1, 0.2], [0.3, 0.4]])
+        >>> results = index.search([0.1, 0.2], k=1)
+    """
+
+    def __init__(self, dim: Optional[int] = None, capacity: int = 1024):
+        """
+        Initialize an empty index.
+
+        Args:
+            dim (Optional[int]): Embedding dimension. Inferred from the first add if omitted.
+            capacity (int): Initial number of preallocated rows.
+        """
+        self.dim = dim
+        self._capacity = capacity
+        self._size = 0
+        self._ids: List[str] = []
+        self._pos: Dict[str, int] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._norms: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._pos
+
+    @property
+    def ids(self) -> List[str]:
+        """List[str]: Document IDs in row order."""
+        return list(self._ids)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """np.ndarray: View of the populated rows of the embedding matrix."""
+        if self._matrix is None:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return self._matrix[: self._size]
+
+    def _reserve(self, rows: int):
+        if self._matrix is None:
+            capacity = max(self._capacity, rows)
+            self._matrix = np.empty((capacity, self.dim), dtype=np.float32)
+            self._norms = np.empty(capacity, dtype=np.float32)
+            return
+        needed = self._size + rows
+        if needed <= self._matrix.shape[0]:
+            return
+        capacity = max(needed, self._matrix.shape[0] * 2)
+        matrix = np.empty((capacity, self.dim), dtype=np.float32)
+        matrix[: self._size] = self._matrix[: self._size]
+        norms = np.empty(capacity, dtype=np.float32)
+        norms[: self._size] = self._norms[: self._size]
+        self._matrix, self._norms = matrix, norms
+
+    def add(self, ids: Sequence[str], embeddings: Iterable) -> None:
+        """
+        Insert or replace embeddings.
+
+        Args:
+            ids (Sequence[str]): Document IDs.
+            embeddings: 2-D array-like of shape (len(ids), dim).
+        """
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if len(ids) == 0:
+            return
+        vectors = vectors.reshape(len(ids), -1)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dim}.")
+        norms = np.linalg.norm(vectors, axis=1)
+        self._reserve(len(ids))
+        for doc_id, vec, norm in zip(ids, vectors, norms):
+            row = self._pos.get(doc_id)
+            if row is None:
+                row = self._size
+                self._pos[doc_id] = row
+                self._ids.append(doc_id)
+                self._size += 1
+            self._matrix[row] = vec
+            self._norms[row] = norm
+
+    def remove(self, ids: Iterable[str]) -> int:
+        """
+        Remove embeddings by ID. Rows are compacted by moving the last row into the gap.
+
+        Args:
+            ids (Iterable[str]): Document IDs to remove. Unknown IDs are ignored.
+
+        Returns:
+            int: Number of rows removed.
+        """
+        removed = 0
+        for doc_id in ids:
+            row = self._pos.pop(doc_id, None)
+            if row is None:
+                continue
+            last = self._size - 1
+            if row != last:
+                moved_id = self._ids[last]
+                self._matrix[row] = self._matrix[last]
+                self._norms[row] = self._norms[last]
+                self._ids[row] = moved_id
+                self._pos[moved_id] = row
+            self._ids.pop()
+            self._size -= 1
+            removed += 1
+        return removed
+
+    def rename(self, mapping: Dict[str, str]) -> int:
+        """
+        Re-key rows in place; their embeddings are not touched.
+
+        Args:
+            mapping (Dict[str, str]): Old ID to new ID. Unknown old IDs are ignored; rows already
+                stored under a new ID are replaced.
+
+        Returns:
+            int: Number of rows renamed.
+        """
+        self.remove([new_id for new_id in mapping.values() if new_id in self._pos and new_id not in mapping])
+        rows = [(self._pos.pop(old_id), new_id) for old_id, new_id in mapping.items() if old_id in self._pos]
+        for row, new_id in rows:
+            self._ids[row] = new_id
+            self._pos[new_id] = row
+        return len(rows)
+
+    def search(self, query_emb, k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Return the top-k (id, cosine similarity) pairs for a query embedding.
+
+        Args:
+            query_emb: Query embedding vector.
+            k (int): Number of results to return.
+
+        Returns:
+            List[Tuple[str, float]]: Pairs sorted by descending similarity.
+        """
+        if self._size == 0 or k <= 0:
+            return []
+        q = np.asarray(query_emb, dtype=np.float32).ravel()
+        scores = self.matrix @ q
+        scores /= self._norms[: self._size] * np.linalg.norm(q) + 1e-8
+        if k < self._size:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(self._size)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self._ids[i], float(scores[i])) for i in top]
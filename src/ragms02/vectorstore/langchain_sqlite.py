@@ -1,8 +1,80 @@
 from langchain.vectorstores.base import VectorStore as LCVectorStore
 from langchain.schema import Document
-from typing import List, Optional, Any
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Any
+from urllib.parse import quote
 import numpy as np
+import logging
+import os
+import queue
+import re
 import sqlite3
+import threading
+import time
+from ragms02.vectorstore.index import MatrixIndex
+from ragms02.vectorstore.ann import IVFIndex
+from ragms02.vectorstore.embedding_cache import content_hash
+from ragms02.vectorstore.embedding_file import EmbeddingFile
+from ragms02.vectorstore.quantization import BLOB_DTYPES, QuantizedIndex, decode_rows, encode_rows
+
+logger = logging.getLogger(__name__)
+
+# Registry of in-memory index backends selectable via ``index_backend``
+INDEX_BACKENDS = {
+    "matrix": MatrixIndex,
+    "ivf": IVFIndex,
+    "quantized": QuantizedIndex,
+}
+
+# Where chunk embeddings live: BLOBs in the vectors table, or rows of a memory-mapped side file
+EMBEDDING_STORAGES = ("blob", "mmap")
+
+# Pragmas applied to every connection (overridable via ``pragmas``)
+DEFAULT_PRAGMAS = {
+    "synchronous": "NORMAL",
+    "cache_size": -65536,  # 64 MiB
+    "mmap_size": 268435456,  # 256 MiB
+    "temp_store": "MEMORY",
+}
+
+_CHUNK_ID = re.compile(r"::chunk(\d+)$")
+
+
+def _chunk_index(doc_id: str) -> Optional[int]:
+    # Position encoded in ``{file_path}::chunk{n}`` IDs, for rows added without an explicit chunk_index
+    match = _CHUNK_ID.search(doc_id)
+    return int(match.group(1)) if match else None
+
+
+# Version of the ``vectors`` layout, stored in PRAGMA user_version (see ``_migrate_schema``)
+SCHEMA_VERSION = 4
+
+# FTS5 tokenizer for chunk content: underscores are token characters, so ``parse_config`` stays one term
+FTS_TOKENIZE = "unicode61 tokenchars '_'"
+_FTS_TERM = re.compile(r"\w+")
+
+
+def fts_query(text: str) -> str:
+    """
+    Turn free text into an FTS5 query that matches any of its terms.
+
+    Every term is quoted, so operators and punctuation in the text (``-``,
+    ``*``, ``NEAR``, unbalanced quotes) can never cause a syntax error.
+
+    Args:
+        text (str): Query text.
+
+    Returns:
+        str: FTS5 MATCH expression ("" if the text has no terms).
+
+    Example:
+        >>> fts_query("where is parse_config() called?")
+        '"where" OR "is" OR "parse_config" OR "called"'
+    """
+    return " OR ".join(f'"{term}"' for term in dict.fromkeys(_FTS_TERM.findall(text)))
+
 
 class SQLiteLangChainVectorStore(LCVectorStore):
     """
@@ -16,33 +88,362 @@ class SQLiteLangChainVectorStore(LCVectorStore):
         >>> docs = store.similarity_search("query text", k=5, filter={"project_id": "proj1"})
     """
 
-    def __init__(self, db_path=":memory:"):
+    def __init__(self, db_path=":memory:", use_index: bool = False, index_backend: str = "matrix", index_params: Optional[dict] = None, read_pool_size: int = 0, pragmas: Optional[dict] = None, search_workers: int = 8, embedding_storage: str = "blob", embedding_dtype: Optional[str] = None, rerank: int = 0, hybrid: bool = False, prefilter: int = 0, rrf_k: int = 60, lexical_weight: float = 1.0):
         """
         Initialize the SQLiteLangChainVectorStore.
 
         Args:
             db_path (str): Path to the SQLite database file. Defaults to in-memory database.
+            use_index (bool): Keep a per-project in-memory index for search.
+            index_backend (str): Index backend name from :data:`INDEX_BACKENDS` ("matrix" or "ivf").
+            index_params (Optional[dict]): Backend parameters, e.g. ``{"nprobe": 16}`` for "ivf".
+            read_pool_size (int): Number of pooled read-only connections. File databases are
+                opened in WAL mode so readers never block the single writer connection.
+                In-memory databases always share the writer connection.
+            pragmas (Optional[dict]): Overrides for :data:`DEFAULT_PRAGMAS`.
+            search_workers (int): Threads used by :meth:`search_projects` to search projects in parallel.
+            embedding_storage (str): "blob" keeps embeddings in the ``vectors`` table; "mmap" appends them to
+                ``{db_path}.vectors`` (see :class:`EmbeddingFile`) and stores only the row number. Existing rows
+                are migrated when the mode changes. Requires a file database.
+            embedding_dtype (Optional[str]): Stored embedding dtype: "float32", "float16" or (BLOB storage only)
+                "int8" with a per-vector scale (see :mod:`ragms02.vectorstore.quantization`). Existing BLOBs are
+                converted in place when it differs from the recorded dtype; None keeps the database's dtype
+                (float32 for a new database). An existing embedding file always keeps its own dtype.
+            rerank (int): With an index, fetch this many candidates and re-score them exactly against the
+                stored embeddings before returning the top-k (0 disables re-ranking).
+            hybrid (bool): Let :meth:`search_projects` fuse BM25 and vector rankings when given the query text
+                (see :meth:`hybrid_search`). Requires SQLite with FTS5; otherwise search stays vector-only.
+            prefilter (int): In hybrid search, score only the best ``prefilter`` BM25 matches against the
+                query embedding instead of the whole project (0 disables the prefilter).
+            rrf_k (int): Reciprocal-rank-fusion constant; larger values flatten the rank contributions.
+            lexical_weight (float): Weight of the BM25 ranking relative to the vector ranking in the fusion.
 
         Example:
-            >>> store = SQLiteLangChainVectorStore(db_path=":memory:")
+            >>> store = SQLiteLangChainVectorStore(db_path="rag.db", use_index=True, index_backend="ivf", index_params={"nprobe": 16})
+            >>> store = SQLiteLangChainVectorStore(db_path="rag.db", embedding_storage="mmap", embedding_dtype="float16")
+            >>> store = SQLiteLangChainVectorStore(db_path="rag.db", index_backend="quantized", index_params={"codec": "pq", "m": 48}, rerank=100)
+            >>> store = SQLiteLangChainVectorStore(db_path="rag.db", hybrid=True, prefilter=2000)
         """
-        self.conn = sqlite3.connect(db_path)
+        if index_backend not in INDEX_BACKENDS:
+            raise ValueError(f"Unknown index backend: {index_backend}")
+        if embedding_storage not in EMBEDDING_STORAGES:
+            raise ValueError(f"Unknown embedding storage: {embedding_storage}")
+        if embedding_dtype is not None and embedding_dtype not in BLOB_DTYPES:
+            raise ValueError(f"Unknown embedding dtype: {embedding_dtype}")
+        self.db_path = db_path
+        self.in_memory = db_path == ":memory:" or str(db_path).startswith("file::memory:")
+        self.pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+        self.use_index = use_index
+        self.index_backend = index_backend
+        self.index_params = index_params or {}
+        self._indexes: Dict[str, Any] = {}
+        self._dirty = set()
+        self._chunk_count: Optional[Tuple[int, int]] = None  # (sum of project versions, row count)
+        self._write_lock = threading.RLock()
+        self._write_depth = 0
+        self._index_lock = threading.RLock()
+        self._readers: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self.read_pool_size = 0 if self.in_memory else read_pool_size
+        self.search_workers = search_workers
+        self._search_pool: Optional[ThreadPoolExecutor] = None
+        self.embedding_storage = embedding_storage
+        self.embedding_dtype = embedding_dtype
+        self.rerank = rerank
+        self.hybrid = hybrid
+        self.prefilter = prefilter
+        self.rrf_k = rrf_k
+        self.lexical_weight = lexical_weight
+        self.fts = False
+        self.embedding_file: Optional[EmbeddingFile] = None
+        if embedding_storage == "mmap":
+            if self.in_memory:
+                raise ValueError("mmap embedding storage requires a file database.")
+            self.embedding_file = EmbeddingFile(self.embedding_path, dtype=embedding_dtype or "float32")
+        # Odd while compact_embeddings() rewrites the embedding file; mapped reads retry if it changes
+        self._emb_generation = 0
+        self.conn = self._connect()
+        if not self.in_memory:
+            self.conn.execute("PRAGMA journal_mode=WAL")
         self._init_db()
+        for _ in range(self.read_pool_size):
+            self._readers.put(self._connect(query_only=True))
+
+    def _connect(self, query_only: bool = False) -> sqlite3.Connection:
+        # Statements are prepared once per connection and reused from sqlite3's statement cache.
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256, uri=str(self.db_path).startswith("file:"))
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        if query_only:
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """
+        Hold the single writer connection; commits when the outermost block exits, rolls back on error.
+
+        Example:
+            >>> with store.writer() as conn:
+            ...     conn.execute("DELETE FROM vectors WHERE project_id=?", ("proj1",))
+        """
+        with self._write_lock:
+            self._write_depth += 1
+            try:
+                yield self.conn
+                if self._write_depth == 1:
+                    self.conn.commit()
+            except BaseException:
+                if self._write_depth == 1:
+                    self.conn.rollback()
+                raise
+            finally:
+                self._write_depth -= 1
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a pooled read connection (or the writer connection when no pool is configured).
+
+        Example:
+            >>> with store.reader() as conn:
+            ...     count = conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        """
+        if self.read_pool_size == 0:
+            with self._write_lock:
+                yield self.conn
+            return
+        conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
 
     def _init_db(self):
         """
-        Initialize the database schema.
+        Initialize the database schema, migrating older layouts first.
         """
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS vectors (
-                id TEXT PRIMARY KEY,
-                project_id TEXT,
-                tag TEXT,
+        with self.writer() as conn:
+            self._migrate_schema(conn)
+            conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)")
+            # Per-project change counter bumped on every write; persisted indexes are validated against it.
+            # No ON CONFLICT clause in the trigger body: the outer INSERT OR REPLACE would override it.
+            conn.execute("CREATE TABLE IF NOT EXISTS vector_versions (project_id TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+            for name, event, row in (("insert", "INSERT", "new"), ("update", "UPDATE", "new"), ("delete", "DELETE", "old")):
+                conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS vectors_version_{name} AFTER {event} ON vectors BEGIN
+                        UPDATE vector_versions SET version = version + 1 WHERE project_id = {row}.project_id;
+                        INSERT INTO vector_versions (project_id, version) SELECT {row}.project_id, 1
+                        WHERE NOT EXISTS (SELECT 1 FROM vector_versions WHERE project_id = {row}.project_id);
+                    END
+                """)
+            self._migrate_embedding_storage(conn)
+            self.fts = self._init_fts(conn)
+
+    def _migrate_schema(self, conn: sqlite3.Connection) -> None:
+        # PRAGMA user_version records the last migration applied; each runs in its own transaction
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise ValueError(f"Database schema version {version} is newer than this release supports ({SCHEMA_VERSION}).")
+        for target in range(version + 1, SCHEMA_VERSION + 1):
+            if not conn.in_transaction:
+                conn.execute("BEGIN")
+            getattr(self, f"_schema_v{target}")(conn)
+            conn.execute(f"PRAGMA user_version={target}")
+            conn.commit()
+            logger.info("Migrated %s to schema version %d", self.db_path, target)
+
+    def _schema_v1(self, conn: sqlite3.Connection) -> None:
+        # Integer rowid key, dedicated file_path/chunk_index columns and a (project_id, file_path) index.
+        # Databases from before versioning keyed rows by a TEXT id and stored the file path as ``tag``.
+        legacy = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='vectors'").fetchone()
+        conn.execute("DROP TABLE IF EXISTS vectors_v1")
+        conn.execute("""
+            CREATE TABLE vectors_v1 (
+                row_id INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                project_id TEXT NOT NULL,
+                file_path TEXT NOT NULL DEFAULT '',
+                chunk_index INTEGER,
+                embedding BLOB,
+                vec_row INTEGER,
+                content TEXT,
+                content_hash TEXT
+            )
+        """)
+        if legacy:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(vectors)")}
+            # Triggers and the FTS index refer to the old rowids; both are recreated by _init_db
+            for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type='trigger' AND tbl_name='vectors'").fetchall():
+                conn.execute(f"DROP TRIGGER {name}")
+            conn.execute("DROP TABLE IF EXISTS vectors_fts")
+            content_hash_col = "content_hash" if "content_hash" in columns else "NULL"
+            vec_row_col = "vec_row" if "vec_row" in columns else "NULL"
+            conn.execute(f"""
+                INSERT INTO vectors_v1 (id, project_id, file_path, chunk_index, embedding, vec_row, content, content_hash)
+                SELECT id, COALESCE(project_id, 'default'), COALESCE(tag, ''),
+                       CASE WHEN instr(id, '::chunk') > 0 THEN CAST(substr(id, instr(id, '::chunk') + 7) AS INTEGER) END,
+                       embedding, {vec_row_col}, content, {content_hash_col}
+                FROM vectors ORDER BY rowid
+            """)
+            conn.execute("DROP TABLE vectors")
+        conn.execute("ALTER TABLE vectors_v1 RENAME TO vectors")
+        conn.execute("CREATE INDEX idx_vectors_project_file ON vectors (project_id, file_path, chunk_index)")
+
+    def _schema_v2(self, conn: sqlite3.Connection) -> None:
+        # Per-file manifest used to skip unchanged files; replaces the bulk loader's ingest_manifest
+        conn.execute("""
+            CREATE TABLE file_manifest (
+                project_id TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                size INTEGER,
+                mtime_ns INTEGER,
+                hash TEXT NOT NULL,
+                chunks INTEGER,
+                PRIMARY KEY (project_id, file_path)
+            ) WITHOUT ROWID
+        """)
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='ingest_manifest'").fetchone():
+            conn.execute("""
+                INSERT INTO file_manifest (project_id, file_path, size, mtime_ns, hash, chunks)
+                SELECT m.project_id, m.path, m.size, m.mtime_ns, m.hash,
+                       (SELECT COUNT(*) FROM vectors v WHERE v.project_id = m.project_id AND v.file_path = m.path)
+                FROM ingest_manifest m
+            """)
+            conn.execute("DROP TABLE ingest_manifest")
+
+    def _schema_v3(self, conn: sqlite3.Connection, batch_size: int = 4096) -> None:
+        # Lets sync_file_stream look up a file's stored chunks by content hash, one batch at a time
+        while True:
+            rows = conn.execute("SELECT row_id, content FROM vectors WHERE content_hash IS NULL LIMIT ?", (batch_size,)).fetchall()
+            if not rows:
+                break
+            conn.executemany("UPDATE vectors SET content_hash=? WHERE row_id=?", [(content_hash(content or ""), row_id) for row_id, content in rows])
+        conn.execute("CREATE INDEX idx_vectors_file_hash ON vectors (project_id, file_path, content_hash)")
+
+    def _schema_v4(self, conn: sqlite3.Connection) -> None:
+        # Chunk ids are unique per project, not globally: the same relative path in two projects
+        # must not replace the other project's rows. Rowids are kept, so FTS and mmap rows stay valid;
+        # dropping the old table drops its triggers, which _init_db recreates.
+        conn.execute("DROP TABLE IF EXISTS vectors_v4")
+        conn.execute("""
+            CREATE TABLE vectors_v4 (
+                row_id INTEGER PRIMARY KEY,
+                id TEXT NOT NULL,
+                project_id TEXT NOT NULL,
+                file_path TEXT NOT NULL DEFAULT '',
+                chunk_index INTEGER,
                 embedding BLOB,
-                content TEXT
+                vec_row INTEGER,
+                content TEXT,
+                content_hash TEXT,
+                UNIQUE (project_id, id)
             )
         """)
-        self.conn.commit()
+        conn.execute("""
+            INSERT INTO vectors_v4 (row_id, id, project_id, file_path, chunk_index, embedding, vec_row, content, content_hash)
+            SELECT row_id, id, project_id, file_path, chunk_index, embedding, vec_row, content, content_hash FROM vectors
+        """)
+        conn.execute("DROP TABLE vectors")
+        conn.execute("ALTER TABLE vectors_v4 RENAME TO vectors")
+        conn.execute("CREATE INDEX idx_vectors_project_file ON vectors (project_id, file_path, chunk_index)")
+        conn.execute("CREATE INDEX idx_vectors_file_hash ON vectors (project_id, file_path, content_hash)")
+
+    def _init_fts(self, conn: sqlite3.Connection) -> bool:
+        # External-content FTS5 index over vectors.content, kept in sync by triggers
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name='vectors_fts'").fetchone()
+        try:
+            conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS vectors_fts USING fts5(content, content='vectors', content_rowid='rowid', tokenize=\"{FTS_TOKENIZE}\")")
+        except sqlite3.OperationalError as e:
+            logger.warning("SQLite FTS5 is unavailable (%s); lexical search is disabled", e)
+            return False
+        # INSERT OR REPLACE does not fire delete triggers (recursive_triggers is off), so the
+        # replaced row's terms are removed before the insert instead.
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS vectors_fts_replace BEFORE INSERT ON vectors BEGIN
+                INSERT INTO vectors_fts (vectors_fts, rowid, content) SELECT 'delete', rowid, content FROM vectors WHERE project_id = new.project_id AND id = new.id;
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS vectors_fts_insert AFTER INSERT ON vectors BEGIN
+                INSERT INTO vectors_fts (rowid, content) VALUES (new.rowid, new.content);
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS vectors_fts_delete AFTER DELETE ON vectors BEGIN
+                INSERT INTO vectors_fts (vectors_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS vectors_fts_update AFTER UPDATE OF content ON vectors BEGIN
+                INSERT INTO vectors_fts (vectors_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+                INSERT INTO vectors_fts (rowid, content) VALUES (new.rowid, new.content);
+            END
+        """)
+        if not exists:
+            # Index rows written before the FTS table existed
+            conn.execute("INSERT INTO vectors_fts (vectors_fts) VALUES ('rebuild')")
+        return True
+
+    @property
+    def embedding_path(self) -> str:
+        """str: Path of the memory-mapped embedding file used by ``embedding_storage="mmap"``."""
+        return f"{self.db_path}.vectors"
+
+    def _migrate_embedding_storage(self, conn: sqlite3.Connection, batch_size: int = 4096) -> None:
+        # Move embeddings written in the other storage mode (or BLOB dtype) to the configured one
+        if not self.in_memory:
+            self._finish_compaction(conn)
+        row = conn.execute("SELECT value FROM store_meta WHERE key='embedding_dtype'").fetchone()
+        stored_dtype = row[0] if row else "float32"
+        self.blob_dtype = self.embedding_dtype or stored_dtype
+        if self.embedding_file is not None:
+            self.blob_dtype = stored_dtype
+            while True:
+                rows = conn.execute("SELECT rowid, embedding FROM vectors WHERE vec_row IS NULL AND embedding IS NOT NULL LIMIT ?", (batch_size,)).fetchall()
+                if not rows:
+                    break
+                first = self.embedding_file.append(decode_rows([blob for _, blob in rows], stored_dtype))
+                conn.executemany("UPDATE vectors SET vec_row=?, embedding=NULL WHERE rowid=?", [(first + i, rowid) for i, (rowid, _) in enumerate(rows)])
+            return
+        if self.blob_dtype != stored_dtype:
+            last_rowid = 0
+            while True:
+                rows = conn.execute(
+                    "SELECT rowid, embedding FROM vectors WHERE rowid > ? AND embedding IS NOT NULL ORDER BY rowid LIMIT ?", (last_rowid, batch_size)
+                ).fetchall()
+                if not rows:
+                    break
+                blobs = encode_rows(decode_rows([blob for _, blob in rows], stored_dtype), self.blob_dtype)
+                conn.executemany("UPDATE vectors SET embedding=? WHERE rowid=?", [(blob, rowid) for (rowid, _), blob in zip(rows, blobs)])
+                last_rowid = rows[-1][0]
+        conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('embedding_dtype', ?)", (self.blob_dtype,))
+        if not conn.execute("SELECT 1 FROM vectors WHERE vec_row IS NOT NULL LIMIT 1").fetchone():
+            return
+        if not os.path.exists(self.embedding_path):
+            raise ValueError(f"Embeddings are stored in {self.embedding_path}, which is missing; open the store with embedding_storage='mmap'.")
+        source = EmbeddingFile(self.embedding_path)
+        try:
+            while True:
+                rows = conn.execute("SELECT rowid, vec_row FROM vectors WHERE vec_row IS NOT NULL LIMIT ?", (batch_size,)).fetchall()
+                if not rows:
+                    break
+                blobs = encode_rows(source.rows([vec_row for _, vec_row in rows]), self.blob_dtype)
+                conn.executemany("UPDATE vectors SET embedding=?, vec_row=NULL WHERE rowid=?", [(blob, rowid) for (rowid, _), blob in zip(rows, blobs)])
+        finally:
+            source.close()
+
+    def _stable_read(self, read):
+        # Seqlock against compact_embeddings(): retry if the embedding file was rewritten during the read
+        if self.embedding_file is None:
+            return read()
+        while True:
+            generation = self._emb_generation
+            if generation % 2:
+                time.sleep(0.001)
+                continue
+            result = read()
+            if self._emb_generation == generation:
+                return result
 
     def add_documents(self, documents: List[Document], metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None, project_id: Optional[str] = None, **kwargs) -> List[str]:
         """
@@ -62,24 +463,747 @@ class SQLiteLangChainVectorStore(LCVectorStore):
             raise ValueError("Embeddings (metadatas) must be provided.")
         if len(documents) != len(metadatas):
             raise ValueError("Number of documents and embeddings must match.")
-        doc_ids = []
-        for i, (doc, emb) in enumerate(zip(documents, metadatas)):
-            doc_id = doc.metadata.get("id", f"doc_{i}")
-            file_path = doc.metadata.get("file_path", "")
-            # Use provided project_id, not doc_id prefix
-            db_project_id = project_id or "default"
-            emb_bytes = np.array(emb, dtype=np.float32).tobytes()
-            self.conn.execute(
-                """
-                INSERT OR REPLACE INTO vectors (id, project_id, tag, embedding, content)
-                VALUES (?, ?, ?, ?, ?)
-                """,
-                (doc_id, db_project_id, file_path, emb_bytes, doc.page_content)
-            )
-            doc_ids.append(doc_id)
-        self.conn.commit()
+        doc_ids = [doc.metadata.get("id", f"doc_{i}") for i, doc in enumerate(documents)]
+        self.add_embeddings(
+            doc_ids,
+            [doc.page_content for doc in documents],
+            metadatas,
+            project_id=project_id,
+            file_paths=[doc.metadata.get("file_path", "") for doc in documents],
+            content_hashes=[doc.metadata.get("content_hash") for doc in documents],
+            chunk_indexes=[doc.metadata.get("chunk_index") for doc in documents],
+        )
         return doc_ids
 
+    def add_embeddings(self, ids: Sequence[str], contents: Sequence[str], embeddings, project_id: Optional[str] = None, file_paths: Optional[Sequence[str]] = None, content_hashes: Optional[Sequence[Optional[str]]] = None, chunk_indexes: Optional[Sequence[Optional[int]]] = None, commit_every: Optional[int] = None) -> int:
+        """
+        Bulk-insert (or replace) chunks from parallel arrays with ``executemany``.
+
+        Rows are written in one transaction, or in one transaction per
+        ``commit_every`` rows for very large batches. Inside an enclosing
+        :meth:`writer` block everything is part of the caller's transaction.
+
+        Args:
+            ids (Sequence[str]): Document IDs.
+            contents (Sequence[str]): Chunk texts.
+            embeddings: 2-D array-like of shape (len(ids), dim).
+            project_id (Optional[str]): Project identifier for all rows (default "default").
+            file_paths (Optional[Sequence[str]]): File path per row.
+            content_hashes (Optional[Sequence[Optional[str]]]): Precomputed content hashes; missing ones are computed.
+            chunk_indexes (Optional[Sequence[Optional[int]]]): Position of each chunk in its file; missing ones
+                are taken from ``{file_path}::chunk{n}`` IDs.
+            commit_every (Optional[int]): Rows per committed transaction (default: all rows in one).
+
+        Returns:
+            int: Number of rows written.
+
+        Example:
+            >>> store.add_embeddings(ids, chunks, embedder.embed_batch(chunks), project_id="proj1", commit_every=50000)
+        """
+        n = len(ids)
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32).reshape(n, -1) if n else np.empty((0, 0), dtype=np.float32)
+        if len(contents) != n or (file_paths is not None and len(file_paths) != n):
+            raise ValueError("ids, contents, file_paths and embeddings must have the same length.")
+        db_project_id = project_id or "default"
+        step = commit_every or n or 1
+        emb_file = self.embedding_file
+        for start in range(0, n, step):
+            stop = min(start + step, n)
+            with self.writer() as conn:
+                first = emb_file.append(matrix[start:stop]) if emb_file is not None else 0
+                blobs = encode_rows(matrix[start:stop], self.blob_dtype) if emb_file is None else None
+                rows = (
+                    (
+                        ids[i],
+                        db_project_id,
+                        file_paths[i] if file_paths is not None else "",
+                        blobs[i - start] if blobs is not None else None,
+                        first + i - start if emb_file is not None else None,
+                        contents[i],
+                        (content_hashes[i] if content_hashes is not None else None) or content_hash(contents[i]),
+                        _chunk_index(ids[i]) if chunk_indexes is None or chunk_indexes[i] is None else chunk_indexes[i],
+                    )
+                    for i in range(start, stop)
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO vectors (id, project_id, file_path, embedding, vec_row, content, content_hash, chunk_index) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                with self._index_lock:
+                    index = self._indexes.get(db_project_id)
+                    if index is not None:
+                        index.add(list(ids[start:stop]), matrix[start:stop])
+                        self._dirty.add(db_project_id)
+        return n
+
+    def delete(self, ids: Optional[List[str]] = None, project_id: Optional[str] = None, **kwargs) -> Optional[bool]:
+        """
+        Delete documents by ID and drop them from the loaded project indexes.
+
+        IDs are unique per project, so internal callers always pass ``project_id``;
+        without it the IDs are deleted from every project.
+
+        Args:
+            ids (Optional[List[str]]): Document IDs to delete.
+            project_id (Optional[str]): Only delete the documents of this project.
+            **kwargs: Additional arguments.
+
+        Returns:
+            Optional[bool]: True if any document was deleted, False otherwise.
+        """
+        if not ids:
+            return False
+        deleted = 0
+        scope, scope_args = ("project_id=? AND ", [project_id]) if project_id is not None else ("", [])
+        with self.writer() as conn:
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                deleted += conn.execute(f"DELETE FROM vectors WHERE {scope}id IN ({placeholders})", [*scope_args, *batch]).rowcount
+            with self._index_lock:
+                for index_project, index in self._indexes.items():
+                    if (project_id is None or index_project == project_id) and index.remove(ids):
+                        self._dirty.add(index_project)
+        return deleted > 0
+
+    def delete_file(self, project_id: str, file_path: str) -> int:
+        """
+        Delete every chunk stored for a file in a project, and its manifest entry.
+
+        Both the lookup and the delete are range scans of the
+        ``(project_id, file_path)`` index, so the cost depends on the file's
+        chunk count, not on the size of the table.
+
+        Args:
+            project_id (str): Project identifier.
+            file_path (str): Project-relative file path.
+
+        Returns:
+            int: Number of chunks deleted.
+
+        Example:
+            >>> store.delete_file("proj1", "docs/file.txt")
+            3
+        """
+        with self.writer() as conn:
+            conn.execute("DELETE FROM file_manifest WHERE project_id=? AND file_path=?", (project_id, file_path))
+            ids = [row[0] for row in conn.execute("SELECT id FROM vectors WHERE project_id=? AND file_path=?", (project_id, file_path))]
+            if not ids:
+                return 0
+            conn.execute("DELETE FROM vectors WHERE project_id=? AND file_path=?", (project_id, file_path))
+            with self._index_lock:
+                index = self._indexes.get(project_id)
+                if index is not None and index.remove(ids):
+                    self._dirty.add(project_id)
+        return len(ids)
+
+    def move_file(self, project_id: str, old_path: str, new_path: str) -> int:
+        """
+        Re-key a file's chunks to a new path without re-embedding them.
+
+        In one transaction, rows stored for ``new_path`` are replaced (a move over
+        an existing file), and every ``{old_path}::chunk{n}`` row becomes
+        ``{new_path}::chunk{n}``. The file's manifest entry moves with it. Embeddings, content and FTS entries keep their
+        row; the project's loaded index is re-keyed in place.
+
+        Args:
+            project_id (str): Project identifier.
+            old_path (str): Project-relative path the chunks are stored under.
+            new_path (str): Project-relative destination path.
+
+        Returns:
+            int: Number of chunks moved (0 if nothing was stored for ``old_path``).
+
+        Example:
+            >>> store.move_file("proj1", "docs/old.md", "docs/new.md")
+            4
+        """
+        if old_path == new_path:
+            return 0
+        with self.writer() as conn:
+            rows = conn.execute("SELECT row_id, id FROM vectors WHERE project_id=? AND file_path=?", (project_id, old_path)).fetchall()
+            manifest = conn.execute("SELECT 1 FROM file_manifest WHERE project_id=? AND file_path=?", (project_id, old_path)).fetchone()
+            if not rows and not manifest:
+                return 0
+            prefix = f"{old_path}::"
+            renames = {doc_id: new_path + doc_id[len(old_path):] if doc_id.startswith(prefix) else doc_id for _, doc_id in rows}
+            self.delete_file(project_id, new_path)
+            conn.execute("UPDATE file_manifest SET file_path=? WHERE project_id=? AND file_path=?", (new_path, project_id, old_path))
+            # Leftover rows holding a target ID under another path give way; other projects are untouched
+            self.delete([new_id for old_id, new_id in renames.items() if new_id != old_id], project_id=project_id)
+            conn.executemany(
+                "UPDATE vectors SET id=?, file_path=? WHERE project_id=? AND row_id=?",
+                [(renames[doc_id], new_path, project_id, row_id) for row_id, doc_id in rows],
+            )
+            with self._index_lock:
+                index = self._indexes.get(project_id)
+                if index is not None and index.rename(renames):
+                    self._dirty.add(project_id)
+        logger.debug("Moved %d chunks from %s to %s in project %s", len(rows), old_path, new_path, project_id)
+        return len(rows)
+
+    def diff_file(self, project_id: str, file_path: str, chunks: Sequence[str]) -> Tuple[List[Tuple[str, str, int]], List[str], int, List[Tuple[int, str]]]:
+        """
+        Compare a file's new chunks with its stored rows by content hash.
+
+        Stored chunks whose content is unchanged keep their row (and ID) even if
+        their position moved. New chunks get ``{file_path}::chunk{n}`` IDs that do
+        not collide with retained rows.
+
+        Args:
+            project_id (str): Project identifier.
+            file_path (str): Project-relative file path.
+            chunks (Sequence[str]): The file's new chunks, in order.
+
+        Returns:
+            Tuple: ``(added, removed_ids, unchanged, moved)`` where ``added`` holds
+            ``(doc_id, chunk, chunk_index)`` triples to embed and insert and ``moved``
+            holds ``(chunk_index, doc_id)`` pairs for retained rows whose position changed.
+
+        Example:
+            >>> added, removed, unchanged, moved = store.diff_file("proj1", "docs/file.txt", chunk_text(text))
+        """
+        stored: Dict[str, List[Tuple[str, Optional[int]]]] = defaultdict(list)
+        # Read through the writer connection so a diff inside a writer() block sees its uncommitted rows
+        with self.writer() as conn:
+            cur = conn.execute(
+                "SELECT id, chunk_index, content_hash, CASE WHEN content_hash IS NULL THEN content END FROM vectors "
+                "WHERE project_id=? AND file_path=? ORDER BY chunk_index DESC",
+                (project_id, file_path),
+            )
+            for doc_id, chunk_index, digest, content in cur:
+                stored[digest or content_hash(content or "")].append((doc_id, chunk_index))
+        retained = set()
+        pending: List[Tuple[int, str]] = []
+        moved: List[Tuple[int, str]] = []
+        for idx, chunk in enumerate(chunks):
+            rows = stored.get(content_hash(chunk))
+            if rows:
+                # Rows are popped in file order, so repeated chunks keep their relative order
+                doc_id, chunk_index = rows.pop()
+                retained.add(doc_id)
+                if chunk_index != idx:
+                    moved.append((idx, doc_id))
+            else:
+                pending.append((idx, chunk))
+        removed = [doc_id for rows in stored.values() for doc_id, _ in rows]
+        added = []
+        next_free = len(chunks)
+        for idx, chunk in pending:
+            doc_id = f"{file_path}::chunk{idx}"
+            while doc_id in retained:
+                doc_id = f"{file_path}::chunk{next_free}"
+                next_free += 1
+            retained.add(doc_id)
+            added.append((doc_id, chunk, idx))
+        return added, removed, len(chunks) - len(pending), moved
+
+    def stored_hashes(self, project_id: str, file_path: str) -> set:
+        """
+        Return the content hashes of a file's committed chunks.
+
+        Args:
+            project_id (str): Project identifier.
+            file_path (str): Project-relative file path.
+
+        Returns:
+            set: Chunk content hashes.
+        """
+        with self.reader() as conn:
+            cur = conn.execute(
+                "SELECT content_hash, CASE WHEN content_hash IS NULL THEN content END FROM vectors WHERE project_id=? AND file_path=?",
+                (project_id, file_path),
+            )
+            return {digest or content_hash(content or "") for digest, content in cur}
+
+    def file_state(self, project_id: str, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Return a file's manifest entry: what was last ingested for it.
+
+        Args:
+            project_id (str): Project identifier.
+            file_path (str): Project-relative file path.
+
+        Returns:
+            Optional[Dict[str, Any]]: ``size``, ``mtime_ns`` (None when the content was sent by a client),
+            ``hash`` (SHA-256 of the file's bytes) and ``chunks``; None if the file is not in the manifest.
+
+        Example:
+            >>> store.file_state("proj1", "docs/file.txt")
+            {'size': 812, 'mtime_ns': 1719232496000000000, 'hash': '9f86d0...', 'chunks': 3}
+        """
+        with self.reader() as conn:
+            row = conn.execute("SELECT size, mtime_ns, hash, chunks FROM file_manifest WHERE project_id=? AND file_path=?", (project_id, file_path)).fetchone()
+        return dict(zip(("size", "mtime_ns", "hash", "chunks"), row)) if row else None
+
+    def file_manifest(self, project_id: str) -> Dict[str, Tuple[Optional[int], Optional[int], str]]:
+        """
+        Return the manifest of every file ingested for a project.
+
+        Args:
+            project_id (str): Project identifier.
+
+        Returns:
+            Dict[str, Tuple[Optional[int], Optional[int], str]]: File path to ``(size, mtime_ns, hash)``.
+        """
+        with self.reader() as conn:
+            return {path: (size, mtime_ns, digest) for path, size, mtime_ns, digest in conn.execute(
+                "SELECT file_path, size, mtime_ns, hash FROM file_manifest WHERE project_id=?", (project_id,))}
+
+    def record_file(self, project_id: str, file_path: str, digest: str, size: Optional[int] = None, mtime_ns: Optional[int] = None, chunks: Optional[int] = None) -> None:
+        """
+        Insert or update a file's manifest entry.
+
+        Call it in the same :meth:`writer` block that applies the file's chunks,
+        so the manifest never claims content that was not written.
+
+        Args:
+            project_id (str): Project identifier.
+            file_path (str): Project-relative file path.
+            digest (str): SHA-256 hex digest of the file's bytes.
+            size (Optional[int]): File size in bytes.
+            mtime_ns (Optional[int]): Modification time, if the file was read from disk.
+            chunks (Optional[int]): Number of chunks; None keeps the recorded count.
+
+        Example:
+            >>> with store.writer():
+            ...     store.sync_file("proj1", "docs/file.txt", chunks, embedder)
+            ...     store.record_file("proj1", "docs/file.txt", digest, size=812, chunks=len(chunks))
+        """
+        with self.writer() as conn:
+            conn.execute(
+                "INSERT INTO file_manifest (project_id, file_path, size, mtime_ns, hash, chunks) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (project_id, file_path) DO UPDATE SET size=excluded.size, mtime_ns=excluded.mtime_ns, "
+                "hash=excluded.hash, chunks=COALESCE(excluded.chunks, chunks)",
+                (project_id, file_path, size, mtime_ns, digest, chunks),
+            )
+
+    def sync_file(self, project_id: str, file_path: str, chunks: Sequence[str], embedder, embeddings: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+        """
+        Diff a file's chunks against the store and apply the result under one writer lock.
+
+        Holding the lock from diff to write means concurrent events for the same
+        file cannot both insert the same chunks.
+
+        Args:
+            project_id (str): Project identifier.
+            file_path (str): Project-relative file path.
+            chunks (Sequence[str]): The file's new chunks, in order.
+            embedder (Embedder): Embeds chunks that are new and not in ``embeddings``.
+            embeddings (Optional[Dict[str, Any]]): Precomputed embeddings keyed by chunk content hash.
+
+        Returns:
+            Dict[str, int]: ``processed``, ``added``, ``removed`` and ``unchanged`` chunk counts.
+
+        Example:
+            >>> store.sync_file("proj1", "docs/file.txt", chunk_text(text), embedder)
+            {'processed': 3, 'added': 1, 'removed': 1, 'unchanged': 2}
+        """
+        embeddings = embeddings or {}
+        with self.writer():
+            added, removed_ids, unchanged, moved = self.diff_file(project_id, file_path, chunks)
+            hashes = [content_hash(chunk) for _, chunk, _ in added]
+            missing = list({digest: chunk for digest, (_, chunk, _) in zip(hashes, added) if digest not in embeddings}.items())
+            if missing:
+                embeddings = {**embeddings, **dict(zip([digest for digest, _ in missing], embedder.embed_batch([chunk for _, chunk in missing])))}
+            documents = [
+                Document(page_content=chunk, metadata={"id": doc_id, "file_path": file_path, "content_hash": digest, "chunk_index": idx})
+                for (doc_id, chunk, idx), digest in zip(added, hashes)
+            ]
+            self.apply_file_diff(project_id, documents, [embeddings[digest] for digest in hashes], removed_ids)
+            if moved:
+                self.conn.executemany("UPDATE vectors SET chunk_index=? WHERE project_id=? AND id=?", [(idx, project_id, doc_id) for idx, doc_id in moved])
+        return {"processed": len(chunks), "added": len(added), "removed": len(removed_ids), "unchanged": unchanged}
+
+    def sync_file_stream(self, project_id: str, file_path: str, chunks: Iterable[str], embedder, batch_size: int = 512) -> Dict[str, int]:
+        """
+        Sync a file from a stream of chunks, ``batch_size`` chunks at a time.
+
+        The result is the same as :meth:`sync_file`, but neither the chunks nor
+        the file's stored rows are held in memory: the file's rows are first
+        marked pending (their ``chunk_index`` negated), each batch is matched
+        against the pending rows by content hash, only unmatched chunks are
+        embedded and inserted, and the rows still pending at the end are
+        deleted. Everything happens in one transaction (a savepoint inside an
+        enclosing :meth:`writer` block), so readers never see a half-synced
+        file and a failure leaves the stored rows untouched.
+
+        Args:
+            project_id (str): Project identifier.
+            file_path (str): Project-relative file path.
+            chunks (Iterable[str]): The file's new chunks, in order (e.g. from
+                :func:`ragms02.ingestion.pipeline.iter_chunks`).
+            embedder (Embedder): Embeds new chunks, one call per batch.
+            batch_size (int): Chunks matched, embedded and written per step.
+
+        Returns:
+            Dict[str, int]: ``processed``, ``added``, ``removed`` and ``unchanged`` chunk counts.
+
+        Example:
+            >>> chunks = iter_chunks(iter_lines(iter_file_text("dump.sql", "utf-8")))
+            >>> store.sync_file_stream("proj1", "dump.sql", chunks, embedder, batch_size=256)
+            {'processed': 81234, 'added': 12, 'removed': 9, 'unchanged': 81222}
+        """
+        counts = {"processed": 0, "added": 0, "removed": 0, "unchanged": 0}
+        with self.writer() as conn:
+            conn.execute("SAVEPOINT sync_file_stream")
+            try:
+                # Pending rows get chunk_index -1 - old index, so new indexes (>= 0) never collide
+                conn.execute(
+                    "UPDATE vectors SET chunk_index = -1 - COALESCE(chunk_index, 0) WHERE project_id=? AND file_path=?",
+                    (project_id, file_path),
+                )
+                next_free = 1 + max((_chunk_index(doc_id) or 0 for doc_id, in conn.execute(
+                    "SELECT id FROM vectors WHERE project_id=? AND file_path=?", (project_id, file_path))), default=-1)
+                batch: List[Tuple[int, str]] = []
+                for idx, chunk in enumerate(chunks):
+                    batch.append((idx, chunk))
+                    if len(batch) >= batch_size:
+                        next_free = self._sync_stream_batch(conn, project_id, file_path, batch, embedder, next_free, counts)
+                        batch = []
+                if batch:
+                    self._sync_stream_batch(conn, project_id, file_path, batch, embedder, next_free, counts)
+                while True:
+                    ids = [row[0] for row in conn.execute(
+                        "SELECT id FROM vectors WHERE project_id=? AND file_path=? AND chunk_index < 0 LIMIT ?",
+                        (project_id, file_path, batch_size),
+                    )]
+                    if not ids:
+                        break
+                    self.delete(ids, project_id=project_id)
+                    counts["removed"] += len(ids)
+            except BaseException:
+                conn.execute("ROLLBACK TO sync_file_stream")
+                raise
+            finally:
+                conn.execute("RELEASE sync_file_stream")
+        return counts
+
+    def _sync_stream_batch(self, conn: sqlite3.Connection, project_id: str, file_path: str, batch: List[Tuple[int, str]], embedder, next_free: int, counts: Dict[str, int]) -> int:
+        hashes = [content_hash(chunk) for _, chunk in batch]
+        pending: Dict[str, List[Tuple[int, str]]] = defaultdict(list)
+        unique = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique), 500):
+            part = unique[start:start + 500]
+            cur = conn.execute(
+                f"SELECT row_id, id, content_hash FROM vectors WHERE project_id=? AND file_path=? AND content_hash IN ({','.join('?' * len(part))}) "
+                "AND chunk_index < 0 ORDER BY chunk_index",
+                (project_id, file_path, *part),
+            )
+            for row_id, doc_id, digest in cur:
+                pending[digest].append((row_id, doc_id))
+        retained: List[Tuple[int, int]] = []
+        added: List[Tuple[str, str, int, str]] = []
+        for (idx, chunk), digest in zip(batch, hashes):
+            rows = pending.get(digest)
+            if rows:
+                # Pending rows are listed last-in-file first, so they are popped in file order as in diff_file
+                retained.append((idx, rows.pop()[0]))
+                continue
+            doc_id = f"{file_path}::chunk{idx}"
+            # Taken by a row that a later batch may still match
+            while conn.execute("SELECT 1 FROM vectors WHERE project_id=? AND id=?", (project_id, doc_id)).fetchone():
+                doc_id = f"{file_path}::chunk{next_free}"
+                next_free += 1
+            added.append((doc_id, chunk, idx, digest))
+        conn.executemany("UPDATE vectors SET chunk_index=? WHERE row_id=?", retained)
+        if added:
+            texts = {digest: chunk for _, chunk, _, digest in added}
+            vectors = dict(zip(texts, embedder.embed_batch(list(texts.values()))))
+            self.add_embeddings(
+                [doc_id for doc_id, _, _, _ in added],
+                [chunk for _, chunk, _, _ in added],
+                [vectors[digest] for _, _, _, digest in added],
+                project_id=project_id,
+                file_paths=[file_path] * len(added),
+                content_hashes=[digest for _, _, _, digest in added],
+                chunk_indexes=[idx for _, _, idx, _ in added],
+            )
+        counts["processed"] += len(batch)
+        counts["added"] += len(added)
+        counts["unchanged"] += len(retained)
+        return next_free
+
+    def apply_file_diff(self, project_id: str, documents: List[Document], embeddings, removed_ids: List[str]) -> None:
+        """
+        Insert new chunks and delete removed ones for a file in a single transaction.
+
+        Args:
+            project_id (str): Project identifier.
+            documents (List[Document]): New chunk documents (see :meth:`diff_file`).
+            embeddings: Embeddings matching ``documents``.
+            removed_ids (List[str]): IDs of chunks that no longer exist.
+        """
+        with self.writer():
+            if removed_ids:
+                self.delete(removed_ids, project_id=project_id)
+            if documents:
+                self.add_documents(documents, embeddings, project_id=project_id)
+
+    def sync_embedder(self, embedder, batch_size: int = 256) -> int:
+        """
+        Record the embedder that produced the stored vectors, re-embedding every row if it changed.
+
+        Rows written by a different embedder (or before the embedder was recorded)
+        are not comparable with the new query embeddings, so their stored content
+        is embedded again and any loaded indexes are dropped.
+
+        Args:
+            embedder (Embedder): The embedder used for new chunks and queries.
+            batch_size (int): Rows embedded per batch.
+
+        Returns:
+            int: Number of rows re-embedded.
+
+        Example:
+            >>> store.sync_embedder(get_default_embedder())
+            0
+        """
+        with self.writer() as conn:
+            row = conn.execute("SELECT value FROM store_meta WHERE key='embedder_id'").fetchone()
+            if row and row[0] == embedder.id:
+                return 0
+            updated = 0
+            last_rowid = 0
+            while True:
+                rows = conn.execute("SELECT rowid, content FROM vectors WHERE rowid > ? ORDER BY rowid LIMIT ?", (last_rowid, batch_size)).fetchall()
+                if not rows:
+                    break
+                vectors = np.asarray(embedder.embed_batch([content or "" for _, content in rows]), dtype=np.float32)
+                if self.embedding_file is not None:
+                    first = self.embedding_file.append(vectors)
+                    conn.executemany("UPDATE vectors SET vec_row=? WHERE rowid=?", [(first + i, rowid) for i, (rowid, _) in enumerate(rows)])
+                else:
+                    conn.executemany("UPDATE vectors SET embedding=? WHERE rowid=?", [(blob, rowid) for (rowid, _), blob in zip(rows, encode_rows(vectors, self.blob_dtype))])
+                updated += len(rows)
+                last_rowid = rows[-1][0]
+            conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('embedder_id', ?)", (embedder.id,))
+            if updated:
+                with self._index_lock:
+                    self._indexes.clear()
+                    self._dirty.clear()
+        return updated
+
+    def reset(self) -> None:
+        """
+        Delete every document and drop all loaded indexes.
+
+        Example:
+            >>> store.reset()
+        """
+        with self.writer() as conn:
+            conn.execute("DELETE FROM vectors")
+            conn.execute("DELETE FROM file_manifest")
+            if self.embedding_file is not None:
+                self.embedding_file.truncate()
+            with self._index_lock:
+                self._indexes.clear()
+                self._dirty.clear()
+
+    def get_index(self, project_id: str):
+        """
+        Return the in-memory index for a project, loading it on first use.
+
+        Persistent backends are loaded from their side file next to the SQLite
+        database; if the project changed since the file was written the stored
+        quantizer is kept and only the vectors are reloaded.
+
+        Args:
+            project_id (str): Project identifier.
+
+        Returns:
+            The project's index (see :data:`INDEX_BACKENDS`).
+        """
+        index = self._indexes.get(project_id)
+        if index is not None:
+            return index
+        # Lock order is always writer -> index, so loading never races with a concurrent add.
+        with self._write_lock, self._index_lock:
+            index = self._indexes.get(project_id)
+            if index is None:
+                index = self._indexes[project_id] = self._build_index(project_id)
+        return index
+
+    def _build_index(self, project_id: str):
+        backend = INDEX_BACKENDS[self.index_backend]
+        path = self.index_path(project_id)
+        fingerprint = self._fingerprint(project_id)
+        if path and hasattr(backend, "load") and os.path.exists(path):
+            index, meta = backend.load(path, **self.index_params)
+            if meta.get("fingerprint") != fingerprint:
+                index.reset(*self._load_vectors(project_id))
+                self._dirty.add(project_id)
+        else:
+            index = backend(**self.index_params)
+            ids, vectors = self._load_vectors(project_id)
+            if ids:
+                index.add(ids, vectors)
+            self._dirty.add(project_id)
+        return index
+
+    def compact_embeddings(self) -> int:
+        """
+        Rewrite the embedding file without rows that are no longer referenced.
+
+        Replaced and deleted chunks leave their old rows in the append-only
+        file; this reclaims the space. The compacted copy is written next to
+        the file, the new row numbers are committed, and only then is the copy
+        moved into place. A crash in between is finished when the store is next
+        opened. Concurrent searches retry instead of reading row numbers that
+        do not match the file, and other processes reopen the file on their
+        next read.
+
+        Returns:
+            int: Number of rows reclaimed (0 for ``embedding_storage="blob"``).
+
+        Example:
+            >>> store.compact_embeddings()
+            1200
+        """
+        if self.embedding_file is None:
+            return 0
+        with self._write_lock:
+            if self._write_depth:
+                raise RuntimeError("compact_embeddings() cannot run inside a writer() block.")
+            live = self.conn.execute("SELECT rowid, vec_row FROM vectors WHERE vec_row IS NOT NULL ORDER BY vec_row").fetchall()
+            reclaimed = len(self.embedding_file) - len(live)
+            if reclaimed <= 0:
+                return 0
+            self.embedding_file.write_compacted([vec_row for _, vec_row in live])
+            self._emb_generation += 1
+            try:
+                try:
+                    with self.writer() as conn:
+                        conn.executemany("UPDATE vectors SET vec_row=? WHERE rowid=?", [(i, rowid) for i, (rowid, _) in enumerate(live)])
+                        # Tells the next open to finish the swap if this process stops after the commit
+                        conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('embedding_compaction', 'pending')")
+                except BaseException:
+                    os.remove(self.embedding_file.compact_path)
+                    raise
+                self._finish_compaction(self.conn)
+            finally:
+                self._emb_generation += 1
+        return reclaimed
+
+    def _finish_compaction(self, conn: sqlite3.Connection) -> None:
+        # Move a compacted embedding file into place once its row numbers are committed
+        pending = conn.execute("SELECT 1 FROM store_meta WHERE key='embedding_compaction'").fetchone()
+        compact_path = f"{self.embedding_path}.compact"
+        if pending:
+            if self.embedding_file is not None:
+                self.embedding_file.replace()
+            elif os.path.exists(compact_path):
+                os.replace(compact_path, self.embedding_path)
+            with self.writer():
+                conn.execute("DELETE FROM store_meta WHERE key='embedding_compaction'")
+        elif os.path.exists(compact_path):
+            # Written by a compaction that never committed
+            os.remove(compact_path)
+
+    def _load_vectors(self, project_id: str):
+        if self.embedding_file is not None:
+            return self._stable_read(lambda: self._load_mapped_vectors(project_id))
+        ids, blobs = [], []
+        with self.reader() as conn:
+            for vec_id, emb_bytes in conn.execute("SELECT id, embedding FROM vectors WHERE project_id=?", (project_id,)):
+                ids.append(vec_id)
+                blobs.append(emb_bytes)
+        if not ids:
+            return ids, np.empty((0, 0), dtype=np.float32)
+        return ids, decode_rows(blobs, self.blob_dtype)
+
+    def _load_mapped_vectors(self, project_id: str):
+        with self.reader() as conn:
+            rows = conn.execute("SELECT id, vec_row FROM vectors WHERE project_id=?", (project_id,)).fetchall()
+        if not rows:
+            return [], np.empty((0, 0), dtype=np.float32)
+        return [vec_id for vec_id, _ in rows], self.embedding_file.rows([vec_row for _, vec_row in rows])
+
+    def _fingerprint(self, project_id: str) -> str:
+        return str(self.version(project_id))
+
+    def version(self, project_id: str) -> int:
+        """
+        Return a project's change counter, incremented by every insert, update and delete.
+
+        Args:
+            project_id (str): Project identifier.
+
+        Returns:
+            int: The current version (0 if the project was never written).
+        """
+        with self.reader() as conn:
+            row = conn.execute("SELECT version FROM vector_versions WHERE project_id=?", (project_id,)).fetchone()
+        return row[0] if row else 0
+
+    def chunk_count(self) -> int:
+        """
+        Return the number of stored chunks across all projects.
+
+        The count is cached against the sum of the project change counters,
+        so the table is only counted again after a write (from any process).
+
+        Returns:
+            int: Number of rows in ``vectors``.
+
+        Example:
+            >>> store.chunk_count()
+            1042
+        """
+        with self.reader() as conn:
+            stamp = conn.execute("SELECT COALESCE(SUM(version), 0) FROM vector_versions").fetchone()[0]
+            cached = self._chunk_count
+            if cached is None or cached[0] != stamp:
+                cached = (stamp, conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0])
+                self._chunk_count = cached
+        return cached[1]
+
+    def index_path(self, project_id: str) -> Optional[str]:
+        """
+        Return the side-file path used to persist a project's index, or None for in-memory databases.
+
+        Args:
+            project_id (str): Project identifier.
+
+        Returns:
+            Optional[str]: Path of the form ``{db_path}.{project_id}.{backend}.npz``.
+        """
+        if self.in_memory:
+            return None
+        return f"{self.db_path}.{quote(project_id, safe='')}.{self.index_backend}.npz"
+
+    def rebuild_index(self, project_id: str) -> None:
+        """
+        Incrementally retrain a project's index (if the backend supports it) and persist it.
+
+        Args:
+            project_id (str): Project identifier.
+        """
+        index = self.get_index(project_id)
+        with self._write_lock, self._index_lock:
+            if hasattr(index, "rebuild"):
+                index.rebuild()
+            self._dirty.add(project_id)
+            self.save_indexes([project_id])
+
+    def save_indexes(self, project_ids: Optional[List[str]] = None) -> None:
+        """
+        Persist modified indexes whose backend supports it.
+
+        Args:
+            project_ids (Optional[List[str]]): Projects to save. Defaults to every modified index.
+        """
+        with self._write_lock, self._index_lock:
+            for project_id in project_ids or list(self._dirty):
+                self._dirty.discard(project_id)
+                index = self._indexes.get(project_id)
+                path = self.index_path(project_id)
+                if index is None or path is None or not hasattr(index, "save"):
+                    continue
+                if hasattr(index, "needs_rebuild") and index.needs_rebuild():
+                    index.rebuild()
+                index.save(path, fingerprint=self._fingerprint(project_id))
+
     def similarity_search(self, query: str, k: int = 5, filter: Optional[dict] = None, **kwargs) -> List[Document]:
         """
         Return top-k most similar documents for a given project. (Signature matches LangChain base class.)
@@ -98,26 +1222,239 @@ class SQLiteLangChainVectorStore(LCVectorStore):
             return []
         embedding = filter["embedding"]
         project_id = filter["project_id"]
-        cur = self.conn.execute("SELECT id, embedding, content FROM vectors WHERE project_id=?", (project_id,))
+        if self.use_index:
+            return self._index_search(embedding, project_id, k)
+        if self.embedding_file is not None:
+            return self._mapped_search(embedding, project_id, k)
+        with self.reader() as conn:
+            rows = conn.execute("SELECT id, embedding, content FROM vectors WHERE project_id=?", (project_id,)).fetchall()
+        if not rows:
+            return []
         q = np.array(embedding, dtype=np.float32)
-        scored = []
-        for row in cur:
-            vec_id, emb_bytes, content = row
-            v = np.frombuffer(emb_bytes, dtype=np.float32)
-            sim = float(np.dot(q, v) / (np.linalg.norm(q) * np.linalg.norm(v) + 1e-8))
-            print(f"[DEBUG] Similarity for doc_id: {vec_id} = {sim:.4f}")
-            scored.append((vec_id, sim, content))
-        scored.sort(key=lambda x: x[1], reverse=True)
-        return [Document(page_content=content, metadata={"id": vec_id, "score": score}) for vec_id, score, content in scored[:k]]
+        vectors = decode_rows([emb_bytes for _, emb_bytes, _ in rows], self.blob_dtype)
+        sims = (vectors @ q) / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(q) + 1e-8)
+        top = np.argsort(-sims, kind="stable")[:k]
+        logger.debug("Brute-force search scored %d rows in project %s", len(rows), project_id)
+        return [Document(page_content=rows[i][2], metadata={"id": rows[i][0], "score": float(sims[i])}) for i in top]
+
+    def _mapped_search(self, embedding, project_id: str, k: int) -> List[Document]:
+        # Score straight out of the mapped file: only ids and row numbers go through the cursor
+        def score():
+            with self.reader() as conn:
+                rows = conn.execute("SELECT id, vec_row FROM vectors WHERE project_id=?", (project_id,)).fetchall()
+            if not rows:
+                return []
+            vectors = self.embedding_file.rows([vec_row for _, vec_row in rows])
+            q = np.asarray(embedding, dtype=np.float32)
+            sims = (vectors @ q) / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(q) + 1e-8)
+            top = np.argsort(-sims)[:k] if len(sims) <= k else np.argpartition(-sims, k)[:k]
+            top = top[np.argsort(-sims[top])]
+            return [(rows[i][0], float(sims[i])) for i in top]
+
+        hits = self._stable_read(score)
+        if not hits:
+            return []
+        placeholders = ",".join("?" * len(hits))
+        with self.reader() as conn:
+            contents = dict(conn.execute(
+                f"SELECT id, content FROM vectors WHERE project_id=? AND id IN ({placeholders})", [project_id, *(vec_id for vec_id, _ in hits)]).fetchall())
+        return [Document(page_content=contents[vec_id], metadata={"id": vec_id, "score": score}) for vec_id, score in hits if vec_id in contents]
+
+    def lexical_search(self, query: str, project_id: str, k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Rank a project's chunks against the query terms with BM25.
+
+        Matches any term of the query (see :func:`fts_query`), so exact
+        identifiers, error codes and config keys are found even when the
+        embeddings do not separate them.
+
+        Args:
+            query (str): Query text.
+            project_id (str): Project identifier.
+            k (int): Number of results to return.
+
+        Returns:
+            List[Tuple[str, float]]: ``(doc_id, bm25)`` pairs, best first (higher scores are better).
+            Empty if FTS5 is unavailable or the query has no terms.
+
+        Example:
+            >>> store.lexical_search("ERR_CONN_RESET", "proj1", k=3)
+            [('src/net.py::chunk4', 7.91), ...]
+        """
+        match = fts_query(query)
+        if not self.fts or not match or k <= 0:
+            return []
+        with self.reader() as conn:
+            rows = conn.execute(
+                "SELECT v.id, bm25(vectors_fts) AS rank FROM vectors_fts JOIN vectors v ON v.rowid = vectors_fts.rowid "
+                "WHERE vectors_fts MATCH ? AND v.project_id = ? ORDER BY rank LIMIT ?",
+                (match, project_id, k),
+            ).fetchall()
+        # FTS5's bm25() is negative, lower meaning a better match
+        return [(doc_id, -rank) for doc_id, rank in rows]
+
+    def hybrid_search(self, query: str, embedding, project_id: str, k: int = 5, fetch_k: Optional[int] = None, prefilter: Optional[int] = None) -> List[Document]:
+        """
+        Fuse BM25 and vector rankings of a project with weighted reciprocal-rank fusion.
+
+        The best ``fetch_k`` hits of each ranking contribute
+        ``weight / (rrf_k + rank)`` to a chunk's fused score; the lexical
+        ranking is weighted by ``lexical_weight``. With a prefilter, the
+        vector stage scores only the best ``prefilter`` BM25 matches exactly
+        against the stored embeddings instead of searching the whole project.
+        When the query matches fewer than ``fetch_k`` chunks lexically (a
+        purely descriptive question), the full vector search is used instead.
+
+        Args:
+            query (str): Query text.
+            embedding: Query embedding vector.
+            project_id (str): Project identifier.
+            k (int): Number of results to return.
+            fetch_k (Optional[int]): Hits taken from each ranking (default ``max(2 * k, 10)``).
+            prefilter (Optional[int]): Lexical candidates scored by the vector stage (default: the store's ``prefilter``).
+
+        Returns:
+            List[Document]: Top-k documents; metadata holds ``id``, the fused ``score``, and ``vector_score``
+            and ``lexical_score`` for the rankings the chunk appeared in.
+
+        Example:
+            >>> docs = store.hybrid_search("where is parse_config called?", embedder.embed("where is parse_config called?"), "proj1")
+        """
+        fetch_k = fetch_k or max(2 * k, 10)
+        prefilter = self.prefilter if prefilter is None else prefilter
+        lexical = self.lexical_search(query, project_id, max(prefilter, fetch_k))
+        if prefilter and len(lexical) >= fetch_k:
+            vector = self._rerank(embedding, lexical, fetch_k, project_id)
+            logger.debug("Hybrid search scored %d prefiltered rows in project %s", len(lexical), project_id)
+        else:
+            docs = self.similarity_search("", k=fetch_k, filter={"embedding": embedding, "project_id": project_id})
+            vector = [(doc.metadata["id"], doc.metadata["score"]) for doc in docs]
+        fused: Dict[str, Dict[str, float]] = defaultdict(lambda: {"score": 0.0})
+        for name, weight, hits in (("lexical_score", self.lexical_weight, lexical[:fetch_k]), ("vector_score", 1.0, vector)):
+            for rank, (doc_id, score) in enumerate(hits, start=1):
+                fused[doc_id]["score"] += weight / (self.rrf_k + rank)
+                fused[doc_id][name] = score
+        top = sorted(fused.items(), key=lambda item: item[1]["score"], reverse=True)[:k]
+        if not top:
+            return []
+        placeholders = ",".join("?" * len(top))
+        with self.reader() as conn:
+            contents = dict(conn.execute(
+                f"SELECT id, content FROM vectors WHERE project_id=? AND id IN ({placeholders})", [project_id, *(doc_id for doc_id, _ in top)]).fetchall())
+        return [Document(page_content=contents[doc_id], metadata={"id": doc_id, **scores}) for doc_id, scores in top if doc_id in contents]
+
+    def search_projects(self, embedding, project_ids: Sequence[str], k: int = 5, fetch_k: Optional[int] = None, query: Optional[str] = None) -> List[Document]:
+        """
+        Search several projects in parallel and merge the hits into one global top-k.
+
+        Each project returns its best ``fetch_k`` candidates. Raw cosine scores
+        are z-score normalised per project, so a project whose embeddings score
+        systematically higher does not crowd out the others, and the merged
+        list is ranked by the normalised score. With a single project the raw
+        ranking is returned unchanged. Given the query text on a store opened
+        with ``hybrid=True``, each project is searched with :meth:`hybrid_search`
+        and the fused scores are normalised instead.
+
+        Args:
+            embedding: Query embedding vector.
+            project_ids (Sequence[str]): Projects to search (duplicates are ignored).
+            k (int): Number of results to return.
+            fetch_k (Optional[int]): Candidates per project used for normalisation (default ``max(2 * k, 10)``).
+            query (Optional[str]): Query text for hybrid search (ignored unless the store is hybrid).
+
+        Returns:
+            List[Document]: Top-k documents; metadata holds ``id``, ``project_id``, raw ``score`` and ``norm_score``.
+
+        Example:
+            >>> docs = store.search_projects(embedder.embed("parse config"), ["proj1", "proj2"], k=5)
+        """
+        project_ids = list(dict.fromkeys(project_ids))
+        if not project_ids or k <= 0:
+            return []
+        fetch_k = fetch_k or max(2 * k, 10)
+
+        def search(project_id: str) -> List[Document]:
+            if query and self.hybrid and self.fts:
+                return self.hybrid_search(query, embedding, project_id, k=fetch_k)
+            return self.similarity_search("", k=fetch_k, filter={"embedding": embedding, "project_id": project_id})
+
+        if len(project_ids) == 1:
+            results = [search(project_ids[0])]
+        else:
+            results = list(self._search_executor().map(search, project_ids))
+        merged: List[Document] = []
+        for project_id, docs in zip(project_ids, results):
+            scores = np.array([doc.metadata["score"] for doc in docs], dtype=np.float32)
+            std = float(scores.std()) if len(scores) > 1 else 0.0
+            norm = (scores - scores.mean()) / std if std > 1e-6 else np.zeros_like(scores)
+            for doc, value in zip(docs, norm):
+                doc.metadata["project_id"] = project_id
+                doc.metadata["norm_score"] = float(value) if len(project_ids) > 1 else doc.metadata["score"]
+            merged.extend(docs)
+        merged.sort(key=lambda doc: doc.metadata["norm_score"], reverse=True)
+        return merged[:k]
+
+    def _search_executor(self) -> ThreadPoolExecutor:
+        if self._search_pool is None:
+            with self._index_lock:
+                if self._search_pool is None:
+                    self._search_pool = ThreadPoolExecutor(max_workers=self.search_workers, thread_name_prefix="ragms02-search")
+        return self._search_pool
+
+    def _index_search(self, embedding, project_id: str, k: int) -> List[Document]:
+        index = self.get_index(project_id)
+        with self._index_lock:
+            hits = index.search(embedding, max(k, self.rerank))
+        if not hits:
+            return []
+        if self.rerank:
+            hits = self._rerank(embedding, hits, k, project_id)
+        placeholders = ",".join("?" * len(hits))
+        with self.reader() as conn:
+            contents = dict(conn.execute(
+                f"SELECT id, content FROM vectors WHERE project_id=? AND id IN ({placeholders})", [project_id, *(vec_id for vec_id, _ in hits)]).fetchall())
+        # Hits without a row are stale or not yet committed; drop them rather than return empty documents
+        return [Document(page_content=contents[vec_id], metadata={"id": vec_id, "score": score}) for vec_id, score in hits if vec_id in contents]
+
+    def _rerank(self, embedding, hits: List[Tuple[str, float]], k: int, project_id: str) -> List[Tuple[str, float]]:
+        # Re-score index candidates against the stored embeddings
+        ids = [vec_id for vec_id, _ in hits]
+        placeholders = ",".join("?" * len(ids))
+
+        def load():
+            with self.reader() as conn:
+                rows = conn.execute(f"SELECT id, embedding, vec_row FROM vectors WHERE project_id=? AND id IN ({placeholders})", [project_id, *ids]).fetchall()
+            if not rows:
+                return [], np.empty((0, 0), dtype=np.float32)
+            if self.embedding_file is not None:
+                return [row[0] for row in rows], self.embedding_file.rows([row[2] for row in rows])
+            return [row[0] for row in rows], decode_rows([row[1] for row in rows], self.blob_dtype)
+
+        found, vectors = self._stable_read(load)
+        if not found:
+            return []
+        q = np.asarray(embedding, dtype=np.float32)
+        sims = (vectors @ q) / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(q) + 1e-8)
+        top = np.argsort(-sims, kind="stable")[:k]
+        return [(found[i], float(sims[i])) for i in top]
 
     def close(self):
         """
-        Close the SQLite connection.
+        Persist loaded indexes and close the writer and pooled reader connections.
 
         Example:
             >>> store.close()
         """
+        self.save_indexes()
+        if self._search_pool is not None:
+            self._search_pool.shutdown(wait=True)
+            self._search_pool = None
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
         self.conn.close()
+        if self.embedding_file is not None:
+            self.embedding_file.sync()
+            self.embedding_file.close()
 
     @classmethod
     def from_texts(cls, texts: List[str], embedding: Any, metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None, **kwargs) -> 'SQLiteLangChainVectorStore':
@@ -0,0 +1,507 @@
+"""
+Compressed embedding representations.
+
+Two layers use them:
+
+* **Stored embeddings** (``embedding_dtype`` of :class:`SQLiteLangChainVectorStore`):
+  each BLOB is float32, float16 or scalar int8 with a per-vector scale
+  (see :func:`encode_rows` / :func:`decode_rows`).
+* **Search** (the ``"quantized"`` index backend, :class:`QuantizedIndex`):
+  unit-normalised vectors are kept in memory only as codes of a
+  :class:`Float16Codec`, :class:`Int8Codec` or :class:`PQCodec` and queries
+  are scored directly on the codes. The store can re-rank the top candidates
+  against the stored vectors (``rerank``).
+
+For 384-dimensional embeddings a float32 vector takes 1536 bytes; float16
+takes 768, int8 388 and PQ with ``m=48`` sub-quantizers 48.
+"""
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Storage dtypes for embedding BLOBs
+BLOB_DTYPES = ("float32", "float16", "int8")
+
+
+def encode_rows(matrix: np.ndarray, dtype: str = "float32") -> List[bytes]:
+    """
+    Encode embeddings as one BLOB per row.
+
+    int8 rows are a float32 scale followed by ``dim`` int8 values.
+
+    Args:
+        matrix (np.ndarray): Float32 array of shape (n, dim).
+        dtype (str): One of :data:`BLOB_DTYPES`.
+
+    Returns:
+        List[bytes]: Encoded rows.
+    """
+    if dtype == "float32":
+        return [row.tobytes() for row in matrix]
+    if dtype == "float16":
+        return [row.tobytes() for row in matrix.astype(np.float16)]
+    if dtype == "int8":
+        codes, scales = _int8_encode(matrix)
+        return [scale.tobytes() + row.tobytes() for scale, row in zip(scales, codes)]
+    raise ValueError(f"Unknown embedding dtype: {dtype}")
+
+
+def decode_rows(blobs: Sequence[bytes], dtype: str = "float32") -> np.ndarray:
+    """
+    Decode BLOBs written by :func:`encode_rows` into a float32 matrix.
+
+    Args:
+        blobs (Sequence[bytes]): Encoded rows of equal length.
+        dtype (str): One of :data:`BLOB_DTYPES`.
+
+    Returns:
+        np.ndarray: Float32 array of shape (len(blobs), dim).
+    """
+    if not blobs:
+        return np.empty((0, 0), dtype=np.float32)
+    data = b"".join(blobs)
+    if dtype == "float32":
+        return np.frombuffer(data, dtype=np.float32).reshape(len(blobs), -1)
+    if dtype == "float16":
+        return np.frombuffer(data, dtype=np.float16).reshape(len(blobs), -1).astype(np.float32)
+    if dtype == "int8":
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(len(blobs), -1)
+        scales = raw[:, :4].copy().view(np.float32)
+        return raw[:, 4:].view(np.int8).astype(np.float32) * scales
+    raise ValueError(f"Unknown embedding dtype: {dtype}")
+
+
+def _int8_encode(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    scales = (np.abs(matrix).max(axis=1, keepdims=True) / 127.0).astype(np.float32)
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(matrix / scales), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / (np.linalg.norm(vectors, axis=-1, keepdims=True) + 1e-8)
+
+
+class Float16Codec:
+    """
+    Half-precision codes (2 bytes per dimension).
+    """
+    name = "float16"
+    trained = True
+
+    def fit(self, vectors: np.ndarray) -> None:
+        pass
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        return vectors.astype(np.float16), None
+
+    def decode(self, codes: np.ndarray, aux: Optional[np.ndarray]) -> np.ndarray:
+        return codes.astype(np.float32)
+
+    def scores(self, codes: np.ndarray, aux: Optional[np.ndarray], q: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) @ q
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {}
+
+    def load_state(self, state: Dict[str, np.ndarray]) -> None:
+        pass
+
+
+class Int8Codec(Float16Codec):
+    """
+    Scalar int8 codes with a float32 scale per vector (1 byte per dimension + 4).
+    """
+    name = "int8"
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        codes, scales = _int8_encode(vectors)
+        return codes, scales.ravel()
+
+    def decode(self, codes: np.ndarray, aux: Optional[np.ndarray]) -> np.ndarray:
+        return codes.astype(np.float32) * aux[:, None]
+
+    def scores(self, codes: np.ndarray, aux: Optional[np.ndarray], q: np.ndarray) -> np.ndarray:
+        return (codes.astype(np.float32) @ q) * aux
+
+
+class PQCodec:
+    """
+    Product quantization: ``m`` sub-vectors, each replaced by the index of its
+    nearest of ``ksub`` trained centroids (1 byte per sub-vector).
+
+    Scores use asymmetric distance computation: the query is compared with
+    every centroid once, then each code is scored with ``m`` table lookups.
+    """
+    name = "pq"
+
+    def __init__(self, m: int = 16, ksub: int = 256, iters: int = 15, seed: int = 0):
+        """
+        Initialize an untrained codec.
+
+        Args:
+            m (int): Number of sub-quantizers; must divide the embedding dimension.
+            ksub (int): Centroids per sub-quantizer (at most 256).
+            iters (int): k-means iterations used by :meth:`fit`.
+            seed (int): Random seed.
+        """
+        if not 1 <= ksub <= 256:
+            raise ValueError("ksub must be between 1 and 256.")
+        self.m = m
+        self.ksub = ksub
+        self.iters = iters
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None  # (m, ksub, dsub)
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        n, dim = vectors.shape
+        if dim % self.m:
+            raise ValueError(f"PQ m={self.m} does not divide the embedding dimension {dim}.")
+        return vectors.reshape(n, self.m, dim // self.m)
+
+    def fit(self, vectors: np.ndarray) -> None:
+        """
+        Train the sub-quantizers with k-means.
+
+        Args:
+            vectors (np.ndarray): Training vectors (n, dim).
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        rng = np.random.default_rng(self.seed)
+        if len(vectors) > 256 * self.ksub:
+            vectors = vectors[rng.choice(len(vectors), size=256 * self.ksub, replace=False)]
+        sub = self._split(vectors)
+        ksub = min(self.ksub, len(sub))
+        centroids = np.empty((self.m, ksub, sub.shape[2]), dtype=np.float32)
+        for j in range(self.m):
+            data = np.ascontiguousarray(sub[:, j, :])
+            cent = data[rng.choice(len(data), size=ksub, replace=False)].copy()
+            for _ in range(self.iters):
+                assign = self._nearest(data, cent)
+                counts = np.bincount(assign, minlength=ksub)
+                sums = np.stack([np.bincount(assign, weights=data[:, d], minlength=ksub) for d in range(data.shape[1])], axis=1)
+                filled = counts > 0
+                cent[filled] = sums[filled] / counts[filled, None]
+                # Reseed empty centroids from random points
+                empty = np.flatnonzero(~filled)
+                if len(empty):
+                    cent[empty] = data[rng.choice(len(data), size=len(empty))]
+            centroids[j] = cent
+        self.centroids = centroids
+
+    @staticmethod
+    def _nearest(data: np.ndarray, cent: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+        out = np.empty(len(data), dtype=np.int64)
+        cent_sq = (cent ** 2).sum(axis=1)
+        cent_t = np.ascontiguousarray(-2 * cent.T)
+        for start in range(0, len(data), batch_size):
+            dist = data[start:start + batch_size] @ cent_t
+            dist += cent_sq
+            out[start:start + batch_size] = dist.argmin(axis=1)
+        return out
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        sub = self._split(np.asarray(vectors, dtype=np.float32))
+        codes = np.empty((len(sub), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = self._nearest(np.ascontiguousarray(sub[:, j, :]), self.centroids[j])
+        return codes, None
+
+    def decode(self, codes: np.ndarray, aux: Optional[np.ndarray]) -> np.ndarray:
+        parts = [self.centroids[j][codes[:, j]] for j in range(self.m)]
+        return np.concatenate(parts, axis=1) if parts else np.empty((0, 0), dtype=np.float32)
+
+    def scores(self, codes: np.ndarray, aux: Optional[np.ndarray], q: np.ndarray) -> np.ndarray:
+        table = np.einsum("mkd,md->mk", self.centroids, q.reshape(self.m, -1))
+        scores = np.zeros(len(codes), dtype=np.float32)
+        for j in range(self.m):
+            scores += table[j][codes[:, j]]
+        return scores
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"pq_centroids": self.centroids} if self.centroids is not None else {}
+
+    def load_state(self, state: Dict[str, np.ndarray]) -> None:
+        if "pq_centroids" in state:
+            self.centroids = state["pq_centroids"]
+            self.m = self.centroids.shape[0]
+
+
+CODECS = {
+    "float16": Float16Codec,
+    "int8": Int8Codec,
+    "pq": PQCodec,
+}
+
+
+class QuantizedIndex:
+    """
+    In-memory index that keeps only compressed codes of unit-normalised vectors.
+
+    Codecs that need training (PQ) keep exact float32 vectors until
+    ``train_threshold`` vectors have been added, then train and encode them.
+
+    Example:
+        >>> index = QuantizedIndex(codec="pq", m=48)
+        >>> index.add(ids, embeddings)
+        >>> results = index.search(query_emb, k=50)
+    """
+
+    def __init__(self, codec: str = "int8", train_threshold: int = 4096, dim: Optional[int] = None, batch_size: int = 65536, **codec_params):
+        """
+        Initialize an empty index.
+
+        Args:
+            codec (str): Codec name from :data:`CODECS`.
+            train_threshold (int): Vectors required before a trainable codec is fitted.
+            dim (Optional[int]): Embedding dimension. Inferred from the first add if omitted.
+            batch_size (int): Codes decoded per block while scoring, bounding temporary memory.
+            **codec_params: Codec parameters, e.g. ``m`` for "pq".
+        """
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec: {codec}")
+        self.codec = CODECS[codec](**codec_params)
+        self.train_threshold = train_threshold
+        self.dim = dim
+        self.batch_size = batch_size
+        self._ids: List[str] = []
+        self._pos: Dict[str, int] = {}
+        # Preallocated code rows (and per-row aux values); the first len(self) rows are live once trained
+        self._codes: Optional[np.ndarray] = None
+        self._aux: Optional[np.ndarray] = None
+        self._pending: List[np.ndarray] = []  # float32 rows while the codec is untrained
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._pos
+
+    @property
+    def code_size(self) -> int:
+        """int: Bytes held per vector once encoded (0 while untrained)."""
+        if self._codes is None:
+            return 0
+        aux = self._aux.itemsize if self._aux is not None else 0
+        return self._codes.itemsize * self._codes.shape[1] + aux
+
+    def _append(self, codes: np.ndarray, aux: Optional[np.ndarray]) -> None:
+        # Rows for the new ids are len(self) - len(codes) .. len(self)
+        end = len(self._ids)
+        start = end - len(codes)
+        if self._codes is None or end > len(self._codes):
+            capacity = max(end, 2 * len(self._codes) if self._codes is not None else 0, 1024)
+            grown = np.empty((capacity, codes.shape[1]), dtype=codes.dtype)
+            grown_aux = np.empty(capacity, dtype=np.float32) if aux is not None else None
+            if self._codes is not None:
+                grown[:start] = self._codes[:start]
+                if aux is not None:
+                    grown_aux[:start] = self._aux[:start]
+            self._codes, self._aux = grown, grown_aux
+        self._codes[start:end] = codes
+        if aux is not None:
+            self._aux[start:end] = aux
+
+    def add(self, ids: Sequence[str], embeddings: Iterable) -> None:
+        """
+        Insert or replace embeddings.
+
+        Args:
+            ids (Sequence[str]): Document IDs.
+            embeddings: 2-D array-like of shape (len(ids), dim).
+        """
+        if len(ids) == 0:
+            return
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1))
+        if self.dim is None:
+            if isinstance(self.codec, PQCodec) and vectors.shape[1] % self.codec.m:
+                raise ValueError(f"PQ m={self.codec.m} does not divide the embedding dimension {vectors.shape[1]}.")
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dim}.")
+        self.remove([doc_id for doc_id in ids if doc_id in self._pos])
+        for doc_id in ids:
+            self._pos[doc_id] = len(self._ids)
+            self._ids.append(doc_id)
+        if not self.codec.trained:
+            self._pending.append(vectors)
+            if len(self) >= self.train_threshold:
+                self.train()
+            return
+        self._append(*self.codec.encode(vectors))
+
+    def remove(self, ids: Iterable[str]) -> int:
+        """
+        Remove embeddings by ID. Rows are compacted by moving the last row into the gap.
+
+        Args:
+            ids (Iterable[str]): Document IDs to remove. Unknown IDs are ignored.
+
+        Returns:
+            int: Number of rows removed.
+        """
+        if self._pending:
+            self._pending = [np.concatenate(self._pending)]
+        rows = self._pending[0] if self._pending else self._codes
+        removed = 0
+        for doc_id in ids:
+            row = self._pos.pop(doc_id, None)
+            if row is None:
+                continue
+            last = len(self._ids) - 1
+            if row != last:
+                moved = self._ids[last]
+                rows[row] = rows[last]
+                if self._aux is not None:
+                    self._aux[row] = self._aux[last]
+                self._ids[row] = moved
+                self._pos[moved] = row
+            self._ids.pop()
+            removed += 1
+        if self._pending:
+            self._pending = [rows[:len(self._ids)]]
+        return removed
+
+    def rename(self, mapping: Dict[str, str]) -> int:
+        """
+        Re-key rows in place; their codes are not touched.
+
+        Args:
+            mapping (Dict[str, str]): Old ID to new ID. Unknown old IDs are ignored; rows already
+                stored under a new ID are replaced.
+
+        Returns:
+            int: Number of rows renamed.
+        """
+        self.remove([new_id for new_id in mapping.values() if new_id in self._pos and new_id not in mapping])
+        rows = [(self._pos.pop(old_id), new_id) for old_id, new_id in mapping.items() if old_id in self._pos]
+        for row, new_id in rows:
+            self._ids[row] = new_id
+            self._pos[new_id] = row
+        return len(rows)
+
+    def train(self) -> None:
+        """
+        Fit the codec on the current vectors and encode them.
+        """
+        vectors = self._vectors()
+        if not len(vectors):
+            return
+        self.codec.fit(vectors)
+        self._pending = []
+        self._codes = self._aux = None
+        self._append(*self.codec.encode(vectors))
+
+    def _vectors(self) -> np.ndarray:
+        if self._pending:
+            return np.concatenate(self._pending)
+        n = len(self._ids)
+        if self._codes is None or n == 0:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return self.codec.decode(self._codes[:n], self._aux[:n] if self._aux is not None else None)
+
+    def rebuild(self) -> None:
+        """
+        Retrain the codec on the decoded vectors (or train it for the first time).
+        """
+        self.train()
+
+    def reset(self, ids: Sequence[str], embeddings: Iterable) -> None:
+        """
+        Replace the indexed vectors while keeping a trained codec.
+
+        Args:
+            ids (Sequence[str]): Document IDs.
+            embeddings: 2-D array-like of shape (len(ids), dim).
+        """
+        self._ids, self._pos = [], {}
+        self._codes = self._aux = None
+        self._pending = []
+        self.add(list(ids), embeddings)
+
+    def search(self, query_emb, k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Return the approximate top-k (id, cosine similarity) pairs, scored on the codes.
+
+        Args:
+            query_emb: Query embedding vector.
+            k (int): Number of results to return.
+
+        Returns:
+            List[Tuple[str, float]]: Pairs sorted by descending similarity.
+        """
+        n = len(self._ids)
+        if n == 0 or k <= 0:
+            return []
+        q = _normalize(np.asarray(query_emb, dtype=np.float32).ravel())
+        if self._pending:
+            scores = np.concatenate(self._pending) @ q
+        else:
+            scores = np.empty(n, dtype=np.float32)
+            for start in range(0, n, self.batch_size):
+                stop = min(start + self.batch_size, n)
+                aux = self._aux[start:stop] if self._aux is not None else None
+                scores[start:stop] = self.codec.scores(self._codes[start:stop], aux, q)
+        top = np.argpartition(-scores, k - 1)[:k] if k < n else np.arange(n)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self._ids[i], float(scores[i])) for i in top]
+
+    def save(self, path: str, **meta) -> None:
+        """
+        Persist the codes and codec to an ``.npz`` file (written atomically).
+
+        Args:
+            path (str): Destination file path.
+            **meta: Extra scalar metadata stored alongside the index.
+        """
+        pending = np.concatenate(self._pending) if self._pending else np.empty((0, self.dim or 0), dtype=np.float32)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                codec=np.asarray(self.codec.name),
+                ids=np.array(self._ids, dtype=str),
+                pending=pending,
+                codes=self._codes[: len(self._ids)] if self._codes is not None else np.empty((0, 0), dtype=np.uint8),
+                aux=self._aux[: len(self._ids)] if self._aux is not None else np.empty(0, dtype=np.float32),
+                **self.codec.state(),
+                **{f"meta_{key}": np.asarray(value) for key, value in meta.items()},
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, **params) -> Tuple["QuantizedIndex", dict]:
+        """
+        Load an index written by :meth:`save`.
+
+        A file written with a different codec than ``params["codec"]`` is
+        ignored: an empty index is returned with no metadata, so the caller
+        rebuilds it.
+
+        Args:
+            path (str): Source file path.
+            **params: Constructor parameters (e.g. ``codec``, ``m``).
+
+        Returns:
+            Tuple[QuantizedIndex, dict]: The index and the metadata saved with it.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            codec = str(data["codec"])
+            if params.get("codec", codec) != codec:
+                return cls(**params), {}
+            index = cls(**{**params, "codec": codec})
+            index.codec.load_state({key: data[key] for key in data.files})
+            index._ids = [str(doc_id) for doc_id in data["ids"]]
+            index._pos = {doc_id: i for i, doc_id in enumerate(index._ids)}
+            if data["pending"].size:
+                index._pending = [data["pending"]]
+                index.dim = data["pending"].shape[1]
+            elif index._ids:
+                index._append(data["codes"], data["aux"] if data["aux"].size else None)
+                index.dim = index.codec.decode(index._codes[:1], index._aux[:1] if index._aux is not None else None).shape[1]
+            meta = {key[5:]: data[key].item() for key in data.files if key.startswith("meta_")}
+        return index, meta
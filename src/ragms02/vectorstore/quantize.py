@@ -0,0 +1,144 @@
+"""
+Convert an existing vector database to compressed embeddings in place and
+report the recall of quantized search against exact search.
+
+Usage:
+    python -m ragms02.vectorstore.quantize rag.db --dtype int8 --codec pq --m 48 --rerank 100
+
+Steps:
+    1. For every project, sample query vectors (stored embeddings plus a
+       little noise) and compute their exact top-k on the current vectors.
+    2. Re-open the store with the requested BLOB ``--dtype`` (rows are
+       re-encoded in place) and build and persist a ``"quantized"`` index
+       per project with the requested ``--codec``.
+    3. Report recall@k of the quantized index, with and without exact
+       re-ranking of ``--rerank`` candidates, and the bytes per vector.
+
+Serve the converted database with ``RAGMS02_INDEX_BACKEND=quantized``,
+``RAGMS02_INDEX_CODEC`` and ``RAGMS02_RERANK`` set to the same values.
+"""
+import argparse
+import sqlite3
+import sys
+from typing import Dict, List, Optional
+import numpy as np
+from ragms02.vectorstore.index import MatrixIndex
+from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
+from ragms02.vectorstore.quantization import BLOB_DTYPES, CODECS
+
+
+def _storage(db_path: str) -> str:
+    conn = sqlite3.connect(db_path)
+    try:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(vectors)")}
+        if "vec_row" in columns and conn.execute("SELECT 1 FROM vectors WHERE vec_row IS NOT NULL LIMIT 1").fetchone():
+            return "mmap"
+        return "blob"
+    finally:
+        conn.close()
+
+
+def _recall(store: SQLiteLangChainVectorStore, project_id: str, queries: np.ndarray, truth: List[set], k: int) -> float:
+    found = 0
+    for q, expected in zip(queries, truth):
+        docs = store.similarity_search("", k=k, filter={"embedding": q, "project_id": project_id})
+        found += len(expected & {doc.metadata["id"] for doc in docs})
+    return found / max(1, sum(len(expected) for expected in truth))
+
+
+def quantize(db_path: str, dtype: Optional[str] = None, codec: str = "int8", codec_params: Optional[dict] = None, rerank: int = 100, queries: int = 100, k: int = 10, seed: int = 0) -> List[Dict]:
+    """
+    Convert a database in place and measure recall (see the module docstring).
+
+    Args:
+        db_path (str): SQLite database path.
+        dtype (Optional[str]): Target BLOB dtype (None keeps the current one).
+        codec (str): Index codec name from :data:`CODECS`.
+        codec_params (Optional[dict]): Codec parameters, e.g. ``{"m": 48}``.
+        rerank (int): Candidates re-scored exactly for the re-ranked recall.
+        queries (int): Sampled queries per project.
+        k (int): Recall cut-off.
+        seed (int): Random seed for query sampling.
+
+    Returns:
+        List[Dict]: One row per project with ``project_id``, ``rows``, ``index_bytes``,
+        ``blob_bytes`` (stored bytes per vector), ``recall`` and ``recall_rerank``.
+    """
+    storage = _storage(db_path)
+    if storage == "mmap" and dtype is not None:
+        raise ValueError("--dtype converts BLOB storage; this database keeps its embeddings in a memory-mapped file.")
+    rng = np.random.default_rng(seed)
+    store = SQLiteLangChainVectorStore(db_path, embedding_storage=storage)
+    try:
+        with store.reader() as conn:
+            projects = [row[0] for row in conn.execute("SELECT DISTINCT project_id FROM vectors")]
+        samples = {}
+        for project_id in projects:
+            ids, vectors = store._load_vectors(project_id)
+            if not ids:
+                continue
+            picks = vectors[rng.choice(len(ids), size=min(queries, len(ids)), replace=False)]
+            noisy = picks + rng.normal(scale=0.05 * float(np.abs(picks).mean() or 1.0), size=picks.shape).astype(np.float32)
+            exact = MatrixIndex()
+            exact.add(ids, vectors)
+            samples[project_id] = (len(ids), noisy, [{doc_id for doc_id, _ in exact.search(q, k)} for q in noisy])
+    finally:
+        store.close()
+
+    params = {"codec": codec, **(codec_params or {})}
+    store = SQLiteLangChainVectorStore(db_path, use_index=True, index_backend="quantized", index_params=params, embedding_storage=storage, embedding_dtype=dtype)
+    report = []
+    try:
+        for project_id, (rows, noisy, truth) in samples.items():
+            index = store.get_index(project_id)
+            if not index.codec.trained:
+                # Small projects never reach the training threshold on their own
+                index.train()
+            store.rerank = 0
+            recall = _recall(store, project_id, noisy, truth, k)
+            store.rerank = rerank
+            recall_rerank = _recall(store, project_id, noisy, truth, k) if rerank else recall
+            if store.embedding_file is not None:
+                blob_bytes = store.embedding_file.dtype.itemsize * (store.embedding_file.dim or 0)
+            else:
+                with store.reader() as conn:
+                    blob_bytes = conn.execute("SELECT AVG(LENGTH(embedding)) FROM vectors WHERE project_id=?", (project_id,)).fetchone()[0]
+            report.append({
+                "project_id": project_id,
+                "rows": rows,
+                "index_bytes": index.code_size,
+                "blob_bytes": blob_bytes or 0,
+                "recall": recall,
+                "recall_rerank": recall_rerank,
+            })
+        store.save_indexes(list(samples))
+    finally:
+        store.close()
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m ragms02.vectorstore.quantize", description="Quantize a ragms02 vector database in place and report recall.")
+    parser.add_argument("db_path", help="SQLite database path")
+    parser.add_argument("--dtype", choices=BLOB_DTYPES, help="stored embedding dtype (default: keep)")
+    parser.add_argument("--codec", choices=sorted(CODECS), default="int8", help="index codec (default: int8)")
+    parser.add_argument("--m", type=int, default=16, help="PQ sub-quantizers; must divide the dimension (default: 16)")
+    parser.add_argument("--rerank", type=int, default=100, help="candidates re-scored exactly (default: 100)")
+    parser.add_argument("--queries", type=int, default=100, help="sampled queries per project (default: 100)")
+    parser.add_argument("-k", type=int, default=10, help="recall cut-off (default: 10)")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to return freed pages to the filesystem")
+    args = parser.parse_args(argv)
+    codec_params = {"m": args.m} if args.codec == "pq" else {}
+    report = quantize(args.db_path, dtype=args.dtype, codec=args.codec, codec_params=codec_params, rerank=args.rerank, queries=args.queries, k=args.k)
+    print(f"{'project':<24} {'rows':>10} {'index B/vec':>12} {'stored B/vec':>13} {f'recall@{args.k}':>10} {f'+rerank {args.rerank}':>12}")
+    for row in report:
+        print(f"{row['project_id']:<24} {row['rows']:>10} {row['index_bytes']:>12} {row['blob_bytes']:>13.0f} {row['recall']:>10.3f} {row['recall_rerank']:>12.3f}")
+    if args.vacuum:
+        conn = sqlite3.connect(args.db_path)
+        conn.execute("VACUUM")
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -55,6 +55,34 @@ class VectorStore:
         )
         self.conn.commit()
 
+    def add_vectors(self, ids: List[str], project_id: str, tags: List[str], embeddings, commit_every: Optional[int] = None) -> int:
+        """
+        Add or update many vectors with ``executemany``, committing once (or every ``commit_every`` rows).
+
+        Args:
+            ids (List[str]): Vector IDs.
+            project_id (str): Project identifier for all vectors.
+            tags (List[str]): Tag or event type per vector.
+            embeddings: 2-D float array-like of shape (len(ids), dim).
+            commit_every (Optional[int]): Rows per committed transaction (default: all rows in one).
+
+        Returns:
+            int: Number of vectors written.
+
+        Example:
+            >>> store.add_vectors(["vec1", "vec2"], "proj1", ["created", "created"], np.zeros((2, 384)))
+        """
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        step = commit_every or len(ids) or 1
+        for start in range(0, len(ids), step):
+            stop = min(start + step, len(ids))
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO vectors (id, project_id, tag, embedding) VALUES (?, ?, ?, ?)",
+                    ((ids[i], project_id, tags[i], matrix[i].tobytes()) for i in range(start, stop)),
+                )
+        return len(ids)
+
     def get_vector(self, id: str) -> Optional[bytes]:
         """
         Retrieve a vector by its ID.
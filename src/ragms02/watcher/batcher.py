@@ -0,0 +1,398 @@
+"""
+Debounced, coalescing event batcher for the file watcher.
+
+Editors rarely write a file once: a save is often a temp-file write, a
+rename over the original and a few metadata updates, i.e. 5-10 events for
+one logical change. :class:`EventBatcher` keeps one pending entry per path
+and folds every event for that path into its net effect:
+
+- created then deleted within the window: nothing is sent;
+- deleted then created (or modified): one ``modified``;
+- any number of modifications: one ``modified`` (or ``created``);
+- a move of a file with no pending changes is sent as one ``moved`` event
+  (``old_path`` to ``path``), which the API applies by re-keying the stored
+  chunks without re-embedding them. Chains such as ``a -> b -> c`` resolve
+  to one move from ``a`` to ``c``; edits after the move are sent with it.
+  A move is only kept while its source path stays untouched; otherwise, and
+  when either end already has pending changes (a temp file renamed over the
+  original), it is sent as a delete of the source plus a write of the
+  destination.
+
+A path is sent once it has been quiet for ``debounce`` seconds (or has been
+pending for ``max_delay`` seconds, so a file that is written continuously
+is still indexed). Ready events are posted to ``/ingest/notify`` once
+``batch_size`` of them are waiting or the oldest has waited
+``flush_interval`` seconds. Failed posts are retried with exponential
+backoff; events that still cannot be delivered are put back and retried on
+a later flush.
+
+Example:
+    >>> batcher = EventBatcher("http://localhost:8000/ingest/notify", "proj1", "./my_project")
+    >>> batcher.start()
+    >>> batcher.add("modified", "src/app.py")
+    >>> batcher.stop()
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying; any other 4xx means the batch itself is rejected
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+BINARY_SNIFF_BYTES = 8192
+
+
+class EventBatcher:
+    """
+    Coalesce file events per path and post them to the ingest API in batches.
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        project_id: str,
+        root: str,
+        debounce: float = 0.5,
+        max_delay: float = 10.0,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        send_content: bool = True,
+        timeout: float = 30.0,
+        session: Optional[requests.Session] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            api_url (str): ``/ingest/notify`` URL.
+            project_id (str): Project identifier sent with every batch.
+            root (str): Watched directory; event paths are relative to it.
+            debounce (float): Seconds a path must be quiet before its event is sent.
+            max_delay (float): Seconds after which a path is sent even if it is still changing.
+            batch_size (int): Maximum events per request; a full batch is sent without waiting.
+            flush_interval (float): Seconds a ready event may wait for more to batch with.
+            max_retries (int): Retries per request before the events are put back.
+            backoff (float): Initial retry delay in seconds, doubled after every failure.
+            max_backoff (float): Cap on the retry delay.
+            send_content (bool): Include file contents, so the API does not need access to the files.
+            timeout (float): HTTP timeout in seconds.
+            session (Optional[requests.Session]): Session for keep-alive connections (default: ``requests.post``).
+            clock (Callable[[], float]): Monotonic clock (replaceable in tests).
+        """
+        self.api_url = api_url
+        self.project_id = project_id
+        self.root = os.path.abspath(root)
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.send_content = send_content
+        self.timeout = timeout
+        self.session = session
+        self.clock = clock
+        # path -> {"op", "born", "first", "last", "ts"}; moves also carry "old_path" and "changed"
+        self._pending: Dict[str, dict] = {}
+        # old_path -> destination of each pending move
+        self._moved_from: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._paused_until = 0.0
+        self.stats = {"received": 0, "sent": 0, "requests": 0, "retries": 0, "failed": 0}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, event_type: str, path: str, dest_path: Optional[str] = None) -> None:
+        """
+        Record a file event.
+
+        Args:
+            event_type (str): "created", "modified", "deleted" or "moved".
+            path (str): Root-relative POSIX path (the source path for moves).
+            dest_path (Optional[str]): Root-relative destination of a move.
+        """
+        now = self.clock()
+        with self._lock:
+            self.stats["received"] += 1
+            if event_type == "moved" and dest_path is not None:
+                self._move(path, dest_path, now)
+            elif event_type == "moved":
+                self._fold(path, "deleted", now)
+            else:
+                self._fold(path, event_type, now)
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    def _move(self, path: str, dest_path: str, now: float) -> None:
+        for moved_from in (path, dest_path):
+            if moved_from in self._moved_from:
+                self._split_move(self._moved_from[moved_from])
+        entry = self._pending.get(path)
+        if dest_path in self._pending or (entry is not None and entry["op"] != "moved"):
+            # Pending changes at either end: send the net effect as a delete and a write.
+            # The destination may have existed before (atomic save), so it is never "born" here.
+            self._fold(path, "deleted", now)
+            self._fold(dest_path, "modified", now)
+            return
+        if entry is None:
+            entry = {"op": "moved", "old_path": path, "changed": False, "born": False, "first": now}
+        else:
+            # A chain of moves keeps the original source
+            del self._pending[path]
+        entry["last"] = now
+        entry["ts"] = datetime.now(timezone.utc)
+        self._pending[dest_path] = entry
+        self._moved_from[entry["old_path"]] = dest_path
+
+    def _split_move(self, dest_path: str) -> None:
+        # The move's source is in use again: turn the move into a delete of the source and a write of the destination
+        entry = self._pending[dest_path]
+        old_path = entry.pop("old_path")
+        entry.pop("changed")
+        del self._moved_from[old_path]
+        entry["op"] = "modified"
+        self._pending[old_path] = {"op": "deleted", "born": False, "first": entry["first"], "last": entry["last"], "ts": entry["ts"]}
+
+    def _fold(self, path: str, event_type: str, now: float) -> None:
+        if path in self._moved_from:
+            self._split_move(self._moved_from[path])
+        entry = self._pending.get(path)
+        if entry is None:
+            if event_type not in ("created", "modified", "deleted"):
+                return
+            self._pending[path] = {"op": event_type, "born": event_type == "created", "first": now, "last": now, "ts": datetime.now(timezone.utc)}
+            return
+        entry["last"] = now
+        entry["ts"] = datetime.now(timezone.utc)
+        if entry["op"] == "moved":
+            if event_type == "deleted":
+                # Moved, then deleted: only the chunks stored under the old path need removing
+                del self._pending[path]
+                del self._moved_from[entry["old_path"]]
+                self._fold(entry["old_path"], "deleted", now)
+            else:
+                entry["changed"] = True
+        elif event_type == "deleted":
+            if entry["born"]:
+                # Created and removed inside the window: the API never needs to hear about it
+                del self._pending[path]
+            else:
+                entry["op"] = "deleted"
+        elif entry["op"] == "deleted":
+            entry["op"] = "modified"
+        elif event_type == "created" and not entry["born"]:
+            entry["op"] = "modified"
+
+    def ready(self, force: bool = False) -> List[str]:
+        """
+        Return the paths whose events are due, oldest first.
+
+        Args:
+            force (bool): Return every pending path.
+
+        Returns:
+            List[str]: Root-relative paths.
+        """
+        now = self.clock()
+        with self._lock:
+            due = [
+                (entry["last"], path) for path, entry in self._pending.items()
+                if force or now >= self._ready_at(entry)
+            ]
+        return [path for _, path in sorted(due)]
+
+    def _ready_at(self, entry: dict) -> float:
+        return min(entry["last"] + self.debounce, entry["first"] + self.max_delay)
+
+    def flush(self, force: bool = False) -> int:
+        """
+        Send due events if a full batch is waiting or the oldest has waited ``flush_interval``.
+
+        Args:
+            force (bool): Send every pending event now (used on shutdown).
+
+        Returns:
+            int: Number of events delivered.
+        """
+        with self._send_lock:
+            now = self.clock()
+            if not force and now < self._paused_until:
+                return 0
+            paths = self.ready(force)
+            if not paths:
+                return 0
+            if not force and len(paths) < self.batch_size:
+                with self._lock:
+                    oldest = min((self._ready_at(self._pending[p]) for p in paths if p in self._pending), default=now)
+                if now - oldest < self.flush_interval:
+                    return 0
+            sent = 0
+            for start in range(0, len(paths), self.batch_size):
+                with self._lock:
+                    taken = {p: self._pending.pop(p) for p in paths[start:start + self.batch_size] if p in self._pending}
+                    for entry in taken.values():
+                        if entry["op"] == "moved":
+                            del self._moved_from[entry["old_path"]]
+                if not taken:
+                    continue
+                if self._post(self._events(taken)):
+                    sent += len(taken)
+                else:
+                    self._requeue(taken)
+                    self._paused_until = self.clock() + self.max_backoff
+                    break
+            return sent
+
+    def _events(self, taken: Dict[str, dict]) -> List[dict]:
+        events = []
+        for path, entry in taken.items():
+            timestamp = entry["ts"].isoformat().replace("+00:00", "Z")
+            event = {"path": path, "event_type": entry["op"], "timestamp": timestamp}
+            if entry["op"] == "moved":
+                event["old_path"] = entry["old_path"]
+                events.append(event)
+                if not entry["changed"]:
+                    continue
+                if not self.send_content:
+                    # The API re-reads the destination after re-keying its chunks
+                    events.append({"path": path, "event_type": "modified", "timestamp": timestamp})
+                    continue
+                read = self._read(path)
+                if read is None:
+                    # Gone (or binary): drop the chunks still stored under the old path instead
+                    event.clear()
+                    event.update(path=entry["old_path"], event_type="deleted", timestamp=timestamp)
+                else:
+                    event["content"], event["hash"] = read
+                continue
+            if entry["op"] != "deleted" and self.send_content:
+                read = self._read(path)
+                if read is None:
+                    # Gone (or binary) by the time it is sent: make sure nothing stale stays indexed
+                    event["event_type"] = "deleted"
+                else:
+                    # The hash lets the API skip files whose content it has already indexed
+                    event["content"], event["hash"] = read
+            events.append(event)
+        return events
+
+    def _read(self, path: str) -> Optional[Tuple[str, str]]:
+        try:
+            with open(os.path.join(self.root, path), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if b"\0" in data[:BINARY_SNIFF_BYTES]:
+            return None
+        return data.decode("utf-8", errors="ignore"), hashlib.sha256(data).hexdigest()
+
+    def _requeue(self, taken: Dict[str, dict]) -> None:
+        with self._lock:
+            for path, entry in taken.items():
+                if entry["op"] == "moved":
+                    old_path = entry["old_path"]
+                    if path in self._pending or old_path in self._pending or old_path in self._moved_from:
+                        # Either end changed while the move was in flight: resend it as a delete and a write
+                        old_entry = self._pending.get(old_path)
+                        if old_entry is None:
+                            self._pending[old_path] = {"op": "deleted", "born": False, "first": entry["first"], "last": entry["last"], "ts": entry["ts"]}
+                        else:
+                            old_entry["born"] = False
+                        entry = {"op": "modified", "born": False, "first": entry["first"], "last": entry["last"], "ts": entry["ts"]}
+                    else:
+                        self._moved_from[old_path] = path
+                # A newer event for the path already supersedes the failed one
+                self._pending.setdefault(path, entry)
+
+    def _post(self, events: List[dict]) -> bool:
+        payload = {"project_id": self.project_id, "events": events}
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            self.stats["requests"] += 1
+            retry_after = None
+            try:
+                resp = (self.session or requests).post(self.api_url, json=payload, timeout=self.timeout)
+                if resp.ok:
+                    self.stats["sent"] += len(events)
+                    logger.info("Sent %d events to %s (status %s)", len(events), self.api_url, resp.status_code)
+                    return True
+                if resp.status_code not in RETRY_STATUSES:
+                    logger.error("Ingest API rejected %d events with status %s; dropping them", len(events), resp.status_code)
+                    self.stats["failed"] += len(events)
+                    return True
+                retry_after = resp.headers.get("Retry-After")
+                logger.warning("Ingest API returned %s (attempt %d)", resp.status_code, attempt + 1)
+            except requests.RequestException as e:
+                logger.warning("Failed to send events (attempt %d): %s", attempt + 1, e)
+            if attempt == self.max_retries:
+                break
+            self.stats["retries"] += 1
+            wait = delay
+            if retry_after is not None:
+                try:
+                    wait = max(wait, float(retry_after))
+                except ValueError:
+                    pass
+            if self._stop.wait(min(wait, self.max_backoff)):
+                # Shutting down: one last attempt is made by stop()'s final flush
+                break
+            delay = min(delay * 2, self.max_backoff)
+        logger.error("Giving up on %d events for now; they will be retried", len(events))
+        return False
+
+    def start(self) -> None:
+        """
+        Start the background flush thread.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ragms02-watcher-batcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, flush: bool = True) -> None:
+        """
+        Stop the flush thread, sending every pending event first unless ``flush`` is False.
+
+        Args:
+            flush (bool): Send pending events before returning.
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if flush and self._pending:
+            self._stop.clear()
+            try:
+                self.flush(force=True)
+            finally:
+                self._stop.set()
+
+    def _run(self) -> None:
+        tick = max(0.05, min(self.debounce, self.flush_interval) / 2)
+        while not self._stop.is_set():
+            self._wake.wait(tick)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Event batcher flush failed")
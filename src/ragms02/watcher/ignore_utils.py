@@ -2,11 +2,19 @@
 ignore_utils.py - Shared ignore pattern loader for RAGMS02
 
 This utility loads .ragignore (gitignore-style) patterns and provides a function to check if a path should be ignored.
+
+For whole-tree work use :class:`IgnoreRules` (root and nested ``.ragignore``
+files), :func:`iter_tree` and :class:`IgnoreTree`: the patterns are compiled into a few combined regexes,
+directory results are memoised, ignored directories are pruned (as in git,
+nothing below an ignored directory can be re-included), and a pattern change
+is applied by re-checking the known entries instead of rescanning the tree.
 """
 import os
+import re
 import pathspec
 import logging
-from typing import Optional
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
@@ -28,10 +36,12 @@ def load_ignore_patterns(ignore_file: Optional[str] = None, root_dir: Optional[s
     logger.debug(f"Loaded ignore patterns: {patterns}")
     return pathspec.PathSpec.from_lines("gitwildmatch", patterns)
 
-def is_ignored(path: str, spec: pathspec.PathSpec) -> bool:
+def is_ignored(path: str, spec: Union[pathspec.PathSpec, "IgnoreMatcher", "IgnoreRules", "IgnoreTree"]) -> bool:
     """
     Check if a given path (relative to project root, POSIX style) should be ignored.
     """
+    if isinstance(spec, (IgnoreMatcher, IgnoreRules, IgnoreTree)):
+        return spec.match(path)
     norm_path = to_posix_path(path)
     result = spec.match_file(norm_path)
     logger.debug(f"Checking ignore for path '{norm_path}': {result}")
@@ -49,3 +59,414 @@ def relpath_from_root(path: str, root: str) -> str:
     """
     rel = os.path.relpath(path, root)
     return to_posix_path(rel)
+
+
+class IgnoreMatcher:
+    """
+    Compiled, memoising ``.ragignore`` matcher.
+
+    Consecutive patterns with the same polarity are merged into one regex, so
+    a path is usually tested against one or two regexes instead of every
+    pattern; slash-free patterns are tested against the file name only, and
+    the result for each directory is cached. A path below an
+    ignored directory is ignored, whatever later negated patterns say.
+
+    Example:
+        >>> matcher = IgnoreMatcher.from_file(".ragignore", root_dir="./my_project")
+        >>> matcher.match("node_modules/react/index.js")
+        True
+    """
+
+    MAX_CACHED_DIRS = 65536
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        """
+        Compile gitignore-style patterns.
+
+        Args:
+            patterns (Iterable[str]): Pattern lines (blank lines and comments are skipped).
+        """
+        self.patterns: List[str] = list(patterns)
+        runs: List[Tuple[bool, List[str], List[str]]] = []
+        for line in self.patterns:
+            pattern = pathspec.patterns.GitWildMatchPattern(line)
+            if pattern.include is None:
+                continue
+            negated = line.startswith("!")
+            body = line[1:] if negated else line
+            by_name = "/" not in body.strip().rstrip("/")
+            if by_name:
+                # Slash-free patterns can match any path segment; parent directories are checked
+                # (and memoised) separately, so only the last segment needs testing. Anchoring the
+                # pattern avoids the unanchored "(?:.+/)?" prefix on every full path.
+                pattern = pathspec.patterns.GitWildMatchPattern(("!" if negated else "") + "/" + body)
+            # pathspec names a group in every regex; names must be unique in the combined one
+            source = "(?:" + pattern.regex.pattern.replace("(?P<ps_d>", "(?:") + ")"
+            if not runs or runs[-1][0] != pattern.include:
+                runs.append((pattern.include, [], []))
+            runs[-1][1 if by_name else 2].append(source)
+        # Later patterns win, so runs are tried last first
+        self._runs: List[Tuple[bool, Optional["re.Pattern"], Optional["re.Pattern"]]] = [
+            (include, re.compile("|".join(names)) if names else None, re.compile("|".join(paths)) if paths else None)
+            for include, names, paths in reversed(runs)
+        ]
+        self._dirs: Dict[str, bool] = {}
+
+    @classmethod
+    def from_file(cls, ignore_file: Optional[str] = None, root_dir: Optional[str] = None) -> "IgnoreMatcher":
+        """
+        Load and compile an ignore file (see :func:`load_ignore_patterns` for path handling).
+        """
+        if ignore_file is None:
+            ignore_file = ".ragignore"
+        if root_dir and not os.path.isabs(ignore_file):
+            ignore_file = os.path.join(root_dir, ignore_file)
+        if not os.path.exists(ignore_file):
+            return cls()
+        with open(ignore_file) as f:
+            return cls(f.read().splitlines())
+
+    def __bool__(self) -> bool:
+        return bool(self._runs)
+
+    def decide(self, path: str) -> Optional[bool]:
+        """
+        Return the verdict of the last matching pattern: True (ignored), False (negated) or None (no match).
+
+        Args:
+            path (str): Normalised relative path, with a trailing "/" for directories.
+        """
+        # Keep the trailing "/" on the last segment for dir-only patterns
+        name = path[path.rfind("/", 0, len(path) - 1) + 1:]
+        for include, names, paths in self._runs:
+            if (names is not None and names.match(name)) or (paths is not None and paths.match(path)):
+                return include
+        return None
+
+    def _match(self, path: str) -> bool:
+        return bool(self.decide(path))
+
+    def dir_ignored(self, rel_dir: str) -> bool:
+        """
+        Return whether a directory, or one of its parents, is ignored (memoised).
+
+        Args:
+            rel_dir (str): Root-relative POSIX directory path.
+        """
+        cached = self._dirs.get(rel_dir)
+        if cached is not None:
+            return cached
+        parent, _, _ = rel_dir.rpartition("/")
+        result = (bool(parent) and self.dir_ignored(parent)) or self._match(rel_dir + "/")
+        if len(self._dirs) >= self.MAX_CACHED_DIRS:
+            self._dirs.clear()
+        self._dirs[rel_dir] = result
+        return result
+
+    def match(self, path: str, is_dir: bool = False) -> bool:
+        """
+        Return whether a root-relative path is ignored.
+
+        Args:
+            path (str): Path relative to the project root.
+            is_dir (bool): The path is a directory (so directory-only patterns apply).
+        """
+        norm_path = to_posix_path(path)
+        if is_dir:
+            return self.dir_ignored(norm_path)
+        parent, _, _ = norm_path.rpartition("/")
+        if parent and self.dir_ignored(parent):
+            return True
+        return self._match(norm_path)
+
+
+class IgnoreRules:
+    """
+    Root and nested ``.ragignore`` files with gitignore-style scoping.
+
+    A ``.ragignore`` in a subdirectory applies to paths below it, relative to
+    that directory, and takes precedence over the files above it. Each
+    directory's file is compiled once, on first use, and cached until
+    :meth:`invalidate` is called for it. Has the same ``match`` and
+    ``dir_ignored`` interface as :class:`IgnoreMatcher`.
+
+    Example:
+        >>> rules = IgnoreRules("./my_project")
+        >>> rules.match("frontend/node_modules/react/index.js")
+        True
+    """
+
+    def __init__(self, root: str, ignore_file: Optional[str] = None):
+        """
+        Initialize the rules.
+
+        Args:
+            root (str): Project root.
+            ignore_file (Optional[str]): Root ignore file, relative to ``root`` (default ``.ragignore``).
+                Nested files use its base name.
+        """
+        self.root = root
+        self.ignore_file = to_posix_path(ignore_file or ".ragignore")
+        self.name = self.ignore_file.rpartition("/")[2]
+        self._specs: Dict[str, Optional[IgnoreMatcher]] = {}
+        self._dirs: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    def spec(self, rel_dir: str) -> Optional[IgnoreMatcher]:
+        """
+        Return the compiled ignore file of a directory ("" for the root), or None if it has none.
+        """
+        try:
+            return self._specs[rel_dir]
+        except KeyError:
+            pass
+        path = os.path.join(self.root, self.ignore_file if not rel_dir else os.path.join(rel_dir, self.name))
+        spec = (IgnoreMatcher.from_file(path) if os.path.isfile(path) else None) or None
+        with self._lock:
+            self._specs[rel_dir] = spec
+        return spec
+
+    def scope_of(self, rel_path: str) -> Optional[str]:
+        """
+        Return the directory whose rules a root-relative file defines, or None if it is not an ignore file.
+        """
+        if rel_path == self.ignore_file:
+            return ""
+        parent, _, name = rel_path.rpartition("/")
+        return parent if name == self.name else None
+
+    def invalidate(self, rel_dir: str) -> None:
+        """
+        Forget a directory's compiled ignore file (after it was created, changed or deleted).
+        """
+        with self._lock:
+            self._specs.pop(rel_dir, None)
+            self._dirs.clear()
+
+    def _decide(self, path: str, parent: str) -> bool:
+        # Deepest ignore file first; the first one with a matching pattern decides
+        while True:
+            spec = self.spec(parent)
+            if spec is not None:
+                verdict = spec.decide(path[len(parent) + 1:] if parent else path)
+                if verdict is not None:
+                    return verdict
+            if not parent:
+                return False
+            parent = parent.rpartition("/")[0]
+
+    def dir_ignored(self, rel_dir: str) -> bool:
+        """
+        Return whether a directory, or one of its parents, is ignored (memoised).
+        """
+        cached = self._dirs.get(rel_dir)
+        if cached is not None:
+            return cached
+        parent = rel_dir.rpartition("/")[0]
+        result = (bool(parent) and self.dir_ignored(parent)) or self._decide(rel_dir + "/", parent)
+        with self._lock:
+            if len(self._dirs) >= IgnoreMatcher.MAX_CACHED_DIRS:
+                self._dirs.clear()
+            self._dirs[rel_dir] = result
+        return result
+
+    def match(self, path: str, is_dir: bool = False) -> bool:
+        """
+        Return whether a root-relative path is ignored.
+        """
+        norm_path = to_posix_path(path)
+        if is_dir:
+            return self.dir_ignored(norm_path)
+        parent = norm_path.rpartition("/")[0]
+        if parent and self.dir_ignored(parent):
+            return True
+        return self._decide(norm_path, parent)
+
+
+def iter_tree(root: str, matcher: Union[IgnoreMatcher, IgnoreRules], start: str = "") -> Iterator[Tuple[str, os.DirEntry, bool]]:
+    """
+    Walk ``root`` with ``os.scandir``, pruning ignored directories.
+
+    Args:
+        root (str): Project root.
+        matcher (Union[IgnoreMatcher, IgnoreRules]): Compiled ignore patterns.
+        start (str): Root-relative directory to walk (default: the whole tree).
+
+    Yields:
+        Tuple[str, os.DirEntry, bool]: Root-relative path, directory entry and whether it is
+        ignored, for every file and for every ignored directory (whose contents are not listed).
+    """
+    stack = [start]
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            entries = os.scandir(os.path.join(root, rel_dir) if rel_dir else root)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if not is_dir:
+                    yield rel_path, entry, matcher.match(rel_path)
+                elif matcher.dir_ignored(rel_path):
+                    yield rel_path, entry, True
+                else:
+                    stack.append(rel_path)
+
+
+def scan_tree(root: str, matcher: Union[IgnoreMatcher, IgnoreRules], start: str = "") -> Tuple[Set[str], Set[str]]:
+    """
+    Split the files under ``root`` into included and ignored ones (see :func:`iter_tree`).
+
+    Args:
+        root (str): Project root.
+        matcher (Union[IgnoreMatcher, IgnoreRules]): Compiled ignore patterns.
+        start (str): Root-relative directory to scan (default: the whole tree).
+
+    Returns:
+        Tuple[Set[str], Set[str]]: Included file paths, and the ignored entries at which the walk
+        stopped (files, and directories with a trailing ``/`` whose contents were never listed).
+    """
+    included: Set[str] = set()
+    excluded: Set[str] = set()
+    for rel_path, entry, ignored in iter_tree(root, matcher, start):
+        if not ignored:
+            included.add(rel_path)
+        elif entry.is_dir(follow_symlinks=False):
+            excluded.add(rel_path + "/")
+        else:
+            excluded.add(rel_path)
+    return included, excluded
+
+
+def _pruned_entry(path: str, matcher: Union[IgnoreMatcher, IgnoreRules], is_dir: bool = False) -> str:
+    # The outermost ignored directory above an ignored path, as scan_tree would have recorded it
+    parts = path.split("/")
+    for i in range(1, len(parts)):
+        if matcher.dir_ignored("/".join(parts[:i])):
+            return "/".join(parts[:i]) + "/"
+    return path + "/" if is_dir else path
+
+
+def diff_ignore(root: str, included: Set[str], excluded: Set[str], matcher: Union[IgnoreMatcher, IgnoreRules], scope: str = "") -> Tuple[Set[str], Set[str], Set[str], Set[str]]:
+    """
+    Apply new ignore patterns to the result of :func:`scan_tree` without rescanning the tree.
+
+    Known included files are re-matched (directory results are memoised) and
+    only directories that stop being ignored are scanned.
+
+    Args:
+        root (str): Project root.
+        included (Set[str]): Included files from the previous scan.
+        excluded (Set[str]): Ignored entries from the previous scan.
+        matcher (Union[IgnoreMatcher, IgnoreRules]): The new patterns.
+        scope (str): Only re-check entries below this root-relative directory (default: all).
+
+    Returns:
+        Tuple[Set[str], Set[str], Set[str], Set[str]]: New included files, new ignored entries,
+        files that became ignored and files that are no longer ignored.
+    """
+    new_included: Set[str] = set()
+    new_excluded: Set[str] = set()
+    newly_ignored: Set[str] = set()
+    newly_included: Set[str] = set()
+    prefix = scope.rstrip("/") + "/" if scope else ""
+    for path in included:
+        if not path.startswith(prefix):
+            new_included.add(path)
+        elif matcher.match(path):
+            newly_ignored.add(path)
+            new_excluded.add(_pruned_entry(path, matcher))
+        else:
+            new_included.add(path)
+    for entry in excluded:
+        if not entry.startswith(prefix):
+            new_excluded.add(entry)
+        elif entry.endswith("/"):
+            rel_dir = entry[:-1]
+            if matcher.dir_ignored(rel_dir):
+                new_excluded.add(_pruned_entry(rel_dir, matcher, is_dir=True))
+                continue
+            files, pruned = scan_tree(root, matcher, rel_dir)
+            newly_included |= files
+            new_included |= files
+            new_excluded |= pruned
+        elif matcher.match(entry):
+            new_excluded.add(_pruned_entry(entry, matcher))
+        elif os.path.isfile(os.path.join(root, entry)):
+            newly_included.add(entry)
+            new_included.add(entry)
+    return new_included, new_excluded, newly_ignored, newly_included
+
+
+class IgnoreTree:
+    """
+    The watched tree's included and ignored files, kept current from file events.
+
+    Pattern changes are applied with :func:`diff_ignore`, so only directories
+    that stop being ignored are scanned again.
+
+    Example:
+        >>> tree = IgnoreTree("./my_project", IgnoreMatcher.from_file(".ragignore", "./my_project"))
+        >>> newly_ignored, newly_included = tree.reload(IgnoreMatcher(["*.log", "build/"]))
+    """
+
+    def __init__(self, root: str, matcher: Union[IgnoreMatcher, IgnoreRules]):
+        """
+        Scan the tree.
+
+        Args:
+            root (str): Project root.
+            matcher (Union[IgnoreMatcher, IgnoreRules]): Initial patterns.
+        """
+        self.root = root
+        self.matcher = matcher
+        self._lock = threading.Lock()
+        self.included, self.excluded = scan_tree(root, matcher)
+
+    def match(self, path: str) -> bool:
+        """
+        Return whether a root-relative file path is ignored by the current patterns.
+        """
+        return self.matcher.match(path)
+
+    def track(self, path: str, exists: bool) -> bool:
+        """
+        Record that a file was written (``exists``) or removed, and return whether it is ignored.
+
+        Args:
+            path (str): Root-relative POSIX file path.
+            exists (bool): The file exists after the event.
+        """
+        with self._lock:
+            ignored = self.matcher.match(path)
+            if not exists:
+                self.included.discard(path)
+                self.excluded.discard(path)
+            elif ignored:
+                self.included.discard(path)
+                self.excluded.add(_pruned_entry(path, self.matcher))
+            else:
+                self.included.add(path)
+            return ignored
+
+    def reload(self, matcher: Optional[Union[IgnoreMatcher, IgnoreRules]] = None, scope: str = "") -> Tuple[Set[str], Set[str]]:
+        """
+        Switch to new patterns, or re-apply the current rules after :meth:`IgnoreRules.invalidate`.
+
+        Args:
+            matcher (Optional[Union[IgnoreMatcher, IgnoreRules]]): The new patterns (default: keep the current rules).
+            scope (str): Only re-check entries below this root-relative directory (default: all).
+
+        Returns:
+            Tuple[Set[str], Set[str]]: Files that became ignored and files that are no longer ignored.
+        """
+        with self._lock:
+            matcher = matcher or self.matcher
+            self.included, self.excluded, newly_ignored, newly_included = diff_ignore(self.root, self.included, self.excluded, matcher, scope)
+            self.matcher = matcher
+            return newly_ignored, newly_included
@@ -1,11 +1,12 @@
 import time
 import os
 import threading
-import requests
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import logging
-from .ignore_utils import load_ignore_patterns, is_ignored, relpath_from_root
+from typing import Callable, Optional
+from .batcher import EventBatcher
+from .ignore_utils import IgnoreRules, IgnoreTree, is_ignored, relpath_from_root
 
 logger = logging.getLogger("ragms02.watcher")
 
@@ -19,30 +20,84 @@ class WatcherConfig:
 
     Args:
         path (str): Directory path to watch.
+        ignore_file (str): Ignore file, relative to ``path``.
+        api_url (Optional[str]): ``/ingest/notify`` URL (default ``RAGS_API_URL``).
+        project_id (Optional[str]): Project to ingest into (default ``RAGS_PROJECT_ID``).
+        debounce (float): Seconds a path must be quiet before its event is sent.
+        batch_size (int): Maximum events per request.
+        flush_interval (float): Seconds a ready event may wait for more to batch with.
 
     Example:
         >>> config = WatcherConfig(path="./data")
     """
-    def __init__(self, path: str = ".", ignore_file: str = ".ragignore"):
+    def __init__(self, path: str = ".", ignore_file: str = ".ragignore", api_url: Optional[str] = None, project_id: Optional[str] = None,
+                 debounce: float = 0.5, batch_size: int = 200, flush_interval: float = 1.0):
         self.path = os.path.abspath(path)
         self.ignore_file = ignore_file
+        self.api_url = api_url or RAGS_API_URL
+        self.project_id = project_id or PROJECT_ID
+        self.debounce = debounce
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
 
 class ChangeHandler(FileSystemEventHandler):
     """
-    Handles file system events and logs them.
+    Filters file system events through ``.ragignore`` and hands them to the event batcher.
     """
-    def __init__(self, watch_path, ignore_spec):
+    def __init__(self, watch_path, ignore_spec, batcher: Optional[EventBatcher] = None, on_ignore_change: Optional[Callable[[str], None]] = None):
         super().__init__()
         self.watch_path = watch_path
         self.ignore_spec = ignore_spec
+        self.batcher = batcher
+        self.on_ignore_change = on_ignore_change
+
+    def _check_ignore_file(self, rel_path: str) -> None:
+        if self.on_ignore_change is None or not isinstance(self.ignore_spec, IgnoreTree):
+            return
+        scope = self.ignore_spec.matcher.scope_of(rel_path) if isinstance(self.ignore_spec.matcher, IgnoreRules) else None
+        if scope is not None:
+            self.on_ignore_change(scope)
+
+    def _ignored(self, rel_path: str, exists: bool) -> bool:
+        if isinstance(self.ignore_spec, IgnoreTree):
+            # Keep the tree's file sets current so a later .ragignore change can be diffed against them
+            return self.ignore_spec.track(rel_path, exists)
+        return is_ignored(rel_path, self.ignore_spec)
 
     def on_any_event(self, event):
+        if event.is_directory:
+            # Files inside created, moved or deleted directories get their own events
+            return
+        if event.event_type not in ("created", "modified", "closed", "deleted", "moved"):
+            return
         rel_path = relpath_from_root(event.src_path, self.watch_path)
-        ignore_status = is_ignored(rel_path, self.ignore_spec)
-        logger.debug(f"EVENT CHECK: rel_path='{rel_path}' ignore_status={ignore_status}")
-        if ignore_status:
+        # A changed .ragignore re-scopes the tree before the event itself is handled
+        self._check_ignore_file(rel_path)
+        if event.event_type == "moved":
+            self._check_ignore_file(relpath_from_root(event.dest_path, self.watch_path))
+        ignored = self._ignored(rel_path, event.event_type not in ("deleted", "moved"))
+        if event.event_type == "moved":
+            dest_path = relpath_from_root(event.dest_path, self.watch_path)
+            dest_ignored = self._ignored(dest_path, True)
+            if ignored and dest_ignored:
+                return
+            logger.debug("Event: moved - %s -> %s", rel_path, dest_path)
+            if self.batcher is not None:
+                if ignored:
+                    # e.g. an ignored temp file renamed over a tracked file
+                    self.batcher.add("modified", dest_path)
+                elif dest_ignored:
+                    self.batcher.add("deleted", rel_path)
+                else:
+                    self.batcher.add("moved", rel_path, dest_path)
             return
-        logger.info(f"Event: {event.event_type} - {event.src_path}")
+        if ignored:
+            return
+        # inotify reports the end of a write as "closed"; treat it as a modification
+        event_type = "modified" if event.event_type == "closed" else event.event_type
+        logger.debug("Event: %s - %s", event_type, rel_path)
+        if self.batcher is not None:
+            self.batcher.add(event_type, rel_path)
 
 class FileWatcher:
     """
@@ -62,72 +117,49 @@ class FileWatcher:
         """
         self.config = config
         self.observer = Observer()
-        self.ignore_spec = load_ignore_patterns(ignore_file=self.config.ignore_file, root_dir=self.config.path)
-        self._ragignore_mtime = self._get_ragignore_mtime()
+        # Root and nested ignore files, compiled per directory on first use
+        self.ignore_spec = IgnoreRules(self.config.path, self.config.ignore_file)
         self._stop_event = threading.Event()
-        self._prev_ignored = self._get_ignored_set(self.ignore_spec)
-
-    def _get_ignored_set(self, ignore_spec):
-        ignored = set()
-        for root, dirs, files in os.walk(self.config.path):
-            for file in files:
-                abs_path = os.path.join(root, file)
-                rel_path = relpath_from_root(abs_path, self.config.path)
-                # Add debug logging for rel_path and ignore status
-                ignore_status = is_ignored(rel_path, ignore_spec)
-                logger.debug(f"CHECK: rel_path='{rel_path}' ignore_status={ignore_status}")
-                if ignore_status:
-                    logger.debug(f"IGNORED (pattern match): {rel_path}")
-                    ignored.add(rel_path)
-                else:
-                    logger.debug(f"NOT IGNORED: {rel_path}")
-        return ignored
-
-    def _get_ragignore_mtime(self):
-        ragignore_path = os.path.join(self.config.path, self.config.ignore_file)
-        return os.path.getmtime(ragignore_path) if os.path.exists(ragignore_path) else None
-
-    def _monitor_ragignore(self):
-        while not self._stop_event.is_set():
-            time.sleep(2)
-            mtime = self._get_ragignore_mtime()
-            if mtime != self._ragignore_mtime:
-                logger.info("Detected .ragignore change. Reloading ignore patterns and sending delete events.")
-                prev_ignored = self._prev_ignored  # snapshot before reload
-                new_spec = load_ignore_patterns(ignore_file=self.config.ignore_file, root_dir=self.config.path)
-                new_ignored = self._get_ignored_set(new_spec)
-                newly_ignored = new_ignored - prev_ignored
-                self.ignore_spec = new_spec
-                self._ragignore_mtime = mtime
-                self._send_delete_for_ignored(newly_ignored)
-                self._prev_ignored = new_ignored
-
-    def _send_delete_for_ignored(self, ignored_set=None):
-        events = []
-        if ignored_set is None:
-            ignored_set = self._get_ignored_set(self.ignore_spec)
+        # One pruned scandir walk; later pattern changes are diffed against it
+        self.ignore_tree = IgnoreTree(self.config.path, self.ignore_spec)
+        self.batcher = EventBatcher(
+            self.config.api_url,
+            self.config.project_id,
+            self.config.path,
+            debounce=self.config.debounce,
+            batch_size=self.config.batch_size,
+            flush_interval=self.config.flush_interval,
+        )
+
+    def _on_ignore_change(self, scope: str):
+        """
+        Re-apply the ignore rules below ``scope`` after its ignore file was created, changed or deleted.
+
+        Files that became ignored are deleted from the index; files that are no longer
+        ignored are ingested.
+        """
+        logger.info("Ignore file changed in '%s'; re-applying ignore patterns.", scope or ".")
+        self.ignore_spec.invalidate(scope)
+        newly_ignored, newly_included = self.ignore_tree.reload(scope=scope)
+        self._send_delete_for_ignored(newly_ignored)
+        for rel_path in newly_included:
+            logger.info(f"Queueing ingest for no longer ignored file: {rel_path}")
+            self.batcher.add("created", rel_path)
+
+    def _send_delete_for_ignored(self, ignored_set):
         for rel_path in ignored_set:
-            logger.info(f"Sending delete event for: {rel_path}")
-            events.append({"path": rel_path, "event_type": "deleted"})
-        if events:
-            payload = {"project_id": PROJECT_ID, "events": events}
-            try:
-                resp = requests.post(RAGS_API_URL, json=payload)
-                logger.info(f"Sent delete events for ignored files. Status: {resp.status_code}")
-            except Exception as e:
-                logger.error(f"Failed to send delete events: {e}")
+            logger.info(f"Queueing delete event for: {rel_path}")
+            self.batcher.add("deleted", rel_path)
 
     def start(self):
         """
         Start watching the configured directory for file changes.
         """
-        event_handler = ChangeHandler(self.config.path, self.ignore_spec)
+        event_handler = ChangeHandler(self.config.path, self.ignore_tree, self.batcher, self._on_ignore_change)
         self.observer.schedule(event_handler, self.config.path, recursive=True)
+        self.batcher.start()
         self.observer.start()
         logger.info(f"Started watching: {self.config.path}")
-        # Start .ragignore monitor thread
-        monitor_thread = threading.Thread(target=self._monitor_ragignore, daemon=True)
-        monitor_thread.start()
         try:
             while not self._stop_event.is_set():
                 time.sleep(1)
@@ -136,6 +168,8 @@ class FileWatcher:
             self.observer.stop()
         self.observer.stop()
         self.observer.join()
+        # Deliver whatever is still pending before exiting
+        self.batcher.stop()
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
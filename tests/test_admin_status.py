@@ -20,7 +20,7 @@ def test_list_projects():
 
 def test_list_project_sources():
     # Insert a dummy project and source for test
-    client.post("/ingest/notify", json={
+    client.post("/ingest/notify?wait=true", json={
         "project_id": "test-proj",
         "events": [{"path": "src/test.py", "event_type": "created", "timestamp": "2025-06-24T12:34:56Z", "content": "print('hi')"}]
     })
@@ -36,7 +36,12 @@ def test_get_logs():
     assert "logs" in data
 
 def test_get_metrics():
+    client.get("/status")
     response = client.get("/metrics")
     assert response.status_code == 200
-    data = response.json()
-    assert "metrics" in data
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert "# TYPE ragms02_stage_seconds histogram" in body
+    assert 'ragms02_requests_total{method="GET",route="/status",status="200"}' in body
+    assert "ragms02_documents " in body
+    assert "ragms02_db_size_bytes " in body
@@ -0,0 +1,105 @@
+import numpy as np
+from langchain.schema import Document
+from ragms02.vectorstore.ann import IVFIndex
+from ragms02.vectorstore.index import MatrixIndex
+from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
+
+
+def _clustered(n, dim=16, centers=20, seed=0):
+    rng = np.random.default_rng(seed)
+    means = rng.normal(size=(centers, dim))
+    return (means[rng.integers(centers, size=n)] + 0.1 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def test_ivf_recall_against_exact():
+    vectors = _clustered(3000)
+    ids = [f"doc{i}" for i in range(len(vectors))]
+    exact = MatrixIndex()
+    exact.add(ids, vectors)
+    ivf = IVFIndex(nprobe=8, train_threshold=1000)
+    ivf.add(ids, vectors)
+    assert ivf.is_trained
+    queries = _clustered(20, seed=1)
+    hits = sum(
+        len({i for i, _ in ivf.search(q, k=10)} & {i for i, _ in exact.search(q, k=10)})
+        for q in queries
+    )
+    assert hits / (10 * len(queries)) > 0.9
+
+
+def test_ivf_remove_and_rebuild():
+    vectors = _clustered(2000)
+    ids = [f"doc{i}" for i in range(len(vectors))]
+    ivf = IVFIndex(train_threshold=500)
+    ivf.add(ids[:600], vectors[:600])
+    ivf.add(ids[600:], vectors[600:])
+    assert ivf.needs_rebuild()
+    ivf.rebuild()
+    assert not ivf.needs_rebuild()
+    assert ivf.remove(["doc0", "doc0"]) == 1
+    assert len(ivf) == 1999 and "doc0" not in ivf
+
+
+def test_store_persists_ivf_index(tmp_path):
+    db_path = str(tmp_path / "rag.db")
+    vectors = _clustered(600)
+    docs = [Document(page_content=f"chunk {i}", metadata={"id": f"doc{i}"}) for i in range(len(vectors))]
+    params = {"train_threshold": 200, "nprobe": 4}
+    store = SQLiteLangChainVectorStore(db_path, use_index=True, index_backend="ivf", index_params=params)
+    store.add_documents(docs, vectors, project_id="p1")
+    assert store.get_index("p1").is_trained
+    store.close()
+    path = store.index_path("p1")
+    assert path.startswith(db_path)
+
+    store = SQLiteLangChainVectorStore(db_path, use_index=True, index_backend="ivf", index_params=params)
+    results = store.similarity_search("", k=1, filter={"embedding": vectors[5], "project_id": "p1"})
+    assert results[0].metadata["id"] == "doc5"
+    assert store.delete_file("p1", "missing") == 0
+    store.delete(["doc5"])
+    store.close()
+
+    store = SQLiteLangChainVectorStore(db_path, use_index=True, index_backend="ivf", index_params=params)
+    assert "doc5" not in store.get_index("p1")
+    store.close()
+
+
+def test_persisted_index_detects_replaced_rows(tmp_path):
+    db_path = str(tmp_path / "rag.db")
+    params = {"train_threshold": 2, "nprobe": 4}
+    store = SQLiteLangChainVectorStore(db_path, use_index=True, index_backend="ivf", index_params=params)
+    docs = [Document(page_content=f"chunk {i}", metadata={"id": f"f::chunk{i}"}) for i in range(3)]
+    store.add_documents(docs, [[1, 0], [0, 1], [1, 1]], project_id="p1")
+    store.get_index("p1")
+    store.close()
+
+    # Replace the last row without the index loaded; SQLite reuses its rowid
+    store = SQLiteLangChainVectorStore(db_path)
+    store.apply_file_diff("p1", [Document(page_content="new", metadata={"id": "f::chunk3"})], [[1, 1]], ["f::chunk2"])
+    store.close()
+
+    store = SQLiteLangChainVectorStore(db_path, use_index=True, index_backend="ivf", index_params=params)
+    results = store.similarity_search("", k=1, filter={"embedding": [1, 1], "project_id": "p1"})
+    assert [(doc.metadata["id"], doc.page_content) for doc in results] == [("f::chunk3", "new")]
+    store.close()
+
+
+def test_persisted_index_of_emptied_project(tmp_path):
+    db_path = str(tmp_path / "rag.db")
+    params = {"train_threshold": 2, "nprobe": 4}
+    store = SQLiteLangChainVectorStore(db_path, use_index=True, index_backend="ivf", index_params=params)
+    docs = [Document(page_content=f"chunk {i}", metadata={"id": f"f::chunk{i}", "file_path": "f"}) for i in range(3)]
+    store.add_documents(docs, [[1, 0], [0, 1], [1, 1]], project_id="p1")
+    assert store.get_index("p1").is_trained
+    store.close()
+
+    # Every row is deleted while the saved index is not loaded, leaving it stale
+    store = SQLiteLangChainVectorStore(db_path)
+    assert store.delete_file("p1", "f") == 3
+    store.close()
+
+    store = SQLiteLangChainVectorStore(db_path, use_index=True, index_backend="ivf", index_params=params)
+    assert store.similarity_search("", k=1, filter={"embedding": [1, 1], "project_id": "p1"}) == []
+    store.add_documents([Document(page_content="again", metadata={"id": "g::chunk0"})], [[1, 1]], project_id="p1")
+    assert [doc.page_content for doc in store.similarity_search("", k=1, filter={"embedding": [1, 1], "project_id": "p1"})] == ["again"]
+    store.close()
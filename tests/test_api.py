@@ -26,8 +26,16 @@ def test_ingest_notify():
         ]
     }
     response = client.post("/ingest/notify", json=payload)
-    assert response.status_code == 200
-    assert response.json()["status"] == "success"
+    assert response.status_code == 202
+    data = response.json()
+    assert data["status"] == "queued"
+    job = client.get(f"/ingest/jobs/{data['job_id']}")
+    assert job.status_code == 200
+    assert job.json()["total"] == 1
+
+def test_ingest_job_not_found():
+    response = client.get("/ingest/jobs/does-not-exist")
+    assert response.status_code == 404
 
 def test_ingest_notify_multiple_chunks():
     payload = {
@@ -41,6 +49,7 @@ def test_ingest_notify_multiple_chunks():
             }
         ]
     }
-    response = client.post("/ingest/notify", json=payload)
+    response = client.post("/ingest/notify?wait=true", json=payload)
     assert response.status_code == 200
+    assert response.json()["status"] == "success"
     assert response.json()["processed"] > 1
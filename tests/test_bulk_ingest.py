@@ -0,0 +1,79 @@
+import os
+from ragms02.__main__ import main
+from ragms02.ingestion.bulk import bulk_ingest, walk_files
+from ragms02.vectorstore.embedding import HashingEmbedder
+from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
+
+
+def _tree(root):
+    os.makedirs(root / "src" / "pkg")
+    os.makedirs(root / "build")
+    (root / ".ragignore").write_text("build/\n*.log\n")
+    for i in range(12):
+        (root / "src" / "pkg" / f"mod{i}.py").write_text(f"def fn_{i}():\n    return {i}\n" * 30)
+    (root / "README.md").write_text("# Project\n\nSome documentation.\n")
+    (root / "build" / "out.py").write_text("generated = True\n")
+    (root / "debug.log").write_text("noise\n")
+    (root / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\n\0\0\0\rIHDR" + bytes(64))
+
+
+def _paths(store, project_id):
+    with store.reader() as conn:
+        return {row[0] for row in conn.execute("SELECT DISTINCT file_path FROM vectors WHERE project_id=?", (project_id,))}
+
+
+def test_walk_prunes_ignored_directories(tmp_path):
+    _tree(tmp_path)
+    paths = {rel for rel, _, _ in walk_files(str(tmp_path))}
+    assert "src/pkg/mod0.py" in paths and "logo.png" in paths
+    assert not any(p.startswith("build/") or p.endswith(".log") for p in paths)
+
+
+def test_bulk_ingest_skips_binaries_and_unchanged_files(tmp_path):
+    root = tmp_path / "proj"
+    _tree(root)
+    store = SQLiteLangChainVectorStore(str(tmp_path / "rag.db"))
+    embedder = HashingEmbedder()
+
+    stats = bulk_ingest(store, embedder, str(root), "p1", workers=2, executor="thread", batch_size=16)
+    assert stats["ingested"] == 14 and stats["binary"] == 1
+    assert stats["chunks"] == stats["added"] > 0
+    assert stats["files_per_s"] > 0 and stats["chunks_per_s"] > 0
+    assert _paths(store, "p1") == {f"src/pkg/mod{i}.py" for i in range(12)} | {"README.md", ".ragignore"}
+
+    again = bulk_ingest(store, embedder, str(root), "p1", workers=2, executor="thread")
+    assert again["read"] == 0 and again["unchanged"] == 15 and again["added"] == 0
+
+    # Touched but identical content is re-read and recognised by hash; a real edit is re-synced
+    os.utime(root / "README.md", ns=(1, 1))
+    (root / "src" / "pkg" / "mod0.py").write_text("def changed():\n    return 0\n")
+    os.remove(root / "src" / "pkg" / "mod1.py")
+    third = bulk_ingest(store, embedder, str(root), "p1", workers=2, executor="thread", prune=True)
+    assert third["read"] == 2 and third["ingested"] == 1 and third["deleted"] == 1
+    assert third["added"] == 1 and third["removed"] > 0
+    assert "src/pkg/mod1.py" not in _paths(store, "p1")
+
+    # A file grown past the size limit loses its stored chunks, even without prune
+    (root / "README.md").write_text("# Project\n" * 200)
+    fourth = bulk_ingest(store, embedder, str(root), "p1", workers=2, executor="thread", max_file_size=1024)
+    assert fourth["skipped"] == 1 and fourth["deleted"] == 1
+    assert "README.md" not in _paths(store, "p1") and store.file_state("p1", "README.md") is None
+    store.close()
+
+
+def test_ingest_cli_uses_process_pool(tmp_path, capsys, monkeypatch):
+    monkeypatch.setenv("RAGMS02_EMBEDDER", "hashing")
+    root = tmp_path / "proj"
+    _tree(root)
+    db_path = str(tmp_path / "rag.db")
+    assert main(["ingest", str(root), "--db", db_path, "--workers", "2"]) == 0
+    out = capsys.readouterr().out
+    assert "proj: 15 files (14 ingested" in out and "files/s" in out and "chunks/s" in out
+    store = SQLiteLangChainVectorStore(db_path)
+    assert "README.md" in _paths(store, "proj")
+    store.close()
+
+
+def test_ingest_cli_requires_a_database(tmp_path, monkeypatch):
+    monkeypatch.delenv("RAGMS02_VECTOR_DB", raising=False)
+    assert main(["ingest", str(tmp_path)]) == 2
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
+
+
+def test_add_embeddings_writes_parallel_arrays(tmp_path):
+    store = SQLiteLangChainVectorStore(str(tmp_path / "rag.db"), use_index=True)
+    n = 20000
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, 16)).astype(np.float32)
+    ids = [f"f{i // 100}.py::chunk{i % 100}" for i in range(n)]
+    contents = [f"chunk {i}" for i in range(n)]
+    store.get_index("p1")
+    assert store.add_embeddings(ids, contents, vectors, project_id="p1", file_paths=[i.split("::")[0] for i in ids], commit_every=5000) == n
+    with store.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM vectors WHERE project_id='p1'").fetchone()[0] == n
+        blob, file_path = conn.execute("SELECT embedding, file_path FROM vectors WHERE id=?", (ids[123],)).fetchone()
+    assert np.array_equal(np.frombuffer(blob, dtype=np.float32), vectors[123]) and file_path == "f1.py"
+    assert len(store.get_index("p1")) == n
+    results = store.similarity_search("", k=1, filter={"embedding": vectors[42], "project_id": "p1"})
+    assert results[0].metadata["id"] == ids[42]
+    store.close()
+
+
+def test_add_embeddings_in_enclosing_writer_is_one_transaction():
+    store = SQLiteLangChainVectorStore(":memory:")
+    with pytest.raises(RuntimeError):
+        with store.writer():
+            store.add_embeddings(["a", "b"], ["x", "y"], np.eye(2), project_id="p1", commit_every=1)
+            raise RuntimeError("abort")
+    with store.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0] == 0
+    with pytest.raises(ValueError):
+        store.add_embeddings(["a"], ["x", "y"], np.eye(2))
+    store.close()
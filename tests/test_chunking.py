@@ -0,0 +1,31 @@
+from ragms02.ingestion.pipeline import chunk_text
+
+
+def test_chunk_text_empty_input():
+    assert chunk_text("") == []
+    assert chunk_text("\n  \n\n") == []
+
+
+def test_chunk_text_keeps_indentation_and_respects_size():
+    text = "".join(f"def func_{i}(x):\n    return x * {i}\n\n" for i in range(100))
+    chunks = chunk_text(text, size=200, overlap=40)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    assert chunk_text("    x = 1\n    y = 2\n") == ["    x = 1\n    y = 2"]
+    assert all(not chunk.startswith("\n") and chunk == chunk.rstrip() for chunk in chunks)
+
+
+def test_chunk_text_overlap_repeats_trailing_lines():
+    lines = [f"value_{i} = {i}\n" for i in range(200)]
+    chunks = chunk_text("".join(lines), size=200, overlap=40)
+    for prev, cur in zip(chunks, chunks[1:]):
+        # Each chunk starts with the trailing lines of the previous one
+        assert prev.splitlines()[-1] in cur.splitlines()
+        assert cur.splitlines()[0] in prev.splitlines()
+
+
+def test_chunk_text_splits_long_lines():
+    chunks = chunk_text("x" * 1000 + "\nshort line\n", size=300, overlap=50)
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert "".join(chunks).count("x") >= 1000
+    assert chunks[-1].endswith("short line")
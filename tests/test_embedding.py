@@ -1,4 +1,7 @@
-from ragms02.vectorstore.embedding import embed_text
+import numpy as np
+from langchain.schema import Document
+from ragms02.vectorstore.embedding import HashingEmbedder, embed_text, get_embedder
+from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
 
 def test_embed_text_returns_vector():
     vec = embed_text("hello world")
@@ -11,3 +14,26 @@ def test_embed_text_returns_vector():
     # Different for different input
     vec3 = embed_text("goodbye")
     assert vec != vec3
+
+def test_hashing_embedder_batch_matches_single():
+    embedder = get_embedder("hashing")
+    assert isinstance(embedder, HashingEmbedder)
+    texts = ["def parse_config(path):", "", "class Bar: pass"]
+    matrix = embedder.embed_batch(texts)
+    assert matrix.shape == (3, 384) and matrix.dtype == np.float32
+    assert np.allclose(matrix[0], embedder.embed(texts[0]))
+    assert np.isclose(np.linalg.norm(matrix[0]), 1.0, atol=1e-5)
+    assert not matrix[1].any()
+    # Shared identifiers score higher than unrelated text
+    q = embedder.embed("parse_config")
+    assert matrix[0] @ q > matrix[2] @ q
+
+def test_store_reembeds_rows_when_embedder_changes():
+    store = SQLiteLangChainVectorStore(":memory:", use_index=True)
+    store.add_documents([Document(page_content="def parse_config(path):", metadata={"id": "a::chunk0"})], [[0.5] * 384], project_id="p1")
+    embedder = HashingEmbedder()
+    assert store.sync_embedder(embedder) == 1
+    assert store.sync_embedder(embedder) == 0
+    results = store.similarity_search("", k=1, filter={"embedding": embedder.embed("parse_config"), "project_id": "p1"})
+    assert results[0].metadata["score"] > 0.5
+    store.close()
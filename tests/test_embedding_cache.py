@@ -0,0 +1,59 @@
+import numpy as np
+from ragms02.ingestion.pipeline import chunk_text
+from ragms02.vectorstore.embedding import HashingEmbedder
+from ragms02.vectorstore.embedding_cache import CachedEmbedder, EmbeddingCache
+
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__()
+        self.embedded = 0
+
+    def embed_batch(self, texts):
+        self.embedded += len(texts)
+        return super().embed_batch(texts)
+
+
+def test_reembedding_after_small_edit_only_embeds_changed_chunks(tmp_path):
+    lines = [f"line {i}: value_{i} = compute({i})" for i in range(2000)]
+    base = CountingEmbedder()
+    embedder = CachedEmbedder(base, EmbeddingCache(str(tmp_path / "cache.db")))
+    first = chunk_text("\n".join(lines))
+    matrix = embedder.embed_batch(first)
+    assert base.embedded == len(first)
+    assert np.allclose(matrix, base.embed_batch(first))
+
+    lines[1000] = "line 1000: changed"
+    base.embedded = 0
+    second = chunk_text("\n".join(lines))
+    embedder.embed_batch(second)
+    assert 0 < base.embedded <= 2
+    stats = embedder.cache.stats()
+    assert stats["hits"] >= len(second) - 2
+    embedder.close()
+
+    # Cache survives a restart
+    reopened = CachedEmbedder(CountingEmbedder(), EmbeddingCache(str(tmp_path / "cache.db")))
+    reopened.embed_batch(second)
+    assert reopened.embedder.embedded == 0
+    reopened.close()
+
+
+def test_cache_evicts_least_recently_used():
+    cache = EmbeddingCache(max_entries=10)
+    cache.put_many("e", {f"h{i}": np.zeros(4) for i in range(10)})
+    cache.get_many("e", ["h0"])
+    cache.put_many("e", {"h10": np.zeros(4)})
+    assert len(cache) == 9
+    assert "h0" in cache.get_many("e", ["h0"])
+    assert cache.get_many("e", ["h1"]) == {}
+
+
+def test_lookups_defer_recency_writes():
+    cache = EmbeddingCache(max_entries=10, touch_batch=3)
+    cache.put_many("e", {f"h{i}": np.zeros(4) for i in range(10)})
+    cache.get_many("e", ["h0"])
+    assert cache.conn.in_transaction is False
+    assert len(cache._touched) == 1
+    cache.get_many("e", ["h1", "h2"])
+    assert cache._touched == {}
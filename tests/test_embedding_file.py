@@ -0,0 +1,98 @@
+import os
+from unittest import mock
+import numpy as np
+import pytest
+from ragms02.vectorstore.embedding_file import EmbeddingFile
+from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
+
+
+def test_embedding_file_appends_and_reopens(tmp_path):
+    path = str(tmp_path / "vecs")
+    emb = EmbeddingFile(path, dtype="float16")
+    vectors = np.random.default_rng(0).standard_normal((10, 8)).astype(np.float32)
+    assert emb.append(vectors[:4]) == 0
+    assert emb.append(vectors[4:]) == 4
+    assert len(emb) == 10
+    assert np.allclose(emb.rows([7, 2]), vectors[[7, 2]], atol=1e-2)
+    with pytest.raises(ValueError):
+        emb.append(np.zeros((1, 3)))
+    emb.close()
+    reopened = EmbeddingFile(path)
+    assert reopened.dtype == np.float16 and reopened.dim == 8 and len(reopened) == 10
+    reopened.close()
+
+
+def test_mmap_store_search_compaction_and_migration(tmp_path):
+    db = str(tmp_path / "rag.db")
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((50, 16)).astype(np.float32)
+    ids = [f"doc{i}" for i in range(50)]
+    store = SQLiteLangChainVectorStore(db)
+    store.add_embeddings(ids, [f"text {i}" for i in ids], vectors, project_id="p1")
+    store.close()
+
+    # Existing BLOB rows move into the embedding file when the store is reopened in mmap mode
+    store = SQLiteLangChainVectorStore(db, embedding_storage="mmap")
+    with store.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM vectors WHERE embedding IS NULL AND vec_row IS NOT NULL").fetchone()[0] == 50
+    hit = store.similarity_search("", k=3, filter={"embedding": vectors[17], "project_id": "p1"})
+    assert hit[0].metadata["id"] == "doc17" and hit[0].page_content == "text doc17"
+    assert hit[0].metadata["score"] == pytest.approx(1.0, abs=1e-4)
+
+    # Replacing rows appends; compaction reclaims the old rows and keeps results stable
+    store.add_embeddings(ids[:10], [f"new {i}" for i in ids[:10]], vectors[:10] * 2, project_id="p1")
+    store.delete(ids[40:])
+    assert len(store.embedding_file) == 60
+    assert store.compact_embeddings() == 20
+    assert len(store.embedding_file) == 40
+    for i in (3, 25):
+        assert store.similarity_search("", k=1, filter={"embedding": vectors[i], "project_id": "p1"})[0].metadata["id"] == ids[i]
+    ids_, loaded = store._load_vectors("p1")
+    assert np.allclose(loaded[ids_.index("doc25")], vectors[25])
+    store.close()
+
+    # And back to BLOBs
+    store = SQLiteLangChainVectorStore(db)
+    with store.reader() as conn:
+        blob = conn.execute("SELECT embedding FROM vectors WHERE id='doc25'").fetchone()[0]
+    assert np.allclose(np.frombuffer(blob, dtype=np.float32), vectors[25])
+    store.close()
+
+
+def test_mmap_storage_needs_file_database():
+    with pytest.raises(ValueError):
+        SQLiteLangChainVectorStore(":memory:", embedding_storage="mmap")
+
+
+def test_compaction_commits_row_numbers_before_the_swap(tmp_path):
+    db = str(tmp_path / "rag.db")
+    vectors = np.random.default_rng(2).standard_normal((30, 16)).astype(np.float32)
+    ids = [f"doc{i}" for i in range(30)]
+    store = SQLiteLangChainVectorStore(db, embedding_storage="mmap")
+    store.add_embeddings(ids, ids, vectors, project_id="p1")
+    other = SQLiteLangChainVectorStore(db, embedding_storage="mmap")
+    assert other.similarity_search("", k=1, filter={"embedding": vectors[20], "project_id": "p1"})[0].metadata["id"] == "doc20"
+
+    # The process stops after the new row numbers are committed but before the file is swapped
+    store.delete(ids[:10])
+    with mock.patch.object(EmbeddingFile, "replace", side_effect=KeyboardInterrupt):
+        with pytest.raises(KeyboardInterrupt):
+            store.compact_embeddings()
+    assert os.path.exists(store.embedding_file.compact_path)
+    store.close()
+
+    store = SQLiteLangChainVectorStore(db, embedding_storage="mmap")
+    assert not os.path.exists(store.embedding_file.compact_path) and len(store.embedding_file) == 20
+    for reader in (store, other):
+        # The other process still mapped the old file; it picks up the new one
+        assert reader.similarity_search("", k=1, filter={"embedding": vectors[20], "project_id": "p1"})[0].metadata["id"] == "doc20"
+
+    # A copy left by a compaction that stopped before its commit is discarded
+    store.close()
+    with open(f"{db}.vectors.compact", "wb") as f:
+        f.write(b"partial")
+    store = SQLiteLangChainVectorStore(db, embedding_storage="mmap")
+    assert not os.path.exists(store.embedding_file.compact_path) and len(store.embedding_file) == 20
+    assert store.similarity_search("", k=1, filter={"embedding": vectors[25], "project_id": "p1"})[0].metadata["id"] == "doc25"
+    store.close()
+    other.close()
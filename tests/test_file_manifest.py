@@ -0,0 +1,91 @@
+import os
+import sqlite3
+from unittest import mock
+from ragms02.ingestion import pipeline
+from ragms02.ingestion.jobs import IngestJobQueue
+from ragms02.ingestion.pipeline import apply_event, file_hash, load_event
+from ragms02.vectorstore.embedding import HashingEmbedder
+from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
+
+TEXT = "".join(f"def step_{i}(state):\n    return state + {i}\n" for i in range(80))
+
+
+def test_unchanged_events_are_not_rechunked(tmp_path):
+    store = SQLiteLangChainVectorStore(":memory:")
+    jobs = IngestJobQueue(store, HashingEmbedder(), workers=2)
+    jobs.start()
+    on_disk = tmp_path / "disk.py"
+    on_disk.write_text(TEXT)
+    events = [{"path": "sent.py", "event_type": "created", "content": TEXT}, {"path": str(on_disk), "event_type": "created"}]
+    first = jobs.wait(jobs.submit("p1", events), timeout=10)
+    assert first["added"] > 0
+    state = store.file_state("p1", str(on_disk))
+    assert state["hash"] == file_hash(TEXT.encode()) and state["mtime_ns"] == on_disk.stat().st_mtime_ns
+    assert store.file_state("p1", "sent.py")["chunks"] == state["chunks"] > 1
+
+    with mock.patch.object(pipeline, "chunk_text", wraps=pipeline.chunk_text) as chunk_text:
+        # Same content sent again, a client hash alone, and a touched but identical file on disk
+        os.utime(on_disk, ns=(1, 1))
+        again = [
+            {"path": "sent.py", "event_type": "modified", "content": TEXT},
+            {"path": "sent.py", "event_type": "modified", "hash": state["hash"]},
+            {"path": str(on_disk), "event_type": "modified"},
+        ]
+        job = jobs.wait(jobs.submit("p1", again), timeout=10)
+        assert job["status"] == "completed" and job["added"] == job["removed"] == 0
+        assert job["unchanged"] == 3 * state["chunks"]
+        assert chunk_text.call_count == 0
+        assert store.file_state("p1", str(on_disk))["mtime_ns"] == 1
+
+        on_disk.write_text(TEXT + "# edited\n")
+        job = jobs.wait(jobs.submit("p1", [{"path": str(on_disk), "event_type": "modified"}]), timeout=10)
+        assert job["added"] == 1 and chunk_text.call_count == 1
+    assert store.file_state("p1", str(on_disk))["hash"] == file_hash((TEXT + "# edited\n").encode())
+    jobs.stop()
+    store.close()
+
+
+def test_shortcut_is_rechecked_under_the_writer_lock():
+    store = SQLiteLangChainVectorStore(":memory:")
+    embedder = HashingEmbedder()
+    apply_event(store, embedder, "p1", load_event({"path": "a.py", "event_type": "created", "content": TEXT}))
+    # Prepared while the manifest still matched, applied after another event changed the file
+    stale = load_event({"path": "a.py", "event_type": "modified", "content": TEXT, "stored": store.file_state("p1", "a.py")})
+    assert stale["unchanged"] and stale["chunks"] is None
+    apply_event(store, embedder, "p1", load_event({"path": "a.py", "event_type": "modified", "content": "other = 1\n"}))
+    counts = apply_event(store, embedder, "p1", stale)
+    assert counts["added"] > 0 and store.file_state("p1", "a.py")["hash"] == file_hash(TEXT.encode())
+    store.close()
+
+
+def test_manifest_follows_moves_and_deletes():
+    store = SQLiteLangChainVectorStore(":memory:")
+    embedder = HashingEmbedder()
+    apply_event(store, embedder, "p1", load_event({"path": "a.py", "event_type": "created", "content": TEXT}))
+    state = store.file_state("p1", "a.py")
+    apply_event(store, embedder, "p1", load_event({"path": "b.py", "old_path": "a.py", "event_type": "moved"}))
+    assert store.file_state("p1", "a.py") is None and store.file_state("p1", "b.py") == state
+    apply_event(store, embedder, "p1", load_event({"path": "b.py", "event_type": "deleted"}))
+    assert store.file_manifest("p1") == {}
+    store.close()
+
+
+def test_legacy_ingest_manifest_is_migrated(tmp_path):
+    db_path = str(tmp_path / "rag.db")
+    store = SQLiteLangChainVectorStore(db_path)
+    store.sync_file("p1", "a.py", ["one", "two"], HashingEmbedder())
+    store.close()
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TABLE file_manifest")
+    conn.execute("DROP INDEX idx_vectors_file_hash")
+    conn.execute("CREATE TABLE ingest_manifest (project_id TEXT NOT NULL, path TEXT NOT NULL, size INTEGER, mtime_ns INTEGER, hash TEXT NOT NULL, PRIMARY KEY (project_id, path))")
+    conn.execute("INSERT INTO ingest_manifest VALUES ('p1', 'a.py', 7, 42, 'abc')")
+    conn.execute("PRAGMA user_version=1")
+    conn.commit()
+    conn.close()
+
+    store = SQLiteLangChainVectorStore(db_path)
+    assert store.file_state("p1", "a.py") == {"size": 7, "mtime_ns": 42, "hash": "abc", "chunks": 2}
+    with store.reader() as conn:
+        assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name='ingest_manifest'").fetchone()
+    store.close()
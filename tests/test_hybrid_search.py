@@ -0,0 +1,76 @@
+import sqlite3
+from langchain.schema import Document
+from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore, fts_query
+
+
+def _add(store, project_id, texts, vectors):
+    docs = [Document(page_content=text, metadata={"id": f"{project_id}::chunk{i}"}) for i, text in enumerate(texts)]
+    store.add_documents(docs, vectors, project_id=project_id)
+
+
+def _fts_count(store, term):
+    with store.reader() as conn:
+        return conn.execute("SELECT COUNT(*) FROM vectors_fts WHERE vectors_fts MATCH ?", (fts_query(term),)).fetchone()[0]
+
+
+def test_fts_query_quotes_terms():
+    assert fts_query('parse_config("a-b") NEAR *') == '"parse_config" OR "a" OR "b" OR "NEAR"'
+    assert fts_query("?? --") == ""
+
+
+def test_fts_index_follows_inserts_replaces_and_deletes(tmp_path):
+    store = SQLiteLangChainVectorStore(str(tmp_path / "rag.db"), read_pool_size=1)
+    _add(store, "p1", ["def load_settings(): pass", "ERR_CONN_RESET handling"], [[1, 0], [0, 1]])
+    assert _fts_count(store, "load_settings") == 1
+    # Replacing a row drops its old terms
+    _add(store, "p1", ["def read_settings(): pass"], [[1, 0]])
+    assert _fts_count(store, "load_settings") == 0 and _fts_count(store, "read_settings") == 1
+    store.delete(["p1::chunk1"])
+    assert _fts_count(store, "ERR_CONN_RESET") == 0
+    store.close()
+
+    # Rows written before the FTS table existed are indexed when the store is opened
+    conn = sqlite3.connect(str(tmp_path / "rag.db"))
+    conn.execute("DROP TABLE vectors_fts")
+    for name in ("replace", "insert", "delete", "update"):
+        conn.execute(f"DROP TRIGGER vectors_fts_{name}")
+    conn.commit()
+    conn.close()
+    store = SQLiteLangChainVectorStore(str(tmp_path / "rag.db"))
+    assert store.lexical_search("read_settings", "p1") and not store.lexical_search("read_settings", "p2")
+    store.close()
+
+
+def test_hybrid_search_finds_exact_identifiers(tmp_path):
+    store = SQLiteLangChainVectorStore(str(tmp_path / "rag.db"), hybrid=True)
+    texts = [f"generic helper number {i}" for i in range(20)] + ["raise ConfigError('E4021 missing db_url')"]
+    # The identifier chunk's embedding points away from the query
+    vectors = [[1, 0.01 * i] for i in range(20)] + [[-1, 0]]
+    _add(store, "p1", texts, vectors)
+    assert [doc.metadata["id"] for doc in store.similarity_search("", k=5, filter={"embedding": [1, 0], "project_id": "p1"})][-1] != "p1::chunk20"
+
+    lexical = store.lexical_search("what raises E4021?", "p1")
+    assert lexical[0][0] == "p1::chunk20" and lexical[0][1] > 0
+    docs = store.search_projects([1, 0], ["p1"], k=5, query="what raises E4021?")
+    assert "p1::chunk20" in [doc.metadata["id"] for doc in docs]
+    hit = next(doc for doc in docs if doc.metadata["id"] == "p1::chunk20")
+    assert "lexical_score" in hit.metadata and "vector_score" not in hit.metadata
+    # Without the query text the search stays vector-only
+    assert "p1::chunk20" not in [doc.metadata["id"] for doc in store.search_projects([1, 0], ["p1"], k=5)]
+    store.close()
+
+
+def test_prefilter_limits_vector_stage_to_lexical_candidates(tmp_path):
+    store = SQLiteLangChainVectorStore(str(tmp_path / "rag.db"), hybrid=True, prefilter=12)
+    texts = [f"token_bucket refill step {i}" for i in range(15)] + [f"unrelated prose {i}" for i in range(15)]
+    vectors = [[0.5, 0.1 * i] for i in range(15)] + [[1, 0]] * 15
+    _add(store, "p1", texts, vectors)
+    docs = store.hybrid_search("token_bucket", [1, 0], "p1", k=5)
+    # The unrelated rows point straight at the query but never reach the vector stage
+    assert all("token_bucket" in doc.page_content for doc in docs)
+    assert all("vector_score" in doc.metadata for doc in docs)
+
+    # Too few lexical matches: falls back to the full vector search
+    docs = store.hybrid_search("prose", [1, 0], "p1", k=5, fetch_k=20)
+    assert docs[0].page_content.startswith("unrelated prose")
+    store.close()
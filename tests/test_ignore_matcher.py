@@ -0,0 +1,91 @@
+import os
+import pathspec
+from ragms02.watcher.ignore_utils import IgnoreMatcher, IgnoreRules, IgnoreTree, is_ignored, scan_tree
+
+PATTERNS = ["node_modules/", "*.log", "!keep.log", "/build", "docs/**/draft.md", "# comment", ""]
+
+
+def _touch(root, rel_path, content="x"):
+    path = os.path.join(root, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def test_compiled_matcher_agrees_with_pathspec():
+    matcher = IgnoreMatcher(PATTERNS)
+    spec = pathspec.PathSpec.from_lines("gitwildmatch", PATTERNS)
+    paths = ["a.py", "x.log", "keep.log", "src/keep.log", "src/app.log", "build/out.py", "src/build/out.py",
+             "node_modules/react/index.js", "src/node_modules/x.js", "docs/a/b/draft.md", "docs/draft.md", "./x.log"]
+    for path in paths:
+        assert matcher.match(path) == is_ignored(path, spec), path
+    assert is_ignored("x.log", matcher) and not matcher.match("keep.log")
+    assert not IgnoreMatcher() and not IgnoreMatcher().match("anything")
+
+
+def test_ignored_directory_cannot_be_reincluded():
+    matcher = IgnoreMatcher(["vendor/", "!vendor/keep.py"])
+    assert matcher.match("vendor/keep.py")
+    assert matcher.match("vendor", is_dir=True) and matcher.dir_ignored("vendor/lib")
+
+
+def test_scan_prunes_ignored_directories(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    for rel in ["src/a.py", "src/app.log", "node_modules/react/index.js", "node_modules/deep/x/y.js", "build/out.o", "keep.log"]:
+        _touch(root, rel)
+    listed = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda path: listed.append(os.path.relpath(path, root)) or real_scandir(path))
+    included, excluded = scan_tree(root, IgnoreMatcher(PATTERNS))
+    assert included == {"src/a.py", "keep.log"}
+    assert excluded == {"src/app.log", "node_modules/", "build/"}
+    assert not any(p.startswith(("node_modules", "build")) for p in listed)
+
+
+def test_reload_diffs_without_rescanning(tmp_path):
+    root = str(tmp_path)
+    for rel in ["src/a.py", "src/b.py", "tmp/t.py", "notes.txt", "old.log"]:
+        _touch(root, rel)
+    tree = IgnoreTree(root, IgnoreMatcher(["tmp/", "*.log"]))
+    assert tree.included == {"src/a.py", "src/b.py", "notes.txt"}
+
+    # Files written after the scan are tracked from watcher events
+    _touch(root, "src/c.py")
+    _touch(root, "new.log")
+    os.remove(os.path.join(root, "src/b.py"))
+    assert not tree.track("src/c.py", True)
+    assert tree.track("new.log", True)
+    assert not tree.track("src/b.py", False)
+
+    newly_ignored, newly_included = tree.reload(IgnoreMatcher(["src/", "*.txt"]))
+    assert newly_ignored == {"src/a.py", "src/c.py", "notes.txt"}
+    assert newly_included == {"tmp/t.py", "old.log", "new.log"}
+    assert tree.excluded == {"src/", "notes.txt"}
+    assert tree.included == {"tmp/t.py", "old.log", "new.log"}
+    assert tree.match("src/a.py") and not tree.match("tmp/t.py")
+
+    # Reverting restores the original state, scanning only the directory that came back
+    newly_ignored, newly_included = tree.reload(IgnoreMatcher(["tmp/", "*.log"]))
+    assert newly_ignored == {"tmp/t.py", "old.log", "new.log"}
+    assert newly_included == {"src/a.py", "src/c.py", "notes.txt"}
+
+
+def test_nested_ignore_files_are_scoped(tmp_path):
+    root = str(tmp_path)
+    _touch(root, ".ragignore", "*.log\nvendor/\n")
+    _touch(root, "web/.ragignore", "dist/\n!debug.log\n*.map\n")
+    for rel in ["a.log", "web/debug.log", "web/app.log", "web/dist/app.js", "web/app.js.map", "app.js.map", "dist/keep.js", "web/vendor/x.js"]:
+        _touch(root, rel)
+    rules = IgnoreRules(root)
+    included, excluded = scan_tree(root, rules)
+    # Nested rules apply below web/ only, and take precedence over the root file there
+    assert included == {".ragignore", "web/.ragignore", "web/debug.log", "app.js.map", "dist/keep.js"}
+    assert excluded == {"a.log", "web/app.log", "web/dist/", "web/app.js.map", "web/vendor/"}
+    assert rules.scope_of("web/.ragignore") == "web" and rules.scope_of(".ragignore") == ""
+    assert rules.scope_of("web/app.js") is None
+
+    tree = IgnoreTree(root, rules)
+    _touch(root, "web/.ragignore", "*.map\n")
+    rules.invalidate("web")
+    newly_ignored, newly_included = tree.reload(scope="web")
+    assert newly_ignored == {"web/debug.log"} and newly_included == {"web/dist/app.js"}
@@ -0,0 +1,64 @@
+import threading
+from fastapi.testclient import TestClient
+from ragms02.ingestion.pipeline import chunk_text
+from ragms02.main import app
+from ragms02.vectorstore.embedding import HashingEmbedder
+from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
+
+client = TestClient(app)
+
+
+def _notify(content, path="src/diff.py", project="diff-proj"):
+    resp = client.post("/ingest/notify?wait=true", json={
+        "project_id": project,
+        "events": [{"path": path, "event_type": "modified", "timestamp": "2025-06-24T12:34:56Z", "content": content}],
+    })
+    assert resp.status_code == 200
+    return resp.json()
+
+
+def _rows(project="diff-proj"):
+    with app.state.store.reader() as conn:
+        return dict(conn.execute("SELECT id, rowid FROM vectors WHERE project_id=?", (project,)).fetchall())
+
+
+def test_modified_event_only_writes_changed_chunks():
+    lines = [f"def func_{i}(x):\n    return x * {i}\n" for i in range(200)]
+    first = _notify("\n".join(lines))
+    assert first["added"] == first["processed"] and first["removed"] == 0
+    before = _rows()
+
+    lines[100] = "def func_100(x):\n    return x - 100\n"
+    second = _notify("\n".join(lines))
+    assert second["unchanged"] >= second["processed"] - 3
+    assert 0 < second["added"] <= 3 and second["added"] == second["removed"]
+    after = _rows()
+    untouched = [doc_id for doc_id in after if before.get(doc_id) == after[doc_id]]
+    assert len(untouched) == second["unchanged"]
+    assert len(after) == second["processed"]
+
+
+def test_shrinking_file_removes_stale_chunks():
+    _notify("x = 1\n" * 500, path="src/shrink.py")
+    result = _notify("x = 1\n" * 10, path="src/shrink.py")
+    assert result["removed"] > 0
+    with app.state.store.reader() as conn:
+        count = conn.execute("SELECT COUNT(*) FROM vectors WHERE project_id=? AND file_path=?", ("diff-proj", "src/shrink.py")).fetchone()[0]
+    assert count == result["processed"]
+
+
+def test_concurrent_syncs_of_one_file_do_not_duplicate_chunks(tmp_path):
+    store = SQLiteLangChainVectorStore(str(tmp_path / "rag.db"), read_pool_size=2)
+    embedder = HashingEmbedder()
+    chunks = chunk_text("".join(f"value_{i} = {i}\n" for i in range(300)))
+    threads = [threading.Thread(target=store.sync_file, args=("p1", "a.py", chunks, embedder)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with store.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM vectors WHERE file_path='a.py'").fetchone()[0] == len(chunks)
+        plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN SELECT id FROM vectors WHERE project_id='p1' AND file_path='a.py'"))
+    # Either (project_id, file_path, ...) index turns it into a range scan
+    assert "INDEX idx_vectors_" in plan and "(project_id=? AND file_path=?)" in plan
+    store.close()
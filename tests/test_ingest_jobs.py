@@ -0,0 +1,99 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+import pytest
+from ragms02.ingestion.jobs import IngestJobQueue, QueueFullError
+from ragms02.ingestion.pipeline import embed_new_chunks, load_event
+from ragms02.vectorstore.embedding import HashingEmbedder
+from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
+
+
+def _events(n, prefix="f"):
+    return [{"path": f"{prefix}{i}.py", "event_type": "created", "content": f"value_{i} = {i}\n" * 40} for i in range(n)]
+
+
+def test_jobs_process_events_in_parallel_and_in_order():
+    store = SQLiteLangChainVectorStore(":memory:")
+    jobs = IngestJobQueue(store, HashingEmbedder(), workers=4, batch_size=16)
+    jobs.start()
+    first = jobs.submit("p1", _events(20))
+    second = jobs.submit("p1", [{"path": "f0.py", "event_type": "deleted"}])
+    assert jobs.wait(first, timeout=10)["status"] == "completed"
+    job = jobs.wait(second, timeout=10)
+    assert job["status"] == "completed" and job["done"] == job["total"] == 1
+    assert jobs.get(first)["done"] == 20
+    with store.reader() as conn:
+        paths = {row[0] for row in conn.execute("SELECT DISTINCT file_path FROM vectors")}
+    assert paths == {f"f{i}.py" for i in range(1, 20)}
+    assert jobs.pending == 0
+    jobs.stop()
+    store.close()
+
+
+def test_queue_applies_backpressure():
+    store = SQLiteLangChainVectorStore(":memory:")
+    jobs = IngestJobQueue(store, HashingEmbedder(), max_pending=5)
+    jobs.submit("p1", _events(3))
+    with pytest.raises(QueueFullError):
+        jobs.submit("p1", _events(3))
+    store.close()
+
+
+def test_unfinished_jobs_resume_after_restart(tmp_path):
+    db_path = str(tmp_path / "rag.db")
+    store = SQLiteLangChainVectorStore(db_path)
+    job_id = IngestJobQueue(store, HashingEmbedder()).submit("p1", _events(3))
+    store.close()
+
+    store = SQLiteLangChainVectorStore(db_path)
+    jobs = IngestJobQueue(store, HashingEmbedder())
+    jobs.start()
+    assert jobs.wait(job_id, timeout=10)["status"] == "completed"
+    jobs.stop()
+    store.close()
+
+
+def _done(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def test_events_for_one_path_in_one_batch_leave_no_stale_chunks(tmp_path):
+    store = SQLiteLangChainVectorStore(str(tmp_path / "rag.db"), read_pool_size=2)
+    embedder = HashingEmbedder()
+    jobs = IngestJobQueue(store, embedder)
+    long = "".join(f"value_{i} = compute({i})\n" for i in range(200))
+    events = [
+        {"path": "a.py", "event_type": "modified", "content": long},
+        {"path": "a.py", "event_type": "modified", "content": "x = 1\n"},
+    ]
+    job_id = jobs.submit("p1", events)
+    loaded = [embed_new_chunks(store, embedder, "p1", load_event(event)) for event in events]
+    jobs._apply_batch([(job_id, "p1", _done(loaded[0]), False), (job_id, "p1", _done(loaded[1]), True)])
+    assert jobs.get(job_id)["status"] == "completed"
+    with store.reader() as conn:
+        assert conn.execute("SELECT content FROM vectors WHERE file_path='a.py'").fetchall() == [("x = 1",)]
+    store.close()
+
+
+def test_writer_does_not_hold_the_lock_while_events_are_prepared():
+    # In-memory stores have no reader pool, so preparing an event needs the writer connection
+    store = SQLiteLangChainVectorStore(":memory:")
+    embedder = HashingEmbedder()
+    jobs = IngestJobQueue(store, embedder)
+    event = {"path": "a.py", "event_type": "created", "content": "x = 1\n"}
+    job_id = jobs.submit("p1", [event])
+
+    def prepare():
+        time.sleep(0.1)
+        return embed_new_chunks(store, embedder, "p1", load_event(event))
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        future = pool.submit(prepare)
+        writer = threading.Thread(target=jobs._apply_batch, args=([(job_id, "p1", future, True)],), daemon=True)
+        writer.start()
+        writer.join(5)
+    assert not writer.is_alive()
+    assert jobs.get(job_id)["status"] == "completed"
+    store.close()
@@ -0,0 +1,77 @@
+from unittest import mock
+import pytest
+from ragms02.ingestion.jobs import IngestJobQueue
+from ragms02.ingestion.pipeline import chunk_text
+from ragms02.vectorstore.embedding import HashingEmbedder
+from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
+
+TEXT = "".join(f"def handler_{i}(event):\n    return event.get({i})\n" for i in range(120))
+
+
+def _rows(store, path):
+    with store.reader() as conn:
+        return conn.execute("SELECT id, row_id, content FROM vectors WHERE project_id='p1' AND file_path=? ORDER BY chunk_index", (path,)).fetchall()
+
+
+@pytest.mark.parametrize("backend", ["matrix", "ivf", "quantized"])
+def test_move_file_rekeys_rows_and_index(tmp_path, backend):
+    store = SQLiteLangChainVectorStore(str(tmp_path / "rag.db"), use_index=True, index_backend=backend)
+    embedder = HashingEmbedder()
+    chunks = chunk_text(TEXT)
+    store.sync_file("p1", "src/old.py", chunks, embedder)
+    store.sync_file("p1", "src/new.py", ["stale destination"], embedder)
+    before = _rows(store, "src/old.py")
+    assert store.get_index("p1")
+
+    assert store.move_file("p1", "src/old.py", "src/new.py") == len(chunks)
+    after = _rows(store, "src/new.py")
+    assert not _rows(store, "src/old.py")
+    assert [row[1:] for row in after] == [row[1:] for row in before]
+    assert [row[0] for row in after] == [doc_id.replace("src/old.py", "src/new.py") for doc_id, _, _ in before]
+    hits = store.similarity_search("", k=1, filter={"embedding": embedder.embed(chunks[3]), "project_id": "p1"})
+    assert hits[0].metadata["id"] == after[3][0]
+    assert store.lexical_search("handler_7", "p1")[0][0].startswith("src/new.py::")
+    assert store.move_file("p1", "src/missing.py", "src/x.py") == 0
+    store.close()
+
+
+def test_moved_events_do_not_reembed():
+    store = SQLiteLangChainVectorStore(":memory:")
+    embedder = HashingEmbedder()
+    jobs = IngestJobQueue(store, embedder, workers=2)
+    jobs.start()
+    created = jobs.submit("p1", [{"path": f"pkg/m{i}.py", "event_type": "created", "content": TEXT + f"# {i}\n"} for i in range(3)])
+    assert jobs.wait(created, timeout=10)["status"] == "completed"
+    with mock.patch.object(HashingEmbedder, "embed_batch", wraps=embedder.embed_batch) as embed_batch:
+        moves = [{"path": f"lib/m{i}.py", "old_path": f"pkg/m{i}.py", "event_type": "moved"} for i in range(3)]
+        job = jobs.wait(jobs.submit("p1", moves), timeout=10)
+        assert job["status"] == "completed" and job["added"] == 0 and job["unchanged"] > 0
+        assert embed_batch.call_count == 0
+        # A move that also changed the file re-embeds only the changed chunk
+        edited = {"path": "src/m0.py", "old_path": "lib/m0.py", "event_type": "moved", "content": TEXT.replace("get(5)", "get(-5)") + "# 0\n"}
+        job = jobs.wait(jobs.submit("p1", [edited]), timeout=10)
+        assert job["added"] == 1 and job["removed"] == 1
+        assert [len(call.args[0]) for call in embed_batch.call_args_list] == [1]
+    with store.reader() as conn:
+        paths = {row[0] for row in conn.execute("SELECT DISTINCT file_path FROM vectors")}
+    assert paths == {"src/m0.py", "lib/m1.py", "lib/m2.py"}
+    jobs.stop()
+    store.close()
+
+
+def test_move_leaves_other_projects_alone():
+    store = SQLiteLangChainVectorStore(":memory:", use_index=True, hybrid=True)
+    embedder = HashingEmbedder()
+    store.sync_file("p1", "docs/x.md", ["project one text"], embedder)
+    store.sync_file("p2", "docs/y.md", ["project two text"], embedder)
+    version = store.version("p1")
+
+    # Renaming p2's y.md to x.md must not delete or re-key p1's x.md
+    assert store.move_file("p2", "docs/y.md", "docs/x.md") == 1
+    assert [row[2] for row in _rows(store, "docs/x.md")] == ["project one text"]
+    assert store.version("p1") == version
+    with store.reader() as conn:
+        assert conn.execute("SELECT content FROM vectors WHERE project_id='p2' AND file_path='docs/x.md'").fetchall() == [("project two text",)]
+    hit = store.similarity_search("", k=1, filter={"embedding": embedder.embed("project one text"), "project_id": "p1"})[0]
+    assert hit.page_content == "project one text"
+    store.close()
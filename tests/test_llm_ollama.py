@@ -1,8 +1,11 @@
+import asyncio
+import threading
+import httpx
 import pytest
 from unittest.mock import patch
 from ragms02.llm.ollama import OllamaLLM
 
-@patch("ragms02.llm.ollama.requests.post")
+@patch("ragms02.llm.ollama.requests.Session.post")
 def test_generate_calls_ollama_api(mock_post):
     mock_post.return_value.status_code = 200
     mock_post.return_value.json.return_value = {"response": "Hello, world!"}
@@ -12,3 +15,71 @@ def test_generate_calls_ollama_api(mock_post):
     mock_post.assert_called_once()
     args, kwargs = mock_post.call_args
     assert "llama2" in str(kwargs["json"]) or "llama2" in str(kwargs)
+    assert kwargs["timeout"] == (llm.connect_timeout, llm.timeout)
+
+@patch("ragms02.llm.ollama.requests.Session.post")
+def test_stream_yields_fragments(mock_post):
+    response = mock_post.return_value.__enter__.return_value
+    response.iter_lines.return_value = [
+        b'{"response": "Hel", "done": false}',
+        b"",
+        b'{"response": "lo", "done": false}',
+        b'{"response": "", "done": true}',
+    ]
+    llm = OllamaLLM()
+    assert list(llm.stream("Say hello", model="llama2")) == ["Hel", "lo"]
+    args, kwargs = mock_post.call_args
+    assert kwargs["stream"] is True and kwargs["json"]["stream"] is True
+
+def test_agenerate_uses_pooled_async_client():
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(request)
+        return httpx.Response(200, json={"response": "async hello"})
+
+    llm = OllamaLLM(base_url="http://ollama.test", max_concurrency=2)
+
+    async def run():
+        client, _ = llm._async_client()
+        client._transport = httpx.MockTransport(handler)
+        results = await asyncio.gather(*(llm.agenerate("Say hello") for _ in range(5)))
+        assert llm._async_client()[0] is client
+        await llm.aclose()
+        return results
+
+    assert asyncio.run(run()) == ["async hello"] * 5
+    assert len(requests_seen) == 5 and requests_seen[0].url.path == "/api/generate"
+
+def test_aclose_closes_the_pool_of_every_loop():
+    llm = OllamaLLM(base_url="http://ollama.test")
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json={"response": "hi"}))
+
+    async def generate():
+        client, _ = llm._async_client()
+        client._transport = transport
+        return await llm.agenerate("Say hello")
+
+    # One loop running in another thread, one stopped but not closed, and the current one
+    threaded = asyncio.new_event_loop()
+    thread = threading.Thread(target=threaded.run_forever)
+    thread.start()
+    stopped = asyncio.new_event_loop()
+    try:
+        assert asyncio.run_coroutine_threadsafe(generate(), threaded).result(timeout=5) == "hi"
+        assert stopped.run_until_complete(generate()) == "hi"
+
+        async def run():
+            assert await generate() == "hi"
+            clients = [client for client, _ in llm._aclients.values()]
+            assert len(set(map(id, clients))) == 3
+            await llm.aclose()
+            return clients
+
+        clients = asyncio.run(run())
+        assert all(client.is_closed for client in clients) and not llm._aclients
+    finally:
+        threaded.call_soon_threadsafe(threaded.stop)
+        thread.join()
+        threaded.close()
+        stopped.close()
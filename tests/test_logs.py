@@ -0,0 +1,71 @@
+import logging
+import pytest
+from fastapi.testclient import TestClient
+from ragms02.logs import (
+    LOG_BUFFER,
+    RequestIdFilter,
+    SamplingFilter,
+    bind_request_id,
+    configure_logging,
+    reset_request_id,
+    shutdown_logging,
+)
+from ragms02.main import app
+
+
+def _record(level=logging.INFO, request_id=None):
+    record = logging.LogRecord("ragms02.test", level, __file__, 1, "hello %s", ("world",), None)
+    if request_id is not None:
+        record.request_id = request_id
+    return record
+
+
+def test_request_id_filter_uses_context():
+    token = bind_request_id("abc")
+    try:
+        record = _record()
+        RequestIdFilter().filter(record)
+    finally:
+        reset_request_id(token)
+    assert record.request_id == "abc"
+
+
+def test_sampling_is_consistent_per_request_and_keeps_warnings():
+    sampler = SamplingFilter(rate=0.5)
+    ids = [f"req-{i}" for i in range(200)]
+    kept = [rid for rid in ids if sampler.filter(_record(request_id=rid))]
+    assert 0 < len(kept) < len(ids)
+    # Every record of a sampled request is kept, every record of a dropped one is dropped
+    assert kept == [rid for rid in ids if sampler.filter(_record(logging.DEBUG, request_id=rid))]
+    assert all(sampler.filter(_record(logging.WARNING, request_id=rid)) for rid in ids)
+    assert not SamplingFilter(rate=0.0).filter(_record())
+
+
+@pytest.fixture
+def logging_configured():
+    configure_logging(level="DEBUG", sample_rate=1.0, fmt="text")
+    yield
+    shutdown_logging()
+
+
+def test_queued_records_reach_buffer_with_request_id(logging_configured):
+    token = bind_request_id("req-42")
+    try:
+        logging.getLogger("ragms02.test").info("ingested %d chunks", 3, extra={"project_id": "p1"})
+    finally:
+        reset_request_id(token)
+    shutdown_logging()
+    entry = LOG_BUFFER.entries(limit=1)[0]
+    assert entry["message"] == "ingested 3 chunks"
+    assert entry["request_id"] == "req-42"
+    assert entry["project_id"] == "p1"
+
+
+def test_requests_are_logged_with_correlation_id(logging_configured):
+    with TestClient(app) as client:
+        response = client.get("/health", headers={"X-Request-ID": "trace-1"})
+        assert response.headers["X-Request-ID"] == "trace-1"
+        generated = client.get("/health").headers["X-Request-ID"]
+        assert generated and generated != "trace-1"
+    logs = [e for e in LOG_BUFFER.entries() if e["logger"] == "ragms02.api"]
+    assert any(e["request_id"] == "trace-1" and e["message"].startswith("GET /health 200") for e in logs)
@@ -0,0 +1,48 @@
+import numpy as np
+from langchain.schema import Document
+from ragms02.vectorstore.index import MatrixIndex
+from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
+
+
+def test_matrix_index_matches_brute_force():
+    rng = np.random.default_rng(0)
+    vectors = rng.random((200, 16), dtype=np.float32)
+    ids = [f"doc{i}" for i in range(200)]
+    index = MatrixIndex()
+    index.add(ids, vectors)
+    q = rng.random(16, dtype=np.float32)
+    sims = vectors @ q / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(q))
+    expected = [ids[i] for i in np.argsort(-sims)[:5]]
+    assert [doc_id for doc_id, _ in index.search(q, k=5)] == expected
+
+
+def test_matrix_index_remove_and_replace():
+    index = MatrixIndex()
+    index.add(["a", "b", "c"], [[1, 0], [0, 1], [1, 1]])
+    assert index.remove(["a", "missing"]) == 1
+    assert len(index) == 2 and "a" not in index
+    index.add(["b"], [[1, 0]])
+    assert index.search([1, 0], k=1)[0][0] == "b"
+
+
+def test_store_index_stays_in_sync():
+    store = SQLiteLangChainVectorStore(":memory:", use_index=True)
+    docs = [Document(page_content=f"chunk {i}", metadata={"id": f"f.txt::chunk{i}", "file_path": "f.txt"}) for i in range(3)]
+    store.add_documents(docs, [[1, 0], [0, 1], [1, 1]], project_id="p1")
+    results = store.similarity_search("", k=1, filter={"embedding": [0, 1], "project_id": "p1"})
+    assert results[0].metadata["id"] == "f.txt::chunk1"
+    assert results[0].page_content == "chunk 1"
+    store.add_documents([Document(page_content="new", metadata={"id": "g.txt::chunk0", "file_path": "g.txt"})], [[0, 1]], project_id="p1")
+    assert store.delete_file("p1", "f.txt") == 3
+    results = store.similarity_search("", k=5, filter={"embedding": [0, 1], "project_id": "p1"})
+    assert [doc.metadata["id"] for doc in results] == ["g.txt::chunk0"]
+    store.close()
+
+
+def test_index_search_drops_hits_without_rows():
+    store = SQLiteLangChainVectorStore(":memory:", use_index=True)
+    store.add_documents([Document(page_content="kept", metadata={"id": "a::chunk0"})], [[1, 0]], project_id="p1")
+    store.get_index("p1").add(["stale::chunk0"], [[1, 0]])
+    results = store.similarity_search("", k=5, filter={"embedding": [1, 0], "project_id": "p1"})
+    assert [doc.page_content for doc in results] == ["kept"]
+    store.close()
@@ -0,0 +1,43 @@
+import pytest
+from ragms02.metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_counter_and_gauge_render():
+    registry = Registry()
+    events = Counter("events_total", "Events.", ["kind"], registry=registry)
+    depth = Gauge("depth", "Depth.", registry=registry)
+    events.inc(kind="a")
+    events.inc(2, kind="a")
+    events.inc(kind='b"c')
+    depth.set(5)
+    depth.dec(2)
+    assert events.value(kind="a") == 3
+    text = registry.render()
+    assert "# HELP events_total Events.\n# TYPE events_total counter\n" in text
+    assert 'events_total{kind="a"} 3\n' in text
+    assert 'events_total{kind="b\\"c"} 1\n' in text
+    assert "# TYPE depth gauge\ndepth 3\n" in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = Histogram("latency_seconds", "Latency.", ["stage"], buckets=(0.1, 1.0), registry=registry)
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, stage="embed")
+    with latency.time(stage="search"):
+        pass
+    assert latency.count(stage="embed") == 4
+    assert latency.count(stage="search") == 1
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{stage="embed",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="embed",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{stage="embed",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{stage="embed"} 4.05' in lines
+    assert 'latency_seconds_count{stage="embed"} 4' in lines
+
+
+def test_duplicate_names_are_rejected():
+    registry = Registry()
+    Counter("dup_total", "Dup.", registry=registry)
+    with pytest.raises(ValueError):
+        Counter("dup_total", "Dup.", registry=registry)
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from ragms02.vectorstore.index import MatrixIndex
+from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
+from ragms02.vectorstore.quantization import QuantizedIndex, decode_rows, encode_rows
+from ragms02.vectorstore.quantize import main
+
+
+def _clustered(n=3000, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((20, dim))
+    return (centers[rng.integers(0, 20, n)] + 0.3 * rng.standard_normal((n, dim))).astype(np.float32)
+
+
+@pytest.mark.parametrize("dtype,tol", [("float32", 0), ("float16", 1e-2), ("int8", 5e-2)])
+def test_blob_encodings_round_trip(dtype, tol):
+    vectors = _clustered(10)
+    blobs = encode_rows(vectors, dtype)
+    assert np.allclose(decode_rows(blobs, dtype), vectors, atol=tol)
+    assert len(blobs[0]) == {"float32": 128, "float16": 64, "int8": 36}[dtype]
+
+
+@pytest.mark.parametrize("codec,params,min_recall", [("float16", {}, 0.95), ("int8", {}, 0.9), ("pq", {"m": 8, "ksub": 64}, 0.15)])
+def test_quantized_index_recall_and_updates(codec, params, min_recall):
+    vectors = _clustered()
+    ids = [f"d{i}" for i in range(len(vectors))]
+    exact = MatrixIndex()
+    exact.add(ids, vectors)
+    index = QuantizedIndex(codec=codec, train_threshold=1000, **params)
+    index.add(ids[:500], vectors[:500])
+    index.add(ids[500:], vectors[500:])
+    assert index.codec.trained and len(index) == len(ids)
+    hits = [len({i for i, _ in exact.search(v, 10)} & {i for i, _ in index.search(v, 10)}) / 10 for v in vectors[:50]]
+    assert np.mean(hits) >= min_recall
+    assert index.remove(ids[:100]) == 100
+    assert ids[5] not in {i for i, _ in index.search(vectors[5], 20)}
+    assert index.search(vectors[700], 1)[0][0] == ids[700] or codec == "pq"
+
+
+def test_store_reranks_quantized_candidates_and_persists_index(tmp_path):
+    db = str(tmp_path / "rag.db")
+    vectors = _clustered()
+    ids = [f"d{i}" for i in range(len(vectors))]
+    params = {"codec": "pq", "m": 8, "ksub": 64, "train_threshold": 1000}
+    store = SQLiteLangChainVectorStore(db, use_index=True, index_backend="quantized", index_params=params, embedding_dtype="float16", rerank=50)
+    store.add_embeddings(ids, [f"text {i}" for i in ids], vectors, project_id="p1")
+    for i in (3, 1234, 2999):
+        top = store.similarity_search("", k=1, filter={"embedding": vectors[i], "project_id": "p1"})[0]
+        assert top.metadata["id"] == ids[i] and top.metadata["score"] == pytest.approx(1.0, abs=1e-3)
+    store.close()
+    reopened = SQLiteLangChainVectorStore(db, use_index=True, index_backend="quantized", index_params=params)
+    assert reopened.blob_dtype == "float16"
+    assert reopened.get_index("p1").codec.trained
+    reopened.close()
+
+
+def test_quantize_tool_converts_in_place_and_reports_recall(tmp_path, capsys):
+    db = str(tmp_path / "rag.db")
+    vectors = _clustered(1500)
+    store = SQLiteLangChainVectorStore(db)
+    store.add_embeddings([f"d{i}" for i in range(1500)], ["x"] * 1500, vectors, project_id="p1")
+    store.close()
+    assert main([db, "--dtype", "int8", "--codec", "int8", "--queries", "20", "--rerank", "50"]) == 0
+    out = capsys.readouterr().out
+    row = next(line for line in out.splitlines() if line.startswith("p1"))
+    fields = row.split()
+    assert fields[1] == "1500" and fields[3] == "36" and float(fields[5]) >= 0.95
+    store = SQLiteLangChainVectorStore(db)
+    assert store.blob_dtype == "int8"
+    store.close()
@@ -1,10 +1,10 @@
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 from ragms02.main import app
 from fastapi.testclient import TestClient
 
 client = TestClient(app)
 
-@patch("ragms02.llm.ollama.OllamaLLM.generate")
+@patch("ragms02.llm.ollama.OllamaLLM.agenerate", new_callable=AsyncMock)
 def test_query_llm(mock_generate):
     mock_generate.return_value = "Mocked LLM response"
     payload = {
@@ -17,3 +17,14 @@ def test_query_llm(mock_generate):
     data = response.json()
     assert data["response"] == "Mocked LLM response"
     assert data["error"] is None or data["error"] == ""
+
+@patch("ragms02.llm.ollama.OllamaLLM.stream")
+def test_query_stream_sends_sources_then_tokens(mock_stream):
+    mock_stream.return_value = iter(["Mocked ", "stream"])
+    payload = {"query": "What is RAG?", "projects": ["proj1"], "model": "llama2"}
+    response = client.post("/query/stream", json=payload)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n")[0] for block in response.text.strip().split("\n\n")]
+    assert events == ["event: sources", "event: token", "event: token", "event: done"]
+    assert 'data: {"text": "Mocked "}' in response.text
@@ -0,0 +1,38 @@
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from langchain.schema import Document
+from ragms02.main import app
+from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
+
+
+def _add(store, project_id, vectors):
+    docs = [Document(page_content=f"{project_id} {i}", metadata={"id": f"{project_id}::chunk{i}"}) for i in range(len(vectors))]
+    store.add_documents(docs, vectors, project_id=project_id)
+
+
+def test_search_projects_merges_normalised_scores(tmp_path):
+    store = SQLiteLangChainVectorStore(str(tmp_path / "rag.db"), use_index=True, read_pool_size=2)
+    # p1 scores uniformly high; p2 has one clear best match
+    _add(store, "p1", [[1, 0.1 * i] for i in range(1, 6)])
+    _add(store, "p2", [[1, 0], [0, 1], [-1, 0.2], [0.1, -1], [-1, -1]])
+    docs = store.search_projects([1, 0], ["p1", "p2", "p1", "empty"], k=3)
+    assert len(docs) == 3
+    assert {doc.metadata["project_id"] for doc in docs} == {"p1", "p2"}
+    assert docs[0].metadata["id"] == "p2::chunk0"
+    assert all("score" in doc.metadata and "norm_score" in doc.metadata for doc in docs)
+    single = store.search_projects([1, 0], ["p1"], k=2)
+    assert [doc.metadata["id"] for doc in single] == ["p1::chunk0", "p1::chunk1"]
+    store.close()
+
+
+@patch("ragms02.llm.ollama.OllamaLLM.agenerate", new_callable=AsyncMock)
+def test_query_searches_every_project(mock_generate):
+    mock_generate.return_value = "answer"
+    with TestClient(app) as client:
+        for project in ("fan-a", "fan-b"):
+            client.post("/ingest/notify?wait=true", json={
+                "project_id": project,
+                "events": [{"path": f"{project}.py", "event_type": "created", "timestamp": "2025-06-24T12:34:56Z", "content": f"def {project.replace('-', '_')}_handler(): pass"}],
+            })
+        data = client.post("/query", json={"query": "handler", "projects": ["fan-a", "fan-b"], "model": "llama2"}).json()
+    assert {source["project_id"] for source in data["sources"]} == {"fan-a", "fan-b"}
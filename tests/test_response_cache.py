@@ -0,0 +1,57 @@
+from unittest.mock import AsyncMock, patch
+import numpy as np
+from fastapi.testclient import TestClient
+from ragms02.llm.response_cache import ResponseCache
+from ragms02.main import app
+
+
+def test_cache_matches_exact_and_near_duplicate_queries():
+    cache = ResponseCache(threshold=0.9)
+    key = cache.key("llama2", ["b", "a", "a"], {"a": 1, "b": 2})
+    assert key == cache.key("llama2", ["a", "b"], {"a": 1, "b": 2})
+    cache.put(key, "what is rag", np.array([1.0, 0.0]), "answer")
+    assert cache.get(key, "what is rag", np.array([0.0, 1.0])) == ("answer", 1.0)
+    value, similarity = cache.get(key, "what's rag", np.array([0.99, 0.1]))
+    assert value == "answer" and similarity > 0.9
+    assert cache.get(key, "something else", np.array([0.0, 1.0]))[0] is None
+    assert cache.get(cache.key("gemini-pro", ["a", "b"], {"a": 1, "b": 2}), "what is rag", np.array([1.0, 0.0]))[0] is None
+    assert cache.stats()["hits"] == 2 and cache.stats()["semantic_hits"] == 1
+
+
+def test_cache_invalidates_on_version_change_and_evicts():
+    cache = ResponseCache(max_entries=2, ttl=60)
+    old = cache.key("m", ["a"], {"a": 1})
+    cache.put(old, "q", [1.0, 0.0], "v1")
+    new = cache.key("m", ["a"], {"a": 2})
+    assert cache.get(new, "q", [1.0, 0.0])[0] is None
+    assert len(cache) == 0 and cache.stats()["invalidations"] == 1
+    cache.put(new, "q", [1.0, 0.0], "v2")
+    cache.put(old, "q", [1.0, 0.0], "stale")
+    assert cache.get(new, "q", [1.0, 0.0])[0] == "v2"
+    for i in range(3):
+        cache.put(new, f"q{i}", [0.0, 1.0 + i], i)
+    assert len(cache) == 2 and cache.stats()["evictions"] == 2
+
+    expiring = ResponseCache(ttl=0)
+    expiring.put(new, "q", [1.0, 0.0], "gone")
+    assert expiring.get(new, "q", [1.0, 0.0])[0] is None
+
+
+@patch("ragms02.llm.ollama.OllamaLLM.agenerate", new_callable=AsyncMock)
+def test_repeated_query_is_served_from_cache_until_ingest(mock_generate):
+    mock_generate.return_value = "cached answer"
+    payload = {"query": "How is the config parsed?", "projects": ["cache-proj"], "model": "llama2"}
+    with TestClient(app) as client:
+        first = client.post("/query", json=payload)
+        assert first.headers["X-Cache"] == "MISS"
+        second = client.post("/query", json=payload)
+        assert second.headers["X-Cache"] == "HIT"
+        assert second.json() == first.json()
+        assert mock_generate.await_count == 1
+        client.post("/ingest/notify?wait=true", json={
+            "project_id": "cache-proj",
+            "events": [{"path": "config.py", "event_type": "created", "timestamp": "2025-06-24T12:34:56Z", "content": "def parse_config(): pass"}],
+        })
+        third = client.post("/query", json=payload)
+        assert third.headers["X-Cache"] == "MISS"
+        assert mock_generate.await_count == 2
@@ -0,0 +1,84 @@
+import sqlite3
+import numpy as np
+from ragms02.vectorstore.embedding import HashingEmbedder
+from ragms02.vectorstore.langchain_sqlite import SCHEMA_VERSION, SQLiteLangChainVectorStore
+
+
+def _legacy_db(path):
+    # Layout written before PRAGMA user_version was used
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE vectors (id TEXT PRIMARY KEY, project_id TEXT, tag TEXT, embedding BLOB, content TEXT)")
+    rows = [(f"src/a.py::chunk{i}", "p1", "src/a.py", np.array([1, i], dtype=np.float32).tobytes(), f"chunk {i}") for i in range(3)]
+    rows.append(("src/a.py.bak::chunk0", "p1", "src/a.py.bak", np.array([0, 1], dtype=np.float32).tobytes(), "backup"))
+    conn.executemany("INSERT INTO vectors VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def test_legacy_database_is_migrated(tmp_path):
+    path = str(tmp_path / "rag.db")
+    _legacy_db(path)
+    store = SQLiteLangChainVectorStore(path)
+    with store.reader() as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        rows = conn.execute("SELECT id, file_path, chunk_index FROM vectors ORDER BY rowid").fetchall()
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(vectors)")]
+    assert rows[:3] == [(f"src/a.py::chunk{i}", "src/a.py", i) for i in range(3)]
+    assert "tag" not in columns and columns[0] == "row_id"
+    assert store.lexical_search("backup", "p1")[0][0] == "src/a.py.bak::chunk0"
+    docs = store.similarity_search("", k=1, filter={"embedding": [0, 1], "project_id": "p1"})
+    assert docs[0].page_content == "backup"
+    store.close()
+    # Reopening does not migrate again
+    store = SQLiteLangChainVectorStore(path)
+    assert store.version("p1") == 0
+    store.close()
+
+
+def test_file_deletes_are_indexed_and_scoped(tmp_path):
+    path = str(tmp_path / "rag.db")
+    _legacy_db(path)
+    store = SQLiteLangChainVectorStore(path)
+    # The old id LIKE 'src/a.py::chunk%' delete also hit other projects; a prefix never matches a longer path
+    assert store.delete_file("p2", "src/a.py") == 0
+    assert store.delete_file("p1", "src/a.py") == 3
+    with store.reader() as conn:
+        assert [row[0] for row in conn.execute("SELECT file_path FROM vectors")] == ["src/a.py.bak"]
+        plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN DELETE FROM vectors WHERE project_id='p1' AND file_path='a.py'"))
+    # Either (project_id, file_path, ...) index turns it into a range scan
+    assert "INDEX idx_vectors_" in plan and "(project_id=? AND file_path=?)" in plan
+    store.close()
+
+
+def test_sync_keeps_chunk_positions(tmp_path):
+    store = SQLiteLangChainVectorStore(str(tmp_path / "rag.db"))
+    embedder = HashingEmbedder()
+    store.sync_file("p1", "a.py", ["one", "two", "three"], embedder)
+    counts = store.sync_file("p1", "a.py", ["zero", "one", "two", "three"], embedder)
+    assert counts["added"] == 1 and counts["unchanged"] == 3
+    with store.reader() as conn:
+        rows = conn.execute("SELECT content FROM vectors WHERE project_id='p1' AND file_path='a.py' ORDER BY chunk_index").fetchall()
+    assert [row[0] for row in rows] == ["zero", "one", "two", "three"]
+    store.close()
+
+
+def test_same_path_in_two_projects_is_kept_apart(tmp_path):
+    path = str(tmp_path / "rag.db")
+    _legacy_db(path)
+    store = SQLiteLangChainVectorStore(path, use_index=True, hybrid=True)
+    embedder = HashingEmbedder()
+    # The migrated table keys ids per project: project p2 gets its own src/a.py::chunk0
+    store.sync_file("A", "README.md", ["alpha install guide"], embedder)
+    before = store.version("A")
+    store.sync_file("B", "README.md", ["beta release notes"], embedder)
+    store.sync_file("p2", "src/a.py", ["other project"], embedder)
+    assert store.version("A") == before
+    for project_id, text in (("A", "alpha install guide"), ("B", "beta release notes"), ("p2", "other project")):
+        docs = store.search_projects(embedder.embed(text), [project_id], k=1, query=text)
+        assert docs[0].page_content == text
+    with store.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM vectors WHERE file_path='src/a.py'").fetchone()[0] == 4
+    # Deleting B's chunk leaves A's chunk with the same id
+    store.delete(["README.md::chunk0"], project_id="B")
+    assert store.search_projects(embedder.embed("alpha install guide"), ["A"], k=1)[0].page_content == "alpha install guide"
+    store.close()
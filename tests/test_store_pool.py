@@ -0,0 +1,59 @@
+import threading
+from fastapi.testclient import TestClient
+from langchain.schema import Document
+from ragms02.main import app
+from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
+
+
+def test_file_store_uses_wal_and_reader_pool(tmp_path):
+    store = SQLiteLangChainVectorStore(str(tmp_path / "rag.db"), use_index=True, read_pool_size=2)
+    with store.reader() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+    def write(worker):
+        docs = [Document(page_content=f"w{worker} c{i}", metadata={"id": f"w{worker}::chunk{i}"}) for i in range(20)]
+        store.add_documents(docs, [[worker + 1.0, i] for i in range(20)], project_id="p1")
+
+    def read():
+        for _ in range(20):
+            store.similarity_search("", k=3, filter={"embedding": [1.0, 0.0], "project_id": "p1"})
+
+    threads = [threading.Thread(target=write, args=(w,)) for w in range(4)] + [threading.Thread(target=read) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with store.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0] == 80
+    assert len(store.get_index("p1")) == 80
+    store.close()
+
+
+def test_app_store_is_shared_across_requests():
+    with TestClient(app) as client:
+        store = app.state.store
+        client.post("/ingest/notify?wait=true", json={
+            "project_id": "shared-proj",
+            "events": [{"path": "a.py", "event_type": "created", "timestamp": "2025-06-24T12:34:56Z", "content": "x = 1"}],
+        })
+        sources = client.get("/projects/shared-proj/sources").json()["sources"]
+        assert [s["path"] for s in sources] == ["a.py::chunk0"]
+        assert app.state.store is store
+
+
+def test_chunk_count_is_recounted_only_after_writes(tmp_path):
+    db_path = str(tmp_path / "rag.db")
+    store = SQLiteLangChainVectorStore(db_path)
+    docs = [Document(page_content=f"chunk {i}", metadata={"id": f"a::chunk{i}", "file_path": "a"}) for i in range(3)]
+    store.add_documents(docs, [[1.0, 0.0]] * 3, project_id="p1")
+    assert store.chunk_count() == 3
+    stamp = store._chunk_count[0]
+    assert store.chunk_count() == 3 and store._chunk_count[0] == stamp
+
+    # A write from another connection invalidates the cached count too
+    other = SQLiteLangChainVectorStore(db_path)
+    other.delete_file("p1", "a")
+    other.close()
+    assert store.chunk_count() == 0
+    store.close()
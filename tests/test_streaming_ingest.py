@@ -0,0 +1,105 @@
+import hashlib
+from unittest import mock
+import pytest
+from ragms02.ingestion import pipeline
+from ragms02.ingestion.jobs import IngestJobQueue
+from ragms02.ingestion.pipeline import chunk_text, file_hash, iter_chunks
+from ragms02.ingestion.streaming import detect_encoding, iter_file_text, iter_lines, iter_text_pieces
+from ragms02.vectorstore.embedding import HashingEmbedder
+from ragms02.vectorstore.langchain_sqlite import SQLiteLangChainVectorStore
+
+TEXT = "".join(f"INSERT INTO t VALUES ({i}, 'résumé {i}');\r\n" if i % 3 else f"-- section {i}\n\n" for i in range(400))
+
+
+def _rows(store, path):
+    with store.reader() as conn:
+        return conn.execute("SELECT content, chunk_index FROM vectors WHERE file_path=? ORDER BY chunk_index", (path,)).fetchall()
+
+
+@pytest.mark.parametrize("buffer_size", [1, 7, 64, 4096])
+def test_streamed_chunks_match_whole_text(buffer_size):
+    lines = list(iter_lines(iter_text_pieces(TEXT, buffer_size)))
+    assert lines == TEXT.splitlines(keepends=True)
+    assert list(iter_chunks(iter_lines(iter_text_pieces(TEXT, buffer_size)))) == chunk_text(TEXT)
+    # Lines without breaks are cut instead of buffered whole
+    assert list(iter_lines(["x" * 10, "y" * 10], max_line=4)) == ["xxxx", "xxxx", "xxyy", "yyyy", "yyyy"]
+
+
+def test_encoding_sniffing(tmp_path):
+    assert detect_encoding("café".encode("utf-8")) == "utf-8"
+    # A character cut off by the end of the sample is not a decoding error
+    assert detect_encoding("café".encode("utf-8")[:-1]) == "utf-8"
+    assert detect_encoding("café crème".encode("latin-1")) == "latin-1"
+    assert detect_encoding(b"\x89PNG\r\n\x1a\n\0\0") is None
+    assert detect_encoding("hi".encode("utf-16")) == "utf-16"
+
+    path = tmp_path / "dump.sql"
+    path.write_bytes(TEXT.encode("utf-8"))
+    hasher = hashlib.sha256()
+    # Multi-byte characters straddle the 5-byte blocks
+    assert "".join(iter_file_text(str(path), "utf-8", hasher, buffer_size=5)) == TEXT
+    assert hasher.hexdigest() == file_hash(TEXT.encode("utf-8"))
+
+
+def test_sync_file_stream_matches_sync_file():
+    embedder = HashingEmbedder()
+    old, new = chunk_text(TEXT), chunk_text(TEXT.replace("section 30", "section thirty") + "-- tail\n")
+    expected = SQLiteLangChainVectorStore(":memory:")
+    expected.sync_file("p1", "dump.sql", old, embedder)
+    counts = expected.sync_file("p1", "dump.sql", new, embedder)
+
+    store = SQLiteLangChainVectorStore(":memory:", use_index=True)
+    assert store.sync_file_stream("p1", "dump.sql", iter(old), embedder, batch_size=16)["added"] == len(old)
+    assert store.get_index("p1")
+    with mock.patch.object(HashingEmbedder, "embed_batch", wraps=embedder.embed_batch) as embed_batch:
+        assert store.sync_file_stream("p1", "dump.sql", iter(new), embedder, batch_size=16) == counts
+        # Only the chunks around the two edits are embedded
+        assert 0 < counts["added"] < len(new) // 10
+        assert sum(len(call.args[0]) for call in embed_batch.call_args_list) == counts["added"]
+    assert _rows(store, "dump.sql") == _rows(expected, "dump.sql")
+    hit = store.similarity_search("", k=1, filter={"embedding": embedder.embed(new[-1]), "project_id": "p1"})[0]
+    assert hit.page_content == new[-1]
+
+    # A failure part-way leaves the stored rows as they were
+    def failing():
+        yield from new[:40]
+        raise OSError("read error")
+
+    with pytest.raises(OSError):
+        store.sync_file_stream("p1", "dump.sql", failing(), embedder, batch_size=16)
+    assert _rows(store, "dump.sql") == _rows(expected, "dump.sql")
+    store.close()
+    expected.close()
+
+
+def test_large_binary_and_oversized_files(tmp_path):
+    store = SQLiteLangChainVectorStore(":memory:")
+    embedder = HashingEmbedder()
+    jobs = IngestJobQueue(store, embedder, workers=2, batch_size=32, max_file_size=64 * 1024, stream_threshold=4096)
+    jobs.start()
+    big, log = tmp_path / "dump.sql", tmp_path / "app.log"
+    big.write_bytes(TEXT.encode("utf-8"))
+    log.write_text("line\n" * 100)
+    events = [{"path": str(big), "event_type": "created"}, {"path": str(log), "event_type": "created"}]
+    with mock.patch.object(pipeline, "chunk_text", wraps=pipeline.chunk_text) as whole_file, \
+            mock.patch.object(HashingEmbedder, "embed_batch", wraps=embedder.embed_batch) as embed_batch:
+        assert jobs.wait(jobs.submit("p1", events), timeout=10)["status"] == "completed"
+        # Only the small log is chunked in one go; the dump is streamed in batches
+        assert whole_file.call_count == 1
+        assert max(len(call.args[0]) for call in embed_batch.call_args_list) <= 32
+    assert [content for content, _ in _rows(store, str(big))] == chunk_text(TEXT)
+    assert store.file_state("p1", str(big))["hash"] == file_hash(TEXT.encode("utf-8"))
+
+    big.write_bytes((TEXT + "-- appended\n").encode("utf-8"))
+    # The log grows past the size limit: its chunks are dropped, not kept stale
+    log.write_text("line\n" * 20000)
+    events = [{"path": str(big), "event_type": "modified"}, {"path": str(log), "event_type": "modified"}]
+    job = jobs.wait(jobs.submit("p1", events), timeout=10)
+    assert job["status"] == "completed" and job["added"] == 1
+    assert not _rows(store, str(log)) and store.file_state("p1", str(log)) is None
+
+    big.write_bytes(b"\x00\x01 now binary")
+    assert jobs.wait(jobs.submit("p1", [{"path": str(big), "event_type": "modified"}]), timeout=10)["status"] == "completed"
+    assert not _rows(store, str(big)) and store.file_manifest("p1") == {}
+    jobs.stop()
+    store.close()
@@ -1,4 +1,5 @@
 import os
+import numpy as np
 import tempfile
 from ragms02.vectorstore.sqlite import VectorStore
 
@@ -12,3 +13,11 @@ def test_add_and_get_vector():
         store.close()
     finally:
         os.remove(db_path)
+
+def test_add_vectors_bulk():
+    store = VectorStore()
+    vectors = np.eye(3, dtype=np.float32)
+    assert store.add_vectors(["a", "b", "c"], "proj1", ["created"] * 3, vectors, commit_every=2) == 3
+    assert np.frombuffer(store.get_vector("b"), dtype=np.float32).tolist() == [0.0, 1.0, 0.0]
+    assert store.similarity_search([0, 0, 1], "proj1", top_k=1)[0][0] == "c"
+    store.close()
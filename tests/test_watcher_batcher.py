@@ -0,0 +1,151 @@
+import hashlib
+from unittest import mock
+import requests
+from ragms02.watcher.batcher import EventBatcher
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _response(status, headers=None):
+    resp = mock.Mock(status_code=status, headers=headers or {})
+    resp.ok = status < 400
+    return resp
+
+
+def _session(**kwargs):
+    session = mock.Mock(spec=requests.Session)
+    session.post = mock.Mock(**kwargs)
+    return session
+
+
+def _batcher(tmp_path, clock, session, **kwargs):
+    kwargs.setdefault("backoff", 0)
+    return EventBatcher("http://api/ingest/notify", "p1", str(tmp_path), debounce=0.5, flush_interval=1.0, session=session, clock=clock, **kwargs)
+
+
+def _sent(session):
+    return [(e["event_type"], e["path"]) for call in session.post.call_args_list for e in call.kwargs["json"]["events"]]
+
+
+def test_bursts_fold_into_net_effects(tmp_path):
+    (tmp_path / "a.py").write_text("a = 1\n")
+    (tmp_path / "c.py").write_text("c = 1\n")
+    clock = Clock()
+    session = _session(return_value=_response(202))
+    batcher = _batcher(tmp_path, clock, session)
+    # Editor save through a temp file renamed over the original
+    batcher.add("created", ".a.py.tmp")
+    batcher.add("modified", ".a.py.tmp")
+    batcher.add("moved", ".a.py.tmp", "a.py")
+    batcher.add("modified", "a.py")
+    # Short-lived file, a delete, and a rename chain
+    batcher.add("created", "scratch.txt")
+    batcher.add("deleted", "scratch.txt")
+    batcher.add("deleted", "gone.py")
+    batcher.add("moved", "b.py", "b2.py")
+    batcher.add("moved", "b2.py", "c.py")
+    assert len(batcher) == 3
+
+    clock.now = 1.0
+    assert batcher.flush() == 0  # quiet, but not yet waited flush_interval
+    clock.now = 1.6
+    assert batcher.flush() == 3
+    assert session.post.call_count == 1
+    assert sorted(_sent(session)) == [("deleted", "gone.py"), ("modified", "a.py"), ("moved", "c.py")]
+    events = {e["path"]: e for e in session.post.call_args.kwargs["json"]["events"]}
+    assert events["a.py"]["content"] == "a = 1\n" and "timestamp" in events["a.py"]
+    assert events["a.py"]["hash"] == hashlib.sha256(b"a = 1\n").hexdigest()
+    # An unchanged move carries no content: the API re-keys the chunks stored for b.py
+    assert events["c.py"]["old_path"] == "b.py" and "content" not in events["c.py"]
+    assert batcher.stats["received"] == 9 and batcher.stats["sent"] == 3
+
+
+def test_full_batch_is_sent_without_waiting(tmp_path):
+    clock = Clock()
+    session = _session(return_value=_response(202))
+    batcher = _batcher(tmp_path, clock, session, batch_size=3, send_content=False)
+    for i in range(7):
+        batcher.add("deleted", f"f{i}.py")
+    clock.now = 0.5
+    assert batcher.flush() == 7
+    assert [len(call.kwargs["json"]["events"]) for call in session.post.call_args_list] == [3, 3, 1]
+
+
+def test_busy_file_is_sent_after_max_delay(tmp_path):
+    clock = Clock()
+    session = _session(return_value=_response(202))
+    batcher = _batcher(tmp_path, clock, session, max_delay=3.0, send_content=False)
+    while clock.now < 5:
+        batcher.add("modified", "log.txt")
+        batcher.flush()
+        clock.now += 0.25
+    # Sent once max_delay plus flush_interval has passed, although the file never went quiet
+    assert session.post.call_count == 1
+
+
+def test_retries_with_backoff_then_requeues(tmp_path):
+    clock = Clock()
+    session = _session(side_effect=[requests.ConnectionError("down"), _response(503), _response(503)])
+    batcher = _batcher(tmp_path, clock, session, max_retries=2, send_content=False)
+    batcher.add("deleted", "a.py")
+    clock.now = 2.0
+    assert batcher.flush() == 0
+    assert session.post.call_count == 3 and batcher.stats["retries"] == 2
+    assert batcher.ready(force=True) == ["a.py"]
+
+    # Paused after giving up; once the pause is over the event is delivered
+    session.post = mock.Mock(return_value=_response(202))
+    assert batcher.flush() == 0
+    clock.now += batcher.max_backoff
+    assert batcher.flush() == 1
+    assert _sent(session) == [("deleted", "a.py")]
+
+
+def test_missing_file_is_sent_as_delete_and_stop_flushes(tmp_path):
+    session = _session(return_value=_response(202))
+    batcher = EventBatcher("http://api/ingest/notify", "p1", str(tmp_path), debounce=60, session=session)
+    batcher.start()
+    batcher.add("created", "vanished.py")
+    batcher.stop()
+    assert _sent(session) == [("deleted", "vanished.py")]
+
+
+def test_moves_fold_with_later_changes(tmp_path):
+    (tmp_path / "new.py").write_text("x = 2\n")
+    (tmp_path / "old2.py").write_text("y = 1\n")
+    (tmp_path / "moved2.py").write_text("y = 0\n")
+    clock = Clock()
+    session = _session(return_value=_response(202))
+    batcher = _batcher(tmp_path, clock, session)
+    # Moved and then edited: one move that carries the new content
+    batcher.add("moved", "old.py", "new.py")
+    batcher.add("modified", "new.py")
+    # Moved and then deleted: only the original path is deleted
+    batcher.add("moved", "tmp.py", "tmp2.py")
+    batcher.add("deleted", "tmp2.py")
+    # Moved, then a new file appears at the source: a delete plus a write instead of a move
+    batcher.add("moved", "old2.py", "moved2.py")
+    batcher.add("created", "old2.py")
+    clock.now = 2.0
+    batcher.flush()
+    events = {e["path"]: e for e in session.post.call_args.kwargs["json"]["events"]}
+    assert events["new.py"] == {**events["new.py"], "event_type": "moved", "old_path": "old.py", "content": "x = 2\n"}
+    assert events["tmp.py"]["event_type"] == "deleted" and "tmp2.py" not in events
+    assert events["old2.py"]["event_type"] == "modified" and events["moved2.py"]["event_type"] == "modified"
+
+
+def test_changed_move_without_content_is_followed_by_a_write(tmp_path):
+    clock = Clock()
+    session = _session(return_value=_response(202))
+    batcher = _batcher(tmp_path, clock, session, send_content=False)
+    batcher.add("moved", "a.py", "b.py")
+    batcher.add("modified", "b.py")
+    clock.now = 2.0
+    batcher.flush()
+    assert _sent(session) == [("moved", "b.py"), ("modified", "b.py")]
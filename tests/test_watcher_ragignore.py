@@ -73,3 +73,33 @@ def test_watcher_respects_ragignore(temp_project_dir, patch_requests_post):
 
     watcher._stop_event.set()
     t.join(timeout=2)
+
+
+def test_ignore_file_events_reload_nested_rules(temp_project_dir):
+    from watchdog.events import FileCreatedEvent, FileModifiedEvent
+    from ragms02.watcher.watcher import ChangeHandler
+
+    project = temp_project_dir
+    os.makedirs(os.path.join(project, "sub", "gen"))
+    write_file(os.path.join(project, ".ragignore"), "*.tmp\n")
+    write_file(os.path.join(project, "sub", "a.py"))
+    write_file(os.path.join(project, "sub", "gen", "out.py"))
+    write_file(os.path.join(project, "sub", "notes.tmp"))
+    watcher = FileWatcher(WatcherConfig(path=project))
+    watcher.batcher = mock.Mock()
+    handler = ChangeHandler(watcher.config.path, watcher.ignore_tree, watcher.batcher, watcher._on_ignore_change)
+
+    # A new nested .ragignore ignores sub/gen/ and re-includes *.tmp below sub/
+    write_file(os.path.join(project, "sub", ".ragignore"), "gen/\n!*.tmp\n")
+    handler.dispatch(FileCreatedEvent(os.path.join(project, "sub", ".ragignore")))
+    calls = {(c.args[0], c.args[1]) for c in watcher.batcher.add.call_args_list}
+    assert ("deleted", "sub/gen/out.py") in calls
+    assert ("created", "sub/notes.tmp") in calls
+    assert ("created", "sub/.ragignore") in calls
+
+    # Removing the pattern again brings the generated file back
+    watcher.batcher.add.reset_mock()
+    write_file(os.path.join(project, "sub", ".ragignore"), "!*.tmp\n")
+    handler.dispatch(FileModifiedEvent(os.path.join(project, "sub", ".ragignore")))
+    calls = {(c.args[0], c.args[1]) for c in watcher.batcher.add.call_args_list}
+    assert ("created", "sub/gen/out.py") in calls and ("deleted", "sub/notes.tmp") not in calls